@@ -40,13 +40,17 @@ from .plumebackground import PlumeBackgroundModel
 from .cellcalib import CellCalibData, CellCalibEngine
 from .calib_base import CalibData
 from .doascalib import DoasCalibData, DoasFOV, DoasFOVEngine
-from .plumespeed import (find_signal_correlation, OptflowFarneback,
-                         FarnebackSettings, LocalPlumeProperties,
-                         VeloCrossCorrEngine)
+from .plumespeed import (find_signal_correlation, rolling_signal_correlation,
+                         OptflowFarneback, FarnebackSettings,
+                         LocalPlumeProperties, VeloCrossCorrEngine)
 from .processing import ImgStack, PixelMeanTimeSeries
 from .dilutioncorr import DilutionCorr
 from .fluxcalc import (EmissionRateAnalysis, EmissionRates,
                        EmissionRateSettings)
+from .pipeline import (ImgListPipeline, PipelineConsumer, StackConsumer,
+                       RoiMeanConsumer, PcsProfilesConsumer,
+                       FlowHistoConsumer, EmissionRateConsumer,
+                       ExtCoeffsConsumer)
 from .optimisation import PolySurfaceFit, MultiGaussFit
 from . import custom_image_import
 from .inout import download_test_data, find_test_data
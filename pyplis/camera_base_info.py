@@ -4,12 +4,26 @@ from warnings import warn
 from os.path import exists, basename
 from datetime import datetime as dt
 from collections import OrderedDict as od
+from pandas import DataFrame, Series, to_datetime, to_numeric, NaT
 from .utils import DarkOffsetInfo, Filter
 from . import custom_image_import
 from .inout import save_new_default_camera, get_camera_info
 import re
 import six
 
+#: compiled filename regular expressions (see :func:`_compile_regexp`)
+_COMPILED_REGEXPS = {}
+
+
+def _compile_regexp(pattern):
+    """Compile regular expression (each pattern is only compiled once)."""
+    try:
+        return _COMPILED_REGEXPS[pattern]
+    except KeyError:
+        regexp = re.compile(pattern)
+        _COMPILED_REGEXPS[pattern] = regexp
+        return regexp
+
 
 class CameraBaseInfo(object):
     """Low level base class for camera specific information.
@@ -178,8 +192,8 @@ class CameraBaseInfo(object):
             print("no filename_regexp")
             return values
 
-        regexp = re.compile(conf["filename_regexp"])
-        d = re.match(regexp, filename).groupdict()
+        regexp = _compile_regexp(conf["filename_regexp"])
+        d = regexp.match(filename).groupdict()
         values.update(d)
 
         return values
@@ -223,12 +237,32 @@ class CameraBaseInfo(object):
 
         return values
 
+    @property
+    def _filename_config(self):
+        """Dictionary containing all settings for filename info access."""
+        return {
+            "delim": self.delim,
+            "time_info_pos": self.time_info_pos,
+            "time_info_subnum": self._time_info_subnum,
+            "time_info_str": self.time_info_str,
+            "filter_id_pos": self.filter_id_pos,
+            "fid_subnum_max": self._fid_subnum_max,
+            "meas_type_pos": self.meas_type_pos,
+            "mtype_subnum_max": self._mtype_subnum_max,
+            "texp_pos": self.texp_pos,
+            "texp_unit": self.texp_unit,
+            "filename_regexp": self.filename_regexp
+        }
+
     def get_img_meta_from_filename(self, file_path):
         """Extract as much as possible from filename and update access flags.
 
         Checks if all declared import information works for a given filetype
         and update all flags for which it does not.
 
+        See also :func:`get_img_meta_index` for extracting the information
+        from many files at once.
+
         :param str file_path: file path used for info import check
         """
         if not exists(file_path):
@@ -236,19 +270,7 @@ class CameraBaseInfo(object):
 
         filename = basename(file_path)
 
-        config = {
-            "delim": self.delim,
-            "time_info_pos": self.time_info_pos,
-            "time_info_subnum": self._time_info_subnum,
-            "time_info_str": self.time_info_str,
-            "filter_id_pos": self.filter_id_pos,
-            "fid_subnum_max": self._fid_subnum_max,
-            "meas_type_pos": self.meas_type_pos,
-            "mtype_subnum_max": self._mtype_subnum_max,
-            "texp_pos": self.texp_pos,
-            "texp_unit": self.texp_unit,
-            "filename_regexp": self.filename_regexp
-        }
+        config = self._filename_config
 
         if (self.filename_regexp):
             values = self.parse_filename_regexp(filename, config)
@@ -280,6 +302,80 @@ class CameraBaseInfo(object):
         return (values["acq_time"], values["filter_id"], values["meas_type"],
                 values["texp"], warnings)
 
+    def get_img_meta_index(self, file_paths):
+        """Extract image meta information from the names of many files.
+
+        Columnar version of :func:`get_img_meta_from_filename`: the filename
+        access settings are evaluated only once, the filenames are split
+        without checking the existence of each file and the acquisition time
+        strings are converted all at once. Unlike
+        :func:`get_img_meta_from_filename`, the access flags
+        (``self._fname_access_flags``) are not updated.
+
+        Parameters
+        ----------
+        file_paths : list
+            list of image file paths
+
+        Returns
+        -------
+        DataFrame
+            one row per file (in the order of ``file_paths``) with columns
+            ``path``, ``start_acq`` (``datetime64``, ``NaT`` if not
+            accessible), ``filter_id``, ``meas_type`` (None if not accessible)
+            and ``texp`` (in s, NaN if not accessible)
+
+        """
+        paths = list(file_paths)
+        num = len(paths)
+        dates, filter_ids, meas_types, texps = ([None] * num, [None] * num,
+                                                [None] * num, [None] * num)
+        config = self._filename_config
+        if self.filename_regexp:
+            parse = self.parse_filename_regexp
+        elif self.delim:
+            parse = self.parse_filename
+        else:
+            parse = None
+        if parse is not None:
+            for k, path in enumerate(paths):
+                try:
+                    values = parse(basename(path), config)
+                except BaseException:
+                    continue
+                dates[k] = values.get("date")
+                filter_ids[k] = values["filter_id"] or None
+                meas_types[k] = values["meas_type"] or None
+                texps[k] = values["texp"]
+        texps = to_numeric(Series(texps, dtype=object), errors="coerce")
+        if self.texp_unit == "ms":
+            texps = texps / 1000.0
+        return DataFrame(od([("path", Series(paths, dtype=object)),
+                             ("start_acq", self._dates_to_datetime64(dates)),
+                             ("filter_id", Series(filter_ids, dtype=object)),
+                             ("meas_type", Series(meas_types, dtype=object)),
+                             ("texp", texps.astype(float))]))
+
+    def _dates_to_datetime64(self, dates):
+        """Convert acq. time strings from filenames into datetime64 series.
+
+        The conversion is vectorised, strings that cannot be converted this
+        way are converted individually using ``datetime.strptime``.
+        """
+        dates = Series(dates, dtype=object)
+        fmt = self.time_info_str
+        try:
+            times = to_datetime(dates, format=fmt, errors="coerce")
+        except BaseException:
+            times = Series(NaT, index=dates.index, dtype="datetime64[ns]")
+        failed = times.isnull() & dates.notnull()
+        for k in failed[failed].index:
+            try:
+                times[k] = dt.strptime(dates[k], fmt)
+            except BaseException:
+                pass
+        return times
+
     """Decorators / dynamic class attributes"""
 
     @property
@@ -27,11 +27,15 @@ tutorial
 <http://pyplis.readthedocs.io/en/latest/tutorials.html#primer-on-data-import>`_
 """
 from __future__ import (absolute_import, division)
-from os.path import exists, join, isfile, isdir
+from os.path import (exists, join, isfile, isdir, dirname, basename,
+                     getmtime)
 from os import listdir, walk
+import sqlite3
 
-from datetime import datetime, date
-from numpy import inf
+from datetime import datetime, timedelta
+from numpy import (inf, array, int64, datetime64, timedelta64, argsort,
+                   searchsorted, sort, isnat)
+from pandas import DataFrame, Series
 from matplotlib.pyplot import subplots, FuncFormatter, tight_layout, Line2D
 from matplotlib.patches import Rectangle
 
@@ -47,6 +51,9 @@ from .setupclasses import MeasSetup, Source, Camera
 from .exceptions import ImgMetaError
 import six
 
+#: integer representation of NaT (not a time) in datetime64 arrays
+_NAT_INT = datetime64("NaT").astype(int64)
+
 
 class Dataset(object):
     """Class for data import management.
@@ -78,6 +85,13 @@ class Dataset(object):
                          ('offset1', ['D0H', 'D0H']),
                          ('dark1', ['D1H', 'D1H'])])
 
+    meta_index : DataFrame
+        meta information of all image files found in the image base directory
+        (accessed from the file names, see
+        :func:`CameraBaseInfo.get_img_meta_index`). The index is created once
+        on data import and the corresponding subsets are assigned to the image
+        lists (cf. :attr:`ImgList.meta_index`)
+
     Parameters
     ----------
     input
@@ -97,6 +111,9 @@ class Dataset(object):
         self.lst_type = lst_type
         self._lists_intern = od()
         self.lists_access_info = od()
+        self.meta_index = None
+        # sorted acq. times of meta index (see _get_sorted_times)
+        self._sorted_times = None
 
         ok = self.load_input(input)
 
@@ -387,6 +404,9 @@ class Dataset(object):
             warnings.append(s)
             print_log.warning(s)
             return False
+        # meta information of all files, extracted only once and shared by
+        # all lists
+        index = self.get_meta_index(paths)
         # check which image meta information can be accessed from first file in
         # list (updates ``_fname_access_flags`` in :class:`Camera`)
         self.check_filename_info_access(paths[0])
@@ -396,8 +416,8 @@ class Dataset(object):
         if self.USE_ALL_FILES and flags["start_acq"]:
             # take all files in the basefolder (i.e. set start and stop date
             # the first and last date of the files in the folder)
-            self.setup.start = cam.get_img_meta_from_filename(paths[0])[0]
-            self.setup.stop = cam.get_img_meta_from_filename(paths[-1])[0]
+            self.setup.start = index["start_acq"].iat[0].to_pydatetime()
+            self.setup.stop = index["start_acq"].iat[-1].to_pydatetime()
 
         #: Set option to use all files in case acquisition time stamps cannot
         #: be accessed from filename
@@ -408,8 +428,8 @@ class Dataset(object):
 
         #: Separate the current list based on specified time stamps
         if not self.setup.options["USE_ALL_FILES"]:
-            paths_temp = self.extract_files_time_ival(paths)
-            if not bool(paths_temp):
+            index_temp = self._extract_index_time_ival(index)
+            if not len(index_temp):
                 # check if any files were found in specified t-window
                 s = ("No images found in specified time interval "
                      "%s - %s, mode was changed to: USE_ALL_FILES=True"
@@ -417,7 +437,8 @@ class Dataset(object):
                 warnings.append(s)
                 self.setup.options["USE_ALL_FILES"] = True
             else:
-                paths = paths_temp
+                index = index_temp
+                paths = index["path"].tolist()
         if self.setup.ON_OFF_SAME_FILE:
             logger.warning("Option ON_OFF_SAME_FILE is active: using same file paths "
                            "in default on and offband list. Please note that no "
@@ -425,8 +446,10 @@ class Dataset(object):
                            "dark images)")
             # the function add_files ads the file paths to the list and loads
             # the current and next images (at index 0 and 1)
-            self.img_lists[self.filters.default_key_on].add_files(paths)
-            self.img_lists[self.filters.default_key_off].add_files(paths)
+            for key in [self.filters.default_key_on,
+                        self.filters.default_key_off]:
+                self.img_lists[key].meta_index = index
+                self.img_lists[key].add_files(paths)
         else:
             if not (flags["filter_id"] and flags["meas_type"]):
                 #: it is not possible to separate different image types (on,
@@ -438,18 +461,23 @@ class Dataset(object):
                                 "all files into on-band list")
                 self.setup.options["SEPARATE_FILTERS"] = False
                 i = self.lists_access_info[self.filters.default_key_on]
+                self._lists_intern[i[0]][i[1]].meta_index = index
                 self._lists_intern[i[0]][i[1]].add_files(paths)
                 [logger.warning(x) for x in warnings]
                 return True
 
             #: now perform separation by meastype and filter
-            for p in paths:
+            groups = index.groupby(["meas_type", "filter_id"], sort=False,
+                                   dropna=False)
+            for (meas_type, filter_id), sub in groups:
                 try:
-                    _, filter_id, meas_type, _, _ = self.camera. \
-                        get_img_meta_from_filename(p)
-                    self._lists_intern[meas_type][filter_id].files.append(p)
-                except:
-                    logger.warning("File %s could not be added..." % p)
+                    lst = self._lists_intern[meas_type][filter_id]
+                except BaseException:
+                    for p in sub["path"]:
+                        logger.warning("File %s could not be added..." % p)
+                    continue
+                lst.files.extend(sub["path"].tolist())
+                lst.meta_index = sub
 
             for meas_type, sub_dict in six.iteritems(self._lists_intern):
                 for filter_id, lst in six.iteritems(sub_dict):
@@ -475,6 +503,10 @@ class Dataset(object):
     def get_all_filepaths(self):
         """Find all valid image filepaths in current base directory.
 
+        If option :attr:`SCAN_CACHE` of the setup is active, the file search
+        is performed using an on-disk index of the directory (see
+        :func:`get_all_filepaths_cached`).
+
         Returns
         -------
         list
@@ -498,6 +530,14 @@ class Dataset(object):
             logger.warning(message)
             return []
 
+        if self.setup.SCAN_CACHE:
+            try:
+                return self.get_all_filepaths_cached()
+            except Exception as e:
+                logger.warning("Failed to use directory scan cache in %s, "
+                               "searching files without cache. Error: %s"
+                               % (p, repr(e)))
+
         if not self.INCLUDE_SUB_DIRS:
             logger.info("Image search is only performed in specified directory "
                         "and does not include subdirectories")
@@ -524,12 +564,67 @@ class Dataset(object):
                     for filename in files:
                         if filename.endswith(ftype):
                             all_paths.append(join(path, filename))
+        # ignore directory scan cache (see get_all_filepaths_cached)
+        all_paths = [x for x in all_paths if not
+                     basename(x).startswith(_DirScanCache.FILE_NAME)]
 
         all_paths.sort()
         logger.info("Total number of files found %s" % len(all_paths))
 
         return all_paths
 
+    def get_all_filepaths_cached(self):
+        """Find all valid image filepaths using on-disk index of base dir.
+
+        The index (a SQLite file in the base directory) contains all files
+        and their filename meta information and is updated incrementally,
+        i.e. only directories that were modified since the last search are
+        listed. The meta information of the files is assigned to
+        :attr:`meta_index`.
+
+        Returns
+        -------
+        list
+            list containing all valid image file paths (sorted)
+
+        """
+        index = _DirScanCache(self.base_dir).scan(self.camera,
+                                                  self.INCLUDE_SUB_DIRS)
+        if not self.USE_ALL_FILE_TYPES:
+            index = index[index["path"].str.endswith(self.file_type).values]
+        self.meta_index = index.reset_index(drop=True)
+        all_paths = self.meta_index["path"].tolist()
+        logger.info("Total number of files found %s (using scan cache)"
+                    % len(all_paths))
+        return all_paths
+
+    def get_meta_index(self, paths=None):
+        """Get meta information of image files accessible from file names.
+
+        Parameters
+        ----------
+        paths : :obj:`list`, optional
+            list of file paths (e.g. result of :func:`get_all_filepaths`).
+            If None, all valid file paths in the current base directory are
+            used
+
+        Returns
+        -------
+        DataFrame
+            meta index of the files (see
+            :func:`CameraBaseInfo.get_img_meta_index`), which is also
+            assigned to :attr:`meta_index`. The current index is reused if it
+            corresponds to the input paths
+
+        """
+        if paths is None:
+            paths = self.get_all_filepaths()
+        index = self.meta_index
+        if index is None or not index["path"].tolist() == list(paths):
+            index = self.camera.get_img_meta_index(paths)
+            self.meta_index = index
+        return index
+
     def check_filename_info_access(self, filepath):
         """Check which information can be accessed from file name.
 
@@ -592,60 +687,111 @@ class Dataset(object):
         if not self.camera._fname_access_flags["start_acq"]:
             logger.warning("Acq. time information cannot be accessed from file names")
             return all_paths
-        acq_time0 = self.camera.get_img_meta_from_filename(all_paths[0])[0]
-        if acq_time0.date() == date(1900, 1, 1):
-            paths = self._find_files_ival_time_only(all_paths)
-        else:
-            paths = self._find_files_ival_datetime(all_paths)
+        index = self._extract_index_time_ival(self.get_meta_index(all_paths))
+        return index["path"].tolist()
 
-        if not bool(paths):
-            print_log.warning("Error: no files could be found in specified time "
-                              "interval %s - %s" % (self.start, self.stop))
-            self.USE_ALL_FILES = True
-        else:
-            logger.info("%s files of type were found in specified time interval %s "
-                        "- %s" % (len(paths), self.start, self.stop))
-        return paths
+    def extract_files_time_ivals(self, ivals, all_paths=None):
+        """Extract files belonging to several time intervals at once.
 
-    def _find_files_ival_time_only(self, all_paths):
-        """Extract all files belonging to specified time interval.
+        The intervals are retrieved using a binary search in the sorted acq.
+        times of the files (cf. :attr:`meta_index`), which is much faster
+        than applying :func:`extract_files_time_ival` for each interval, e.g.
+        if an archive is split into many measurement sessions.
 
-        :param list all_paths: list of image filepaths
-        """
-        paths = []
-        i, f = self.start.time(), self.stop.time()
-        func = self.camera.get_img_meta_from_filename
-        for path in all_paths:
-            acq_time = func(path)[0].time()
-            if i <= acq_time <= f:
-                paths.append(path)
+        Parameters
+        ----------
+        ivals : list
+            list containing ``(start, stop)`` tuples of datetime objects. If
+            the file names only contain time information, only the time of
+            day of ``start`` and ``stop`` is considered
+        all_paths : :obj:`list`, optional
+            list of image filepaths. If None, the files of the current
+            :attr:`meta_index` are used (or, if the latter is not available,
+            all valid files in the base directory)
 
-        return paths
+        Returns
+        -------
+        list
+            list containing one list of file paths for each interval (in the
+            order of ``all_paths``)
 
-    def _find_files_ival_datetime(self, all_paths):
-        """Extract all files belonging to specified time interval.
+        """
+        if all_paths is None and self.meta_index is not None:
+            index = self.meta_index
+        else:
+            index = self.get_meta_index(all_paths)
+        paths = index["path"].values
+        return [paths[rows].tolist()
+                for rows in self._find_rows_time_ivals(index, ivals)]
 
-        This function considers the datetime stamps of ``self.start`` and
-        ``self.stop``, see also :func:`_find_files_ival_time_only` which only
-        uses the actual time to find valid files.
+    def _extract_index_time_ival(self, index):
+        """Extract rows of meta index belonging to specified time interval.
 
-        :param list all_paths: list of image filepaths
+        :param DataFrame index: meta index of image files (cf.
+            :func:`get_meta_index`)
         """
-        paths = []
-        func = self.camera.get_img_meta_from_filename
-        i, f = self.start, self.stop
-        for path in all_paths:
-            acq_time = func(path)[0]
-            if i <= acq_time <= f:
-                paths.append(path)
+        if not self.camera._fname_access_flags["start_acq"]:
+            logger.warning("Acq. time information cannot be accessed from file names")
+            return index
+        rows = self._find_rows_time_ivals(index, [(self.start, self.stop)])[0]
+        index = index.iloc[rows]
 
-        if not bool(paths):
-            logger.warning("Error: no files could be found in specified time "
-                           "interval %s - %s" % (self.start, self.stop))
+        if not len(index):
+            print_log.warning("Error: no files could be found in specified time "
+                              "interval %s - %s" % (self.start, self.stop))
+            self.USE_ALL_FILES = True
         else:
             logger.info("%s files of type were found in specified time interval %s "
-                        "- %s" % (len(paths), self.start, self.stop))
-        return paths
+                        "- %s" % (len(index), self.start, self.stop))
+        return index
+
+    def _find_rows_time_ivals(self, index, ivals):
+        """Find rows of meta index belonging to time intervals.
+
+        If the acq. times of the files contain no date information (i.e. the
+        date is 1900-01-01), the time of day is considered only.
+
+        :param DataFrame index: meta index of image files
+        :param list ivals: list containing ``(start, stop)`` tuples
+        :return: list containing sorted row indices for each interval
+        """
+        keys, order, time_only = self._get_sorted_times(index)
+        starts = array([self._time_key(i, time_only) for i, _ in ivals],
+                       dtype=keys.dtype)
+        stops = array([self._time_key(f, time_only) for _, f in ivals],
+                      dtype=keys.dtype)
+        lower = searchsorted(keys, starts, side="left")
+        upper = searchsorted(keys, stops, side="right")
+        return [sort(order[i:f]) for i, f in zip(lower, upper)]
+
+    def _get_sorted_times(self, index):
+        """Return sorted acq. times of meta index (cached for last index).
+
+        :return: tuple containing sorted times (or times of day, if no date
+            information is available), row indices of sorted times and bool
+            specifying whether times are times of day
+        """
+        cached = self._sorted_times
+        if cached is None or cached[0] is not index:
+            times = index["start_acq"].values.astype("datetime64[ns]")
+            valid = times[~isnat(times)]
+            time_only = bool(len(valid)) and\
+                valid[0].astype("datetime64[D]") == datetime64("1900-01-01")
+            if time_only:
+                times = times - times.astype("datetime64[D]")
+            order = argsort(times, kind="mergesort")
+            cached = (index, times[order], order, time_only)
+            self._sorted_times = cached
+        return cached[1:]
+
+    @staticmethod
+    def _time_key(val, time_only):
+        """Convert datetime into search key for :func:`_get_sorted_times`."""
+        if time_only:
+            return timedelta64(timedelta(hours=val.hour, minutes=val.minute,
+                                         seconds=val.second,
+                                         microseconds=val.microsecond), "ns")
+        return datetime64(val, "ns")
 
     def find_closest_img(self, filename, in_list, acronym, meas_type_acro):
         """Find closest-in-time image to input image file.
@@ -1178,3 +1324,173 @@ class Dataset(object):
             self.setup.__dict__[key] = val
         elif key in self.__dict__:
             self.__dict__[key] = val
+
+
+class _DirScanCache(object):
+    """On-disk index of all files in an image directory tree.
+
+    The index is stored in a SQLite database in the base directory and
+    contains the file paths (relative to the base directory), the filename
+    meta information of each file (see
+    :func:`CameraBaseInfo.get_img_meta_index`) and the modification times of
+    all scanned directories. On :func:`scan`, only directories whose
+    modification time changed since the last scan (i.e. files or sub
+    directories were added, removed or renamed) are listed again, all other
+    entries are taken from the database.
+
+    Parameters
+    ----------
+    base_dir : str
+        image base directory
+    db_file : :obj:`str`, optional
+        location of the database (defaults to :attr:`FILE_NAME` in
+        ``base_dir``)
+
+    """
+
+    FILE_NAME = ".pyplis_scan_cache.sqlite"
+
+    def __init__(self, base_dir, db_file=None):
+        self.base_dir = base_dir
+        if db_file is None:
+            db_file = join(base_dir, self.FILE_NAME)
+        self.db_file = db_file
+
+    def _connect(self):
+        """Open database and create tables if necessary."""
+        con = sqlite3.connect(self.db_file)
+        # no journal file, since creating it in the base directory would
+        # change the modification time of the latter
+        con.execute("PRAGMA journal_mode = MEMORY")
+        with con:
+            con.execute("CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY "
+                        "KEY, parent TEXT, mtime REAL)")
+            con.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY "
+                        "KEY, dir TEXT, start_acq INTEGER, filter_id TEXT, "
+                        "meas_type TEXT, texp REAL)")
+            con.execute("CREATE INDEX IF NOT EXISTS files_dir ON files (dir)")
+            con.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY "
+                        "KEY, value TEXT)")
+        return con
+
+    def scan(self, camera, include_sub_dirs=True):
+        """Update the index and return meta information of all files.
+
+        Parameters
+        ----------
+        camera : CameraBaseInfo
+            camera used to extract meta information from the file names
+        include_sub_dirs : bool
+            if True, files in sub directories are included
+
+        Returns
+        -------
+        DataFrame
+            meta index of all files (cf.
+            :func:`CameraBaseInfo.get_img_meta_index`) sorted by path
+
+        """
+        con = self._connect()
+        try:
+            with con:
+                self._update(con, camera, include_sub_dirs)
+            if include_sub_dirs:
+                rows = con.execute("SELECT * FROM files").fetchall()
+            else:
+                rows = con.execute("SELECT * FROM files WHERE dir = ''"
+                                   ).fetchall()
+        finally:
+            con.close()
+        return self._to_index(rows)
+
+    def _update(self, con, camera, include_sub_dirs):
+        """Scan all modified directories and update database."""
+        config = repr(sorted(camera._filename_config.items()))
+        row = con.execute("SELECT value FROM info WHERE key = 'config'"
+                          ).fetchone()
+        if row is None or row[0] != config:
+            # filename convention changed, update meta info of all files
+            paths = [x[0] for x in con.execute("SELECT path FROM files")]
+            con.execute("DELETE FROM files")
+            self._insert_files(con, camera, paths)
+            con.execute("INSERT OR REPLACE INTO info VALUES ('config', ?)",
+                        (config,))
+        mtimes = dict(con.execute("SELECT path, mtime FROM dirs"))
+        children = {}
+        for path, parent in con.execute("SELECT path, parent FROM dirs "
+                                        "WHERE parent IS NOT NULL"):
+            children.setdefault(parent, []).append(path)
+        visited = set()
+        todo = [("", None)]
+        while todo:
+            rel_dir, parent = todo.pop()
+            try:
+                mtime = getmtime(join(self.base_dir, rel_dir))
+                visited.add(rel_dir)
+                if mtimes.get(rel_dir) == mtime:
+                    sub_dirs = children.get(rel_dir, [])
+                else:
+                    sub_dirs = self._scan_dir(con, camera, rel_dir, parent,
+                                              mtime,
+                                              children.get(rel_dir, []))
+            except (OSError, StopIteration):
+                # directory was removed
+                continue
+            if include_sub_dirs:
+                todo.extend([(x, rel_dir) for x in sub_dirs])
+        if include_sub_dirs:
+            for rel_dir in set(mtimes).difference(visited):
+                con.execute("DELETE FROM dirs WHERE path = ?", (rel_dir,))
+                con.execute("DELETE FROM files WHERE dir = ?", (rel_dir,))
+
+    def _scan_dir(self, con, camera, rel_dir, parent, mtime, sub_dirs_prev):
+        """List directory, update its entries and return sub directories."""
+        _, dirs, files = next(walk(join(self.base_dir, rel_dir)))
+        files = [join(rel_dir, f) for f in files
+                 if not f.startswith(self.FILE_NAME)]
+        sub_dirs = [join(rel_dir, d) for d in dirs]
+        con.execute("DELETE FROM files WHERE dir = ?", (rel_dir,))
+        self._insert_files(con, camera, files)
+        # new sub directories are scanned, entries of removed ones are deleted
+        # after the scan (if sub directories are included)
+        removed = set(sub_dirs_prev).difference(sub_dirs)
+        con.executemany("UPDATE dirs SET parent = NULL WHERE path = ?",
+                        [(d,) for d in removed])
+        con.executemany("INSERT OR IGNORE INTO dirs VALUES (?, ?, NULL)",
+                        [(d, rel_dir) for d in sub_dirs])
+        con.executemany("UPDATE dirs SET parent = ? WHERE path = ?",
+                        [(rel_dir, d) for d in sub_dirs])
+        con.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)",
+                    (rel_dir, parent, mtime))
+        return sub_dirs
+
+    def _insert_files(self, con, camera, rel_paths):
+        """Extract meta information from file names and add to database."""
+        if not rel_paths:
+            return
+        index = camera.get_img_meta_index(rel_paths)
+        times = index["start_acq"]
+        ns = times.values.view("i8").tolist()
+        nat = times.isnull().values
+        rows = [(p, dirname(p), None if nat[k] else ns[k], fid, mtype,
+                 None if texp != texp else texp)
+                for k, (p, fid, mtype, texp) in enumerate(zip(
+                    rel_paths, index["filter_id"], index["meas_type"],
+                    index["texp"]))]
+        con.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, "
+                        "?)", rows)
+
+    def _to_index(self, rows):
+        """Convert database rows into meta index of files."""
+        rows.sort()
+        base_dir = self.base_dir
+        cols = list(zip(*rows)) if rows else [[]] * 6
+        times = array([_NAT_INT if t is None else t for t in cols[2]],
+                      dtype=int64)
+        return DataFrame(od([
+            ("path", Series([join(base_dir, p) for p in cols[0]],
+                            dtype=object)),
+            ("start_acq", Series(times.view("datetime64[ns]"))),
+            ("filter_id", Series(cols[3], dtype=object)),
+            ("meas_type", Series(cols[4], dtype=object)),
+            ("texp", Series(cols[5], dtype=float))]))
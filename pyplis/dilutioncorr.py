@@ -17,12 +17,11 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 """Pyplis module for image based correction of the signal dilution effect."""
 from __future__ import (absolute_import, division)
-from numpy import asarray, linspace, exp, ones, nan
-from scipy.ndimage.filters import median_filter
+from numpy import asarray, linspace, exp, ones, nan, isnan, rint
 from matplotlib.pyplot import subplots, rcParams
 from collections import OrderedDict as od
 
-from pandas import Series, DataFrame
+from pandas import Series
 import six
 
 from pyplis import logger, print_log
@@ -31,8 +30,9 @@ from .image import Img
 from .optimisation import dilution_corr_fit
 from .model_functions import dilutioncorr_model
 from .geometry import MeasGeometry
-from .helpers import check_roi, isnum
+from .helpers import isnum
 from .imagelists import ImgList
+from .pipeline import ImgListPipeline, ExtCoeffsConsumer
 from .exceptions import ImgModifiedError
 LABEL_SIZE = rcParams["font.size"] + 2
 
@@ -65,6 +65,11 @@ class DilutionCorr(object):
             - topo_res_m: interpolation resolution applied to \
                 :class:`ElevationProfile` objects used to find intersections \
                 of pixel viewing direction with topography
+            - topo_pyrlevel: if specified (int), the distances are not \
+                retrieved individually for each line but are read from the \
+                cached topographic distance map of the measurement geometry \
+                at this pyramid level (cf. \
+                :func:`MeasGeometry.get_geometry_maps`)
 
     """
 
@@ -84,7 +89,8 @@ class DilutionCorr(object):
 
         self.settings = {"skip_pix": 5,
                          "min_slope_angle": 5.0,
-                         "topo_res_m": 5.0}
+                         "topo_res_m": 5.0,
+                         "topo_pyrlevel": None}
 
         self._masks_lines = od()
         self._dists_lines = od()
@@ -189,14 +195,44 @@ class DilutionCorr(object):
         self.update_settings(**settings)
 
         l = self.lines[line_id]
-        res = self.meas_geometry.get_topo_distances_line(l, **self.settings)
-        dists = res["dists"] * 1000.  # convert to m
-        self._geopoints[line_id] = res["geo_points"]
+        if self.settings["topo_pyrlevel"] is not None:
+            dists = self._topo_dists_line_from_map(l)
+            self._geopoints[line_id] = []
+            self._masks_lines[line_id] = ~isnan(dists)
+        else:
+            kwargs = {k: self.settings[k] for k in ("skip_pix", "topo_res_m",
+                                                    "min_slope_angle")}
+            res = self.meas_geometry.get_topo_distances_line(l, **kwargs)
+            dists = res["dists"] * 1000.  # convert to m
+            self._geopoints[line_id] = res["geo_points"]
+            self._masks_lines[line_id] = res["ok"]
         self._dists_lines[line_id] = dists
-        self._masks_lines[line_id] = res["ok"]
         self._skip_pix[line_id] = self.settings["skip_pix"]
         return dists
 
+    def _topo_dists_line_from_map(self, line):
+        """Read topographic distances along line from cached distance map.
+
+        The line needs to be defined in absolute image coordinates (i.e.
+        pyramid level 0 and no cropping), the distances (in m) are
+        retrieved at every ``skip_pix`` pixel of the line profile (nearest
+        pixel of map at pyramid level ``topo_pyrlevel``).
+        """
+        pyrlevel = int(self.settings["topo_pyrlevel"])
+        dist_map = self.meas_geometry.get_geometry_maps(
+            topo_dists=True, topo_pyrlevel=pyrlevel,
+            topo_res_m=self.settings["topo_res_m"],
+            min_slope_angle=self.settings["min_slope_angle"])["topo_dists"]
+        skip = int(self.settings["skip_pix"])
+        coords = line.profile_coords[:, ::skip]
+        fac = 2 ** pyrlevel
+        rows = (coords[0] + 0.5) / fac - 0.5
+        cols = (coords[1] + 0.5) / fac - 0.5
+        h, w = dist_map.shape
+        rows = rint(rows).clip(0, h - 1).astype(int)
+        cols = rint(cols).clip(0, w - 1).astype(int)
+        return dist_map[rows, cols]
+
     def get_radiances(self, img, line_ids=None):
         """Get radiances for dilution fit along terrain lines.
 
@@ -344,47 +380,9 @@ class DilutionCorr(object):
         """
         if not isinstance(lst, ImgList):
             raise ValueError("Invalid input type for param lst, need ImgList")
-        lst.vigncorr_mode = True
-
-        if not check_roi(roi_ambient):
-            try:
-                roi_ambient = lst.bg_model.scale_rect
-            except BaseException:
-                pass
-            if not check_roi(roi_ambient):
-                raise ValueError("Input parameter roi_ambient is not a valied"
-                                 "ROI and neither is scale_rect in background "
-                                 "model of input image list...")
-        cfn = lst.cfn
-        lst.goto_img(0)
-        nof = lst.nof
-        times = lst.acq_times
-        coeffs = []
-        i0s = []
-        ias = []
-        for k in range(nof):
-            img = lst.current_img()
-            try:
-                ia = img.crop(roi_ambient, True).mean()
-
-                ext, i0, _, _ = self.apply_dilution_fit(img=img,
-                                                        rad_ambient=ia,
-                                                        plot=False,
-                                                        **kwargs)
-                coeffs.append(ext)
-                i0s.append(i0)
-                ias.append(ia)
-            except BaseException:
-                coeffs.append(nan)
-                i0s.append(nan)
-                ias.append(nan)
-            lst.goto_next()
-        lst.goto_img(cfn)
-        if apply_median > 0:
-            coeffs = median_filter(coeffs, apply_median)
-            i0s = median_filter(i0s, apply_median)
-            ias = median_filter(ias, apply_median)
-        return DataFrame(dict(coeffs=coeffs, i0=i0s, ia=ias), index=times)
+        consumer = ExtCoeffsConsumer(self, roi_ambient, apply_median,
+                                     **kwargs)
+        return ImgListPipeline(lst, [consumer]).run()["ext_coeffs"]
 
     def correct_img(self, plume_img, ext, plume_bg_img, plume_dists,
                     plume_pix_mask):
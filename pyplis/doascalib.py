@@ -18,8 +18,10 @@
 """Pyplis module for DOAS calibration including FOV search engines."""
 from __future__ import (absolute_import, division)
 from numpy import (min, arange, asarray, zeros, column_stack,
-                   ones, nan, float64)
+                   ones, nan, float64, float32, empty, einsum, tensordot,
+                   sqrt, clip, errstate)
 from scipy.stats.stats import pearsonr
+from scipy.special import betainc
 from scipy.sparse.linalg import lsmr
 
 from datetime import datetime
@@ -39,7 +41,7 @@ from matplotlib.dates import DateFormatter
 from .glob import SPECIES_ID
 from .helpers import (shifted_color_map, mesh_from_img, get_img_maximum,
                       sub_img_to_detector_coords, map_coordinates_sub_img,
-                      exponent, rotate_xtick_labels)
+                      rotate_xtick_labels)
 
 from .optimisation import gauss_fit_2d, GAUSS_2D_PARAM_INFO
 from .image import Img
@@ -550,7 +552,8 @@ class DoasFOVEngine(object):
                           "g2dcrop": True,
                           "g2dtilt": False,
                           "blur": 4,
-                          "mergeopt": "average"}
+                          "mergeopt": "average",
+                          "corrf32": False}  # pearson corr img in float32
 
         self.data_merged = False
         self.img_stack = img_stack
@@ -663,6 +666,20 @@ class DoasFOVEngine(object):
                              "nearest or interpolation")
         self._settings["mergeopt"] = val
 
+    @property
+    def corrf32(self):
+        """Compute pearson correlation image in single precision.
+
+        Reduces memory consumption and computation time of the correlation
+        image (method pearson) by a factor of 2 at the cost of
+        numerical precision. Defaults to False.
+        """
+        return self._settings["corrf32"]
+
+    @corrf32.setter
+    def corrf32(self, val):
+        self._settings["corrf32"] = bool(val)
+
     @property
     def method(self):
         """Return method used for FOV search (e.g. pearson, ifr)."""
@@ -875,27 +892,19 @@ class DoasFOVEngine(object):
 
         return corr_img
 
-    def _det_correlation_image_pearson(self, **kwargs):
+    def _det_correlation_image_pearson(self, corrf32=False, **kwargs):
         """Determine correlation image based on pearson correlation.
 
+        See :func:`det_correlation_image_pearson`.
+
         :returns: - correlation image (pix wise value of pearson corr coeff)
+                  - image containing p-values of correlation coefficients
         """
-        h, w = self.img_stack.shape[1:]
-        corr_img = zeros((h, w), dtype=float64)
-        corr_img_err = zeros((h, w), dtype=float64)
-        cd_vec = self.doas_series.values
-        exp = int(10**exponent(h) / 4.0)
-        for i in range(h):
-            try:
-                if i % exp == 0:
-                    logger.info("FOV search: current img row (y): " + str(i))
-            except BaseException:
-                pass
-            for j in range(w):
-                # get series from stack at current pixel
-                corr_img[i, j], corr_img_err[i, j] = pearsonr(
-                    self.img_stack.stack[:, i, j], cd_vec)
+        dtype = float32 if corrf32 else float64
+        corr_img, corr_img_err = det_correlation_image_pearson(
+            self.img_stack.stack, self.doas_series.values, dtype=dtype)
         self._settings["method"] = "pearson"
+        self._settings["corrf32"] = corrf32
         return corr_img, corr_img_err
 
     def _det_correlation_image_ifr_lsmr(self, ifrlbda=1e-6, **kwargs):
@@ -1118,6 +1127,69 @@ class DoasFOVEngine(object):
         stack_data_conv = self.img_stack.stack * fov_mask_norm
         return stack_data_conv.sum((1, 2))
 
+
+def det_correlation_image_pearson(stack, vec, dtype=float64, chunk_rows=None,
+                                  max_chunk_mb=256):
+    """Compute pixel-wise pearson correlation of image stack with vector.
+
+    Vectorised equivalent of applying :func:`scipy.stats.pearsonr` to the
+    time series of each pixel in the stack. The stack is processed in
+    chunks of image rows in order to limit the memory consumption.
+
+    Parameters
+    ----------
+    stack : array
+        3D array containing image stack data (first axis is time axis, cf.
+        :attr:`ImgStack.stack`)
+    vec : array
+        data vector (e.g. DOAS column densities) with the same length as
+        the first axis of ``stack``
+    dtype
+        numerical data type used for computation (e.g. float32 to reduce
+        memory consumption), defaults to float64
+    chunk_rows : :obj:`int`, optional
+        number of image rows processed at once, if None, it is determined
+        from ``max_chunk_mb``
+    max_chunk_mb : float
+        approximate memory size of the data processed at once in MB (only
+        relevant if ``chunk_rows`` is None)
+
+    Returns
+    -------
+    tuple
+        2-element tuple containing
+
+        - :obj:`array`: correlation image (pearson correlation coefficients)
+        - :obj:`array`: image containing two-sided p-values
+
+    """
+    num, h, w = stack.shape
+    vec = asarray(vec, dtype=dtype)
+    if not len(vec) == num:
+        raise ValueError("Mismatch in lengths of input arrays")
+    if chunk_rows is None:
+        bytes_row = num * w * vec.dtype.itemsize
+        chunk_rows = int(max_chunk_mb * 1e6 / bytes_row)
+    chunk_rows = max(int(chunk_rows), 1)
+    corr_img = empty((h, w), dtype=dtype)
+    with errstate(divide="ignore", invalid="ignore"):
+        vec_norm = vec - vec.mean()
+        vec_norm /= sqrt(vec_norm.dot(vec_norm))
+        for i in range(0, h, chunk_rows):
+            logger.info("FOV search: current img row (y): %d" % i)
+            sub = stack[:, i:i + chunk_rows].astype(dtype)
+            sub -= sub.mean(axis=0)
+            norm = sqrt(einsum("ijk,ijk->jk", sub, sub))
+            corr_img[i:i + chunk_rows] = tensordot(vec_norm, sub,
+                                                   axes=(0, 0)) / norm
+        corr_img = clip(corr_img, -1.0, 1.0)
+        # two-sided p-value of t-statistic (n - 2 degrees of freedom),
+        # expressed via the regularized incomplete beta function
+        df = num - 2
+        pval_img = betainc(0.5 * df, 0.5,
+                           clip(1.0 - corr_img.astype(float64)**2, 0.0, 1.0))
+    return corr_img, pval_img.astype(dtype)
+
 # OLD STUFF
 
 # =============================================================================
@@ -21,16 +21,17 @@ from __future__ import (absolute_import, division)
 
 from numpy import (dot, sqrt, mean, nan, isnan, asarray, nanmean, nanmax,
                    nanmin, sum, arctan2, rad2deg, logical_and, ones, arange,
-                   nanstd)
-from matplotlib.dates import DateFormatter
+                   nanstd, interp)
+from matplotlib.dates import DateFormatter, date2num
 from collections import OrderedDict as od
+from concurrent.futures import ProcessPoolExecutor
 from matplotlib.pyplot import subplots, rcParams, Rectangle
 from os.path import join, isdir
 from os import getcwd
 from traceback import format_exc
 
 from pyplis import logger
-from .utils import LineOnImage
+from .utils import LineOnImage, LineProfileSampler
 from .imagelists import ImgList
 from .plumespeed import LocalPlumeProperties
 from .helpers import check_roi, exponent, roi2rect, map_roi
@@ -93,9 +94,12 @@ class EmissionRateSettings(object):
         param), hence, this input velocity is only used for lines, which do
         not have an explicit global velocity assigned. In any case, these
         velocities (whether assigned in :class:`LineOnImage`objects or here)
-        are only used if ``self.velo_mode["glob"] is True``.
+        are only used if ``self.velo_mode["glob"] is True``. Can also be a
+        :class:`pandas.Series` containing a time series of velocities (e.g.
+        retrieved using :func:`VeloCrossCorrEngine.run_rolling`), which is
+        interpolated to the acquisition time of each image.
     velo_glob_err : float
-        optional, error on prev. parameter
+        optional, error on prev. parameter (float or Series)
     bg_roi_abs : list
         background region of interest used for logging of retrieved CDs in an
         area out of the plume (can later be used for an assessment of the
@@ -141,8 +145,13 @@ class EmissionRateSettings(object):
         # along which the emission rates are retrieved.
         self.plume_props_available = od()
 
+        # IDs of lines which use the global velocity specified here (i.e.
+        # lines without own velocity when they were added)
+        self._velo_glob_lines = []
         self._velo_glob = nan
         self._velo_glob_err = nan
+        # True if the error was not set explicitly (50% of velocity)
+        self._velo_glob_err_auto = False
         self.velo_glob = velo_glob
         self.velo_glob_err = velo_glob_err
 
@@ -269,19 +278,31 @@ class EmissionRateSettings(object):
 
     @velo_glob.setter
     def velo_glob(self, val):
-        try:
-            val = float(val)
-        except BaseException:
-            raise ValueError("Invalid input, need float or int...")
-        if val < 0:
+        if isinstance(val, Series):
+            val = val.dropna().sort_index()
+            if not len(val) > 0:
+                raise ValueError("Invalid input, velocity time series is "
+                                 "empty...")
+            vmin, vmax = val.min(), val.max()
+        else:
+            try:
+                val = float(val)
+            except BaseException:
+                raise ValueError("Invalid input, need float or int...")
+            vmin, vmax = val, val
+        if vmin < 0:
             raise ValueError("Velocity must be larger than 0")
-        elif val > 40:
+        elif vmax > 40:
             logger.warning("Large value warning: input velocity exceeds 40 m/s")
         self._velo_glob = val
-        if self.velo_glob_err is None or isnan(self.velo_glob_err):
+        err = self.velo_glob_err
+        if (self._velo_glob_err_auto or err is None or
+                (not isinstance(err, Series) and isnan(err))):
             logger.warning("Global velocity error not assigned, assuming 50% of "
                  "velocity")
             self.velo_glob_err = val * 0.50
+            self._velo_glob_err_auto = True
+        self._update_velo_glob_lines()
 
     @property
     def velo_glob_err(self):
@@ -290,17 +311,65 @@ class EmissionRateSettings(object):
 
     @velo_glob_err.setter
     def velo_glob_err(self, val):
-        try:
-            val = float(val)
-        except BaseException:
-            raise ValueError("Invalid input, need float or int...")
-        if not isnan(val):
-            self._velo_glob_err = val
+        if isinstance(val, Series):
+            val = val.dropna().sort_index()
+        else:
+            try:
+                val = float(val)
+            except BaseException:
+                raise ValueError("Invalid input, need float or int...")
+            if isnan(val):
+                return
+        self._velo_glob_err = val
+        self._velo_glob_err_auto = False
+        self._update_velo_glob_lines()
+
+    def _update_velo_glob_lines(self):
+        """Assign global velocity to lines which use the value set here.
+
+        Time series are not assigned but removed from the lines, they are
+        interpolated to the acquisition time of each image during the
+        retrieval (cf. :func:`get_velo_glob`).
+        """
+        vglob, err = self.velo_glob, self.velo_glob_err
+        if isinstance(vglob, Series) or isinstance(err, Series):
+            vglob, err = nan, nan
+        for line_id in self._velo_glob_lines:
+            line = self.pcs_lines[line_id]
+            line._velo_glob, line._velo_glob_err = vglob, err
+
+    def get_velo_glob(self, acq_time=None):
+        """Get global velocity and error for a certain acquisition time.
+
+        Parameters
+        ----------
+        acq_time : datetime
+            acquisition time, only relevant if :attr:`velo_glob` (or
+            :attr:`velo_glob_err`) is a time series, which is then linearly
+            interpolated (constant extrapolation)
+
+        Returns
+        -------
+        tuple
+            2-element tuple containing velocity and error in m/s
+
+        """
+        vals = []
+        for val in (self.velo_glob, self.velo_glob_err):
+            if isinstance(val, Series):
+                if acq_time is None:
+                    raise ValueError("Global velocity is time series, "
+                                     "please provide acquisition time")
+                val = float(interp(date2num(acq_time),
+                                   date2num(val.index.to_pydatetime()),
+                                   val.values))
+            vals.append(val)
+        return tuple(vals)
 
     def _check_velo_glob_access(self):
         """Check if global velocity information is accessible for all lines."""
         vglob = self.velo_glob
-        if not isnan(float(vglob)):
+        if isinstance(vglob, Series) or not isnan(float(vglob)):
             return True
         for l in self.pcs_lines.values():
             try:
@@ -327,13 +396,9 @@ class EmissionRateSettings(object):
         try:
             line.velo_glob  # raises exception if not assigned
         except BaseException:
-            try:
-                line.velo_glob = self.velo_glob
-                err = self.velo_glob_err
-                if isinstance(err, float) and not isnan(err):
-                    line.velo_glob_err = err
-            except BaseException:
-                pass
+            # line uses global velocity of this object (also if the latter
+            # changes, cf. velo_glob)
+            self._velo_glob_lines.append(line.line_id)
         try:
             line.plume_props  # raises exception if not assigned
             self.plume_props_available[line.line_id] = 1
@@ -344,6 +409,7 @@ class EmissionRateSettings(object):
             self.plume_props_available[line.line_id] = 0
 
         self.pcs_lines[line.line_id] = line
+        self._update_velo_glob_lines()
 
     def __str__(self):
         s = "\npyplis settings for emission rate retrieval\n"
@@ -357,8 +423,12 @@ class EmissionRateSettings(object):
         s += "\nVelocity retrieval:\n"
         for k, v in six.iteritems(self.velo_modes):
             s += "%s: %s\n" % (k, v)
-        s += "\nGlobal velocity: v = (%2f +/- %.2f) m/s" % (self.velo_glob,
-                                                            self.velo_glob_err)
+        if isinstance(self.velo_glob, Series):
+            s += ("\nGlobal velocity: time series (%d values, mean %.2f m/s)"
+                  % (len(self.velo_glob), self.velo_glob.mean()))
+        else:
+            s += ("\nGlobal velocity: v = (%2f +/- %.2f) m/s"
+                  % (self.velo_glob, self.velo_glob_err))
         s += "\nAA sensitivity corr: %s\n" % self.senscorr
         s += "Dilution correction: %s\n" % self.dilcorr
         s += "Minimum considered CD: %s cm-2\n" % self.min_cd
@@ -589,6 +659,27 @@ class EmissionRates(object):
                 self.__dict__[key] = df[key].values
         return self
 
+    def extend(self, other):
+        """Append results of another result class (e.g. following in time).
+
+        Parameters
+        ----------
+        other : EmissionRates
+            emission rate results of same line and velocity mode
+
+        Returns
+        -------
+        EmissionRates
+            this object
+
+        """
+        if not isinstance(other, EmissionRates):
+            raise ValueError("Invalid input, need EmissionRates class")
+        for key in self.to_dict():
+            self.__dict__[key] = (list(self.__dict__[key]) +
+                                  list(other.__dict__[key]))
+        return self
+
     def plot_velo_eff(self, yerr=True, label=None, ax=None, date_fmt=None,
                       **kwargs):
         """Plot emission rate time series.
@@ -1129,7 +1220,8 @@ class EmissionRateAnalysis(object):
         # offset 0 for the retrieval
         lst.calib_mode = True
 
-        if self.settings.velo_glob:
+        vglob = self.settings.velo_glob
+        if not isinstance(vglob, Series) and vglob:
             try:
                 float(self.velo_glob)
             except BaseException:
@@ -1270,7 +1362,8 @@ class EmissionRateAnalysis(object):
         logger.warning("Old name of method run_retrieval")
         return self.run_retrieval(**kwargs)
 
-    def run_retrieval(self, start_index=0, stop_index=None, check_list=True):
+    def run_retrieval(self, start_index=0, stop_index=None, check_list=True,
+                      n_workers=1):
         r"""Calculate emission rates of image list.
 
         Performs emission rate analysis for each line in ``self.pcs_lines``
@@ -1295,6 +1388,14 @@ class EmissionRateAnalysis(object):
             last image in list
         check_list : bool
             if True, :func:`check_and_init_list` is called before analysis
+        n_workers : int
+            number of worker processes. If > 1, the index range is split into
+            ``n_workers`` chunks of consecutive images which are analysed in
+            parallel (each worker uses a copy of this object, i.e. of the
+            image list including calibration, background model and dark
+            lists). The results of all chunks are merged in time order.
+            Only supported for velocity modes ``glob`` and ``flow_raw``
+            which do not depend on previous images in the list
 
         Returns
         -------
@@ -1308,16 +1409,62 @@ class EmissionRateAnalysis(object):
         """
         if check_list:
             self.check_and_init_list()
-        lst = self.imglist
         if stop_index is None:
-            stop_index = lst.nof - 1
+            stop_index = self.imglist.nof - 1
+        if n_workers > 1:
+            counter = self._run_retrieval_parallel(start_index, stop_index,
+                                                   n_workers)
+        else:
+            counter = self._run_retrieval(start_index, stop_index)
 
+        if not counter > 0:
+            raise ValueError("Emission rate retrieval failed for all images "
+                             "in image list...")
+        logger.info("Emission rates could be successfully retrieved for %d of %d"
+              "images in image list" % (counter, (stop_index - start_index)))
+        return self.results
+
+    def _run_retrieval(self, start_index, stop_index):
+        """Run emission rate retrieval for images in index range.
+
+        Returns
+        -------
+        int
+            number of images for which emission rates could be retrieved
+
+        """
+        lst = self.imglist
         num = lst._iter_num(start_index, stop_index)
+        lst.goto_img(start_index)
+        state = self._init_retrieval(num)
+        for k in range(num):
+            self._retrieve_current_img(state, k)
+            lst.goto_next()
+        return self._finish_retrieval(state)
+
+    def _init_retrieval(self, num, set_optflow_mode=True):
+        """Initialise retrieval for ``num`` images starting at current index.
+
+        Parameters
+        ----------
+        num : int
+            number of images analysed
+        set_optflow_mode : bool
+            if True, the optical flow mode of the image list is activated or
+            (if not required) deactivated. If False, it is only activated if
+            required
+
+        Returns
+        -------
+        dict
+            retrieval state passed to :func:`_retrieve_current_img` and
+            :func:`_finish_retrieval`
+
+        """
+        lst = self.imglist
         flow = self.imglist_optflow.optflow
-        s = self.settings
         results = self.init_results()
         dists, dist_errs = self.get_pix_dist_info_all_lines()
-        lst.goto_img(start_index)
         try:
             cd_err = lst.calib_data.err()
         except ValueError as e:
@@ -1327,110 +1474,185 @@ class EmissionRateAnalysis(object):
         self._write_meta(dists, dist_errs, cd_err)
 
         # init parameters for main loop
-        mmol = s.mmol
         if self.flow_required:
             self.imglist_optflow.optflow_mode = True
-        else:
+        elif set_optflow_mode:
             lst.optflow_mode = False  # should be much faster
-        ts, bg_mean, bg_std = [], [], []
-        counter = 0
+        lines = self.pcs_lines
+        # profiles of all lines are extracted at once
+        sampler = LineProfileSampler(lines)
+        samplers_single = od([(pcs_id, LineProfileSampler({pcs_id: pcs}))
+                              for pcs_id, pcs in six.iteritems(lines)])
+        return dict(num=num, flow=flow, results=results, dists=dists,
+                    dist_errs=dist_errs, cd_err=cd_err, ts=[], bg_mean=[],
+                    bg_std=[], counter=0, sampler=sampler,
+                    samplers_single=samplers_single,
+                    pnum=int(10**exponent(num) / 4.0))
+
+    def _finish_retrieval(self, state):
+        """Write background ROI info and return number of successful images.
+        """
+        ts = state["ts"]
+        self.bg_roi_info["mean"] = Series(state["bg_mean"], ts)
+        self.bg_roi_info["std"] = Series(state["bg_std"], ts)
+        return state["counter"]
+
+    def _retrieve_current_img(self, state, k):
+        """Retrieve emission rates from current image in list.
+
+        Parameters
+        ----------
+        state : dict
+            retrieval state (see :func:`_init_retrieval`)
+        k : int
+            iteration index (relative to first analysed image)
+
+        """
+        lst = self.imglist
+        s = self.settings
+        flow = state["flow"]
+        results = state["results"]
+        dists, dist_errs = state["dists"], state["dist_errs"]
+        cd_err = state["cd_err"]
+        ts, bg_mean, bg_std = state["ts"], state["bg_mean"], state["bg_std"]
+        sampler = state["sampler"]
+        samplers_single = state["samplers_single"]
+        num, pnum = state["num"], state["pnum"]
+        mmol = s.mmol
         fl_sigma_tol = flow.settings.hist_sigma_tol
         fl_min_len = flow.settings.min_length
-        roi_bg_abs = self.settings.bg_roi_abs
+        roi_bg_abs = s.bg_roi_abs
         velo_modes = s.velo_modes
         min_cd = s.min_cd
         min_cd_flow = min_cd if isnan(s.min_cd_flow) else s.min_cd_flow
         gauss_fit = s.velo_dir_multigauss
         lines = self.pcs_lines
-        pnum = int(10**exponent(num) / 4.0)
         imin, imax = s.ref_check_lower_lim, s.ref_check_upper_lim
-        for k in range(num):
-            img = lst.current_img()
-            t = lst.current_time()
-            ts.append(t)
-            ok = True
-            try:
-                sub = img.crop(roi_bg_abs, new_img=True)
-                # sub = img.img[roi_bg[1] : roi_bg[3], roi_bg[0] : roi_bg[2]]
-                avg = sub.mean()
-                bg_mean.append(avg)
-                bg_std.append(sub.std())
-                if self.settings.ref_check_mode:
-                    if not imin < avg < imax:
-                        ok = False
-            except BaseException:
-                logger.warning("Failed to retrieve data within background ROI (bg_roi)"
-                     "writing NaN")
-                bg_std.append(nan)
-                bg_mean.append(nan)
-                if self.settings.ref_check_mode:
+
+        img = lst.current_img()
+        t = lst.current_time()
+        ts.append(t)
+        ok = True
+        try:
+            sub = img.crop(roi_bg_abs, new_img=True)
+            # sub = img.img[roi_bg[1] : roi_bg[3], roi_bg[0] : roi_bg[2]]
+            avg = sub.mean()
+            bg_mean.append(avg)
+            bg_std.append(sub.std())
+            if self.settings.ref_check_mode:
+                if not imin < avg < imax:
                     ok = False
-            if ok:
-                for pcs_id, pcs in six.iteritems(lines):
-                    res = results[pcs_id]
-                    n = pcs.normal_vector
-                    cds = pcs.get_line_profile(img)
-                    cond = cds > min_cd
-                    cds = cds[cond]
-                    distarr = dists[pcs_id][cond]
-                    disterr = dist_errs[pcs_id]
-
-                    if velo_modes["glob"]:
-                        try:
-                            vglob, vglob_err = pcs.velo_glob, pcs.velo_glob_err
-                        except BaseException:
-                            vglob, vglob_err = self.velo_glob,\
-                                self.velo_glob_err
-                        phi, phi_err = det_emission_rate(cds, vglob, distarr,
-                                                         cd_err, vglob_err,
-                                                         disterr, mmol)
-                        if isnan(phi):
-                            logger.info(cds)
-                            raise ValueError
-                        res["glob"]._start_acq.append(t)
-                        res["glob"]._phi.append(phi)
-                        res["glob"]._phi_err.append(phi_err)
-                        res["glob"]._velo_eff.append(vglob)
-                        res["glob"]._velo_eff_err.append(vglob_err)
-                    dx, dy = None, None
-                    if velo_modes["flow_raw"]:
-                        delt = flow.del_t
-
-                        # retrieve diplacement vectors along line
-                        dx = pcs.get_line_profile(flow.flow[:, :, 0])
-                        dy = pcs.get_line_profile(flow.flow[:, :, 1])
-
-                        # detemine array containing effective velocities
-                        # through the line using dot product with line normal
-                        veff_arr = dot(n, (dx, dy))[cond] * distarr / delt
-
-                        # Calculate mean of effective velocity through l and
-                        # uncertainty using 2 sigma confidence of standard
-                        # deviation
-                        veff_avg = veff_arr.mean()
-                        veff_err = veff_avg * \
-                            self.settings.optflow_err_rel_veff
-
-                        phi, phi_err = det_emission_rate(cds, veff_arr,
-                                                         distarr, cd_err,
-                                                         veff_err, disterr,
-                                                         mmol)
-                        res["flow_raw"]._start_acq.append(t)
-                        res["flow_raw"]._phi.append(phi)
-                        res["flow_raw"]._phi_err.append(phi_err)
-
-                        # note that the velocity is likely underestimated due
-                        # to low contrast regions (e.g. out of the plume, this
-                        # can be accounted for by setting an appropriate CD
-                        # minimum threshold in settings, such that the
-                        # retrieval is only applied to pixels exceeding a
-                        # certain column density)
-                        res["flow_raw"]._velo_eff.append(veff_avg)
-                        res["flow_raw"]._velo_eff_err.append(veff_err)
-
-                    props = pcs.plume_props
-                    verr = None
-                    if velo_modes["flow_histo"]:
+        except BaseException:
+            logger.warning("Failed to retrieve data within background ROI (bg_roi)"
+                 "writing NaN")
+            bg_std.append(nan)
+            bg_mean.append(nan)
+            if self.settings.ref_check_mode:
+                ok = False
+        if ok:
+            cd_profiles = sampler.get_profiles(img)
+            flow_profiles = None
+            for pcs_id, pcs in six.iteritems(lines):
+                res = results[pcs_id]
+                n = pcs.normal_vector
+                cds = cd_profiles[pcs_id]
+                cond = cds > min_cd
+                cds = cds[cond]
+                distarr = dists[pcs_id][cond]
+                disterr = dist_errs[pcs_id]
+
+                if velo_modes["glob"]:
+                    try:
+                        vglob, vglob_err = pcs.velo_glob, pcs.velo_glob_err
+                    except BaseException:
+                        vglob, vglob_err = self.settings.get_velo_glob(t)
+                    phi, phi_err = det_emission_rate(cds, vglob, distarr,
+                                                     cd_err, vglob_err,
+                                                     disterr, mmol)
+                    if isnan(phi):
+                        logger.info(cds)
+                        raise ValueError
+                    res["glob"]._start_acq.append(t)
+                    res["glob"]._phi.append(phi)
+                    res["glob"]._phi_err.append(phi_err)
+                    res["glob"]._velo_eff.append(vglob)
+                    res["glob"]._velo_eff_err.append(vglob_err)
+                dx, dy = None, None
+                if velo_modes["flow_raw"]:
+                    delt = flow.del_t
+
+                    # retrieve diplacement vectors along line
+                    if flow_profiles is None:
+                        flow_profiles = sampler.get_profiles(flow.flow)
+                    dx, dy = flow_profiles[pcs_id]
+
+                    # detemine array containing effective velocities
+                    # through the line using dot product with line normal
+                    veff_arr = dot(n, (dx, dy))[cond] * distarr / delt
+
+                    # Calculate mean of effective velocity through l and
+                    # uncertainty using 2 sigma confidence of standard
+                    # deviation
+                    veff_avg = veff_arr.mean()
+                    veff_err = veff_avg * \
+                        self.settings.optflow_err_rel_veff
+
+                    phi, phi_err = det_emission_rate(cds, veff_arr,
+                                                     distarr, cd_err,
+                                                     veff_err, disterr,
+                                                     mmol)
+                    res["flow_raw"]._start_acq.append(t)
+                    res["flow_raw"]._phi.append(phi)
+                    res["flow_raw"]._phi_err.append(phi_err)
+
+                    # note that the velocity is likely underestimated due
+                    # to low contrast regions (e.g. out of the plume, this
+                    # can be accounted for by setting an appropriate CD
+                    # minimum threshold in settings, such that the
+                    # retrieval is only applied to pixels exceeding a
+                    # certain column density)
+                    res["flow_raw"]._velo_eff.append(veff_avg)
+                    res["flow_raw"]._velo_eff_err.append(veff_err)
+
+                props = pcs.plume_props
+                verr = None
+                if velo_modes["flow_histo"]:
+                    if s.plume_props_available[pcs_id]:
+                        idx = k
+                    else:
+                        # get mask specifying plume pixels
+                        mask = lst.get_thresh_mask(min_cd_flow)
+                        props.\
+                            get_and_append_from_farneback(
+                                flow,
+                                line=pcs,
+                                pix_mask=mask,
+                                dir_multi_gauss=gauss_fit)
+                        idx = -1
+
+                    # logger.info("IMGLIST CTIME: %s "
+                    #       % self.imglist.current_time())
+                    # get effective velocity through the pcs based on
+                    # results from histogram analysis
+                    (v,
+                     verr) = props.get_velocity(idx, distarr.mean(),
+                                                disterr,
+                                                pcs.normal_vector,
+                                                sigma_tol=fl_sigma_tol)
+                    # logger.info("HISTO VEFF: %.2f m/s" %v)
+                    phi, phi_err = det_emission_rate(cds, v, distarr,
+                                                     cd_err, verr, disterr,
+                                                     mmol)
+
+                    res["flow_histo"]._start_acq.append(t)
+                    res["flow_histo"]._phi.append(phi)
+                    res["flow_histo"]._phi_err.append(phi_err)
+                    res["flow_histo"]._velo_eff.append(v)
+                    res["flow_histo"]._velo_eff_err.append(verr)
+
+                if velo_modes["flow_hybrid"]:
+                    # get results from local plume properties analysis
+                    if not velo_modes["flow_histo"]:
                         if s.plume_props_available[pcs_id]:
                             idx = k
                         else:
@@ -1444,119 +1666,85 @@ class EmissionRateAnalysis(object):
                                     dir_multi_gauss=gauss_fit)
                             idx = -1
 
-                        # logger.info("IMGLIST CTIME: %s "
-                        #       % self.imglist.current_time())
+                    if dx is None:
+                        # extract raw diplacement vectors along line
+                        if flow_profiles is None:
+                            flow_profiles = sampler.get_profiles(
+                                flow.flow)
+                        dx, dy = flow_profiles[pcs_id]
+
+                    if verr is None:
                         # get effective velocity through the pcs based on
                         # results from histogram analysis
-                        (v,
+                        (_,
                          verr) = props.get_velocity(idx, distarr.mean(),
                                                     disterr,
                                                     pcs.normal_vector,
                                                     sigma_tol=fl_sigma_tol)
-                        # logger.info("HISTO VEFF: %.2f m/s" %v)
-                        phi, phi_err = det_emission_rate(cds, v, distarr,
-                                                         cd_err, verr, disterr,
-                                                         mmol)
-
-                        res["flow_histo"]._start_acq.append(t)
-                        res["flow_histo"]._phi.append(phi)
-                        res["flow_histo"]._phi_err.append(phi_err)
-                        res["flow_histo"]._velo_eff.append(v)
-                        res["flow_histo"]._velo_eff_err.append(verr)
-
-                    if velo_modes["flow_hybrid"]:
-                        # get results from local plume properties analysis
-                        if not velo_modes["flow_histo"]:
-                            if s.plume_props_available[pcs_id]:
-                                idx = k
-                            else:
-                                # get mask specifying plume pixels
-                                mask = lst.get_thresh_mask(min_cd_flow)
-                                props.\
-                                    get_and_append_from_farneback(
-                                        flow,
-                                        line=pcs,
-                                        pix_mask=mask,
-                                        dir_multi_gauss=gauss_fit)
-                                idx = -1
-
-                        if dx is None:
-                            # extract raw diplacement vectors along line
-                            dx = pcs.get_line_profile(flow.flow[:, :, 0])
-                            dy = pcs.get_line_profile(flow.flow[:, :, 1])
-
-                        if verr is None:
-                            # get effective velocity through the pcs based on
-                            # results from histogram analysis
-                            (_,
-                             verr) = props.get_velocity(idx, distarr.mean(),
-                                                        disterr,
-                                                        pcs.normal_vector,
-                                                        sigma_tol=fl_sigma_tol)
-                        # determine orientation angles and magnitudes along
-                        # raw optflow output
-                        phis = rad2deg(arctan2(dx, -dy))[cond]
-                        mag = sqrt(dx**2 + dy**2)[cond]
-
-                        # get expectation values of predominant displacement
-                        # vector
-                        min_len = (props.len_mu[idx] - props.len_sigma[idx])
-
-                        min_len = max([min_len, fl_min_len])
+                    # determine orientation angles and magnitudes along
+                    # raw optflow output
+                    phis = rad2deg(arctan2(dx, -dy))[cond]
+                    mag = sqrt(dx**2 + dy**2)[cond]
+
+                    # get expectation values of predominant displacement
+                    # vector
+                    min_len = (props.len_mu[idx] - props.len_sigma[idx])
+
+                    min_len = max([min_len, fl_min_len])
 
 # ==============================================================================
 #                         print "LEN_MU: %.2f" %props.len_mu[idx]
 #                         print "LEN_SIGMA: %.2f" %props.len_sigma[idx]
 #                         print "MIN LENGTH: %s" %min_len
 # ==============================================================================
-                        dir_min = (props.dir_mu[idx] -
-                                   fl_sigma_tol * props.dir_sigma[idx])
-                        dir_max = (props.dir_mu[idx] +
-                                   fl_sigma_tol * props.dir_sigma[idx])
-
-                        # get bool mask for indices along the pcs
-                        bad = ~ (logical_and(phis > dir_min, phis < dir_max) *
-                                 (mag > min_len))
-
-                        frac_bad = sum(bad) / float(len(bad))
-                        indices = arange(len(bad))[bad]
-                        # now check impact of ill-constraint motion vectors
-                        # on ICA
-                        ica_fac_ok = sum(cds[~bad] / sum(cds))
-
-                        vec = props.displacement_vector(idx)
-
-                        flc = flow.replace_trash_vecs(displ_vec=vec,
-                                                      min_len=min_len,
-                                                      dir_low=dir_min,
-                                                      dir_high=dir_max)
-
-                        delt = flow.del_t
-                        dx = pcs.get_line_profile(flc.flow[:, :, 0])
-                        dy = pcs.get_line_profile(flc.flow[:, :, 1])
-                        veff_arr = dot(n, (dx, dy))[cond] * distarr / delt
-
-                        # Calculate mean of effective velocity through l and
-                        # uncertainty using 2 sigma confidence of standard
-                        # deviation
-                        veff_avg = veff_arr.mean()
-                        fl_err = veff_avg * self.settings.optflow_err_rel_veff
-
-                        # logger.info("Assumed intrinsic optflow error veff=%.2f m/s"
-                        #       % fl_err)
-                        # neglect uncertainties in the successfully constraint
-                        # flow vectors along the pcs by initiating an zero
-                        # array ...
-                        veff_err_arr = ones(len(veff_arr)) * fl_err
-                        # ... and set the histo errors for the indices of
-                        # ill-constraint flow vectors on the pcs (see above)
-                        veff_err_arr[indices] = verr
-
-                        phi, phi_err = det_emission_rate(cds, veff_arr,
-                                                         distarr, cd_err,
-                                                         veff_err_arr,
-                                                         disterr, mmol)
-                        veff_err_avg = veff_err_arr.mean()
+                    dir_min = (props.dir_mu[idx] -
+                               fl_sigma_tol * props.dir_sigma[idx])
+                    dir_max = (props.dir_mu[idx] +
+                               fl_sigma_tol * props.dir_sigma[idx])
+
+                    # get bool mask for indices along the pcs
+                    bad = ~ (logical_and(phis > dir_min, phis < dir_max) *
+                             (mag > min_len))
+
+                    frac_bad = sum(bad) / float(len(bad))
+                    indices = arange(len(bad))[bad]
+                    # now check impact of ill-constraint motion vectors
+                    # on ICA
+                    ica_fac_ok = sum(cds[~bad] / sum(cds))
+
+                    vec = props.displacement_vector(idx)
+
+                    flc = flow.replace_trash_vecs(displ_vec=vec,
+                                                  min_len=min_len,
+                                                  dir_low=dir_min,
+                                                  dir_high=dir_max)
+
+                    delt = flow.del_t
+                    dx, dy = samplers_single[pcs_id].get_profiles(
+                        flc.flow)[pcs_id]
+                    veff_arr = dot(n, (dx, dy))[cond] * distarr / delt
+
+                    # Calculate mean of effective velocity through l and
+                    # uncertainty using 2 sigma confidence of standard
+                    # deviation
+                    veff_avg = veff_arr.mean()
+                    fl_err = veff_avg * self.settings.optflow_err_rel_veff
+
+                    # logger.info("Assumed intrinsic optflow error veff=%.2f m/s"
+                    #       % fl_err)
+                    # neglect uncertainties in the successfully constraint
+                    # flow vectors along the pcs by initiating an zero
+                    # array ...
+                    veff_err_arr = ones(len(veff_arr)) * fl_err
+                    # ... and set the histo errors for the indices of
+                    # ill-constraint flow vectors on the pcs (see above)
+                    veff_err_arr[indices] = verr
+
+                    phi, phi_err = det_emission_rate(cds, veff_arr,
+                                                     distarr, cd_err,
+                                                     veff_err_arr,
+                                                     disterr, mmol)
+                    veff_err_avg = veff_err_arr.mean()
 
 
 # ==============================================================================
@@ -1564,36 +1752,83 @@ class EmissionRateAnalysis(object):
 #                               % (pcs_id, frac_bad))
 #                         logger.info("Kappa: %.3f %%" %(ica_fac_ok))
 # ==============================================================================
-                        # logger.info("Avg. eff. velocity (hybrid) = %.2f +/- %.2f"
-                        #       %(veff_avg, veff_err_avg))
-                        res["flow_hybrid"]._start_acq.append(t)
-                        res["flow_hybrid"]._phi.append(phi)
-                        res["flow_hybrid"]._phi_err.append(phi_err)
-                        res["flow_hybrid"]._velo_eff.append(veff_avg)
-                        res["flow_hybrid"]._velo_eff_err.append(veff_err_avg)
-                        res["flow_hybrid"]._frac_optflow_ok.append(
-                            1 - frac_bad)
-                        res["flow_hybrid"]._frac_optflow_ok_ica.append(
-                            ica_fac_ok)
-                counter += 1
-            else:
-                logger.warning("Skipped image no. %d" % k)
-            try:
-                if k % pnum == 0:
-                    logger.info("Progress: %d (%d)" % (k, num))
-            except:
-                pass
-            lst.goto_next()
+                    # logger.info("Avg. eff. velocity (hybrid) = %.2f +/- %.2f"
+                    #       %(veff_avg, veff_err_avg))
+                    res["flow_hybrid"]._start_acq.append(t)
+                    res["flow_hybrid"]._phi.append(phi)
+                    res["flow_hybrid"]._phi_err.append(phi_err)
+                    res["flow_hybrid"]._velo_eff.append(veff_avg)
+                    res["flow_hybrid"]._velo_eff_err.append(veff_err_avg)
+                    res["flow_hybrid"]._frac_optflow_ok.append(
+                        1 - frac_bad)
+                    res["flow_hybrid"]._frac_optflow_ok_ica.append(
+                        ica_fac_ok)
+            state["counter"] += 1
+        else:
+            logger.warning("Skipped image no. %d" % k)
+        try:
+            if k % pnum == 0:
+                logger.info("Progress: %d (%d)" % (k, num))
+        except:
+            pass
 
-        self.bg_roi_info["mean"] = Series(bg_mean, ts)
-        self.bg_roi_info["std"] = Series(bg_std, ts)
+    def _run_retrieval_parallel(self, start_index, stop_index, n_workers):
+        """Run emission rate retrieval in chunks using a process pool.
 
-        if not counter > 0:
-            raise ValueError("Emission rate retrieval failed for all images "
-                             "in image list...")
-        logger.info("Emission rates could be successfully retrieved for %d of %d"
-              "images in image list" % (counter, (stop_index - start_index)))
-        return self.results
+        Returns
+        -------
+        int
+            number of images for which emission rates could be retrieved
+
+        """
+        modes = self.settings.velo_modes
+        if modes["flow_histo"] or modes["flow_hybrid"]:
+            raise ValueError("Parallel emission rate retrieval is only "
+                             "supported for velocity modes glob and flow_raw")
+        lst = self.imglist
+        step = lst.skip_files + 1
+        num = lst._iter_num(start_index, stop_index)
+        n_workers = max(1, min(n_workers, num))
+        # index ranges of chunks
+        bounds = [start_index + step * (num * i // n_workers)
+                  for i in range(n_workers + 1)]
+        # the list state (incl. optflow mode) is set up once here, such that
+        # all workers get copies of the same state
+        self.init_results()
+        if self.flow_required:
+            self.imglist_optflow.optflow_mode = True
+        else:
+            lst.optflow_mode = False
+        lst.goto_img(start_index)
+        logger.info("Running emission rate retrieval in %d worker processes"
+                    % n_workers)
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(_run_retrieval_chunk, self,
+                                       bounds[i], bounds[i + 1])
+                       for i in range(n_workers)]
+            chunks = [future.result() for future in futures]
+
+        results = self.init_results()
+        counter = 0
+        bg_mean, bg_std = [], []
+        for res_chunk, bg_info, num_ok in chunks:
+            counter += num_ok
+            bg_mean.append(bg_info["mean"])
+            bg_std.append(bg_info["std"])
+            for line_id, mode_dict in six.iteritems(res_chunk):
+                for mode, res in six.iteritems(mode_dict):
+                    results[line_id][mode].extend(res)
+        self.bg_roi_info["mean"] = pd.concat(bg_mean)
+        self.bg_roi_info["std"] = pd.concat(bg_std)
+
+        dists, dist_errs = self.get_pix_dist_info_all_lines()
+        try:
+            cd_err = lst.calib_data.err()
+        except ValueError as e:
+            logger.warning("Calibration error could not be accessed: {}".format(repr(e)))
+            cd_err = None
+        self._write_meta(dists, dist_errs, cd_err)
+        return counter
 
     def add_pcs_line(self, line):
         """Add one analysis line to this list.
@@ -1710,6 +1945,29 @@ def det_emission_rate(cds, velo, pix_dists, cds_err=None, velo_err=None,
     return phi, phi_err
 
 
+def _run_retrieval_chunk(analysis, start_index, stop_index):
+    """Run emission rate retrieval for one chunk (used in worker processes).
+
+    Parameters
+    ----------
+    analysis : EmissionRateAnalysis
+        copy of analysis object (image list must be initiated)
+    start_index : int
+        index of first image of chunk
+    stop_index : int
+        stop index of chunk
+
+    Returns
+    -------
+    tuple
+        3-element tuple containing results, background ROI info and the
+        number of images for which emission rates could be retrieved
+
+    """
+    counter = analysis._run_retrieval(start_index, stop_index)
+    return analysis.results, analysis.bg_roi_info, counter
+
+
 class EmissionRateResults(EmissionRates):
     """Old name of :class:`OptflowFarneback`."""
 
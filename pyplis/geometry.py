@@ -20,8 +20,14 @@
 from __future__ import (absolute_import, division, print_function)
 from numpy import (nan, arctan, deg2rad, linalg, sqrt, abs, array, radians,
                    sin, cos, arcsin, tan, rad2deg, linspace, isnan, asarray,
-                   arange, argmin, newaxis)
+                   arange, argmin, newaxis, arctan2, interp, where, clip,
+                   isfinite, ceil, errstate, meshgrid, load, savez_compressed,
+                   ascontiguousarray)
 from collections import OrderedDict as od
+from hashlib import sha1
+from os.path import join, exists, isdir
+from os import makedirs
+from scipy.ndimage import map_coordinates
 
 from matplotlib.pyplot import figure
 from copy import deepcopy
@@ -42,6 +48,37 @@ if GEONUMAVAILABLE:
         from geonum.exceptions import TopoAccessError
 
 
+class _TopoGrid(object):
+    """Regular elevation grid for vectorised access of topographic data.
+
+    Converts the data of a :class:`geonum.TopoData` object once and
+    provides bilinear interpolation of altitudes at arbitrary (arrays of)
+    coordinates. Coordinates outside of the grid yield NaN.
+    """
+
+    def __init__(self, topo_data):
+        self.lats = asarray(topo_data.lats, dtype=float)
+        self.lons = asarray(topo_data.lons, dtype=float)
+        self.data = asarray(topo_data.data, dtype=float)
+
+    @staticmethod
+    def _grid_index(vals, grid):
+        """Convert coordinates into fractional grid indices."""
+        idx = arange(len(grid), dtype=float)
+        if grid[0] > grid[-1]:
+            grid, idx = grid[::-1], idx[::-1]
+        # out of range values are mapped outside the grid (-> NaN)
+        return interp(vals, grid, idx, left=-1., right=len(grid))
+
+    def __call__(self, lats, lons):
+        """Get altitudes at input coordinates (bilinear interpolation)."""
+        lats, lons = asarray(lats, dtype=float), asarray(lons, dtype=float)
+        coords = [self._grid_index(lats.ravel(), self.lats),
+                  self._grid_index(lons.ravel(), self.lons)]
+        z = map_coordinates(self.data, coords, order=1, cval=nan)
+        return z.reshape(lats.shape)
+
+
 class MeasGeometry(object):
     """Class for calculations and management of the measurement geometry.
 
@@ -135,11 +172,15 @@ class MeasGeometry(object):
     wind_info : dict
         dictionary conatining meteorology information (see :attr:`wind`
         for valid keys)
+    cache_dir : str, optional
+        directory where geometry maps (e.g. plume and topographic distances
+        of all pixels) are stored, see :func:`get_geometry_maps`. If None,
+        the maps are only cached in memory
 
     """
 
     def __init__(self, source_info=None, cam_info=None, wind_info=None,
-                 auto_topo_access=True):
+                 auto_topo_access=True, cache_dir=None):
 
         if source_info is None:
             source_info = {}
@@ -176,6 +217,15 @@ class MeasGeometry(object):
         self.auto_topo_access = auto_topo_access
         self.geo_setup = GeoSetup(id=self.cam_id)
 
+        self.cache_dir = cache_dir
+        # geometry maps cached in memory (keys are parameter hashes), the
+        # least recently used maps are removed if more than
+        # max_cached_geometries configurations are stored
+        self._geometry_maps = od()
+        self.max_cached_geometries = 4
+        # topographic data and corresponding identifier (cf. topo_id)
+        self._topo_id = None
+
         self.update_source_specs(source_info, update_geosetup=False)
         self.update_cam_specs(cam_info, update_geosetup=False)
         self.update_wind_specs(wind_info, update_geosetup=False)
@@ -773,7 +823,7 @@ class MeasGeometry(object):
         delx = abs(x1 - x0)
         dely = abs(y1 - y0)
 
-        l = sqrt(delx ** 2 + dely ** 2)
+        l = int(sqrt(delx ** 2 + dely ** 2))
         x = linspace(x0, x1, l)
         y = linspace(y0, y1, l)
         dx = self._cam["pix_width"] * (x - self._cam["pixnum_x"] / 2)
@@ -849,7 +899,7 @@ class MeasGeometry(object):
         return (d, d_err, geo_point)
 
     def get_topo_distances_line(self, line, skip_pix=30, topo_res_m=5.,
-                                min_slope_angle=5.):
+                                min_slope_angle=5., vectorised=True):
         """Retrieve distances to topography for a line on an image.
 
         Calculates distances to topography based on pixels on the line. This is
@@ -865,6 +915,10 @@ class MeasGeometry(object):
             (is interpolated)
         :param float min_slope_angle: mininum angle of slope, pixels
             pointing into flatter topographic areas are ignored
+        :param bool vectorised: if True, the intersections of all pixels are
+            retrieved at once using :func:`get_topo_distances_pixels`,
+            else, a :class:`geonum.ElevationProfile` is computed for each
+            pixel (slow)
         """
         try:
             logger.info(self.cam)
@@ -897,6 +951,13 @@ class MeasGeometry(object):
         azims, elevs = azims[::int(skip_pix)], elevs[::int(skip_pix)]
         i_pos, j_pos = i_pos[::int(skip_pix)], j_pos[::int(skip_pix)]
 
+        if vectorised:
+            res = self.get_topo_distances_pixels(azims, elevs, topo_res_m,
+                                                 min_slope_angle)
+            res["i_pos"] = i_pos
+            res["j_pos"] = j_pos
+            return res
+
         max_dist = self.geo_setup.vectors["source2cam"].magnitude * 1.10
         # initiate results
         res = {"dists": [],
@@ -939,6 +1000,155 @@ class MeasGeometry(object):
             res[key] = asarray(res[key])
         return res
 
+    def get_topo_distances_pixels(self, azims, elevs, topo_res_m=5.,
+                                  min_slope_angle=5., max_dist=None,
+                                  local_tolerance=3, chunk_size=256,
+                                  geo_points=True):
+        """Retrieve distances to topography for many viewing directions.
+
+        Vectorised version of the topographic distance retrieval. The
+        topographic data of the geo setup (grid in ``geo_setup.topo_data``) is
+        sampled along the azimuth directions of all input viewing directions
+        at once (bilinear interpolation on the regular DEM grid) and the first
+        intersection of each viewing direction with the topography is
+        determined for all directions simultaneously. The results correspond
+        to :func:`geonum.ElevationProfile.get_first_intersection`, the
+        intersection distance is, however, interpolated between the profile
+        samples and the profiles start at the exact camera position.
+
+        Parameters
+        ----------
+        azims : array
+            azimuth angles of viewing directions (decimal degrees)
+        elevs : array
+            elevation angles of viewing directions (decimal degrees)
+        topo_res_m : float
+            horizontal sampling resolution of elevation profiles in m
+        min_slope_angle : float
+            mininum angle of slope at intersection, directions pointing into
+            flatter topographic areas are ignored
+        max_dist : float, optional
+            maximum horizontal distance of search in km, defaults to 1.1 times
+            the distance between camera and source
+        local_tolerance : float
+            tolerance factor (in units of ``topo_res_m``) used to estimate the
+            distance uncertainty
+        chunk_size : int
+            number of viewing directions processed at once (limits memory)
+        geo_points : bool
+            if False, no :class:`GeoPoint` objects are created for the
+            intersections (faster for many directions)
+
+        Returns
+        -------
+        dict
+            dictionary containing arrays with distances (``dists``) and
+            uncertainties (``dists_err``) in km, corresponding
+            :class:`GeoPoint` objects of the intersections (``geo_points``,
+            None where no intersection was found), a boolean mask (``ok``)
+            and the input directions (``azims``, ``elevs``)
+
+        """
+        if not isinstance(self.geo_setup.topo_data, TopoData):
+            self.geo_setup.load_topo_data()
+        topo = self.geo_setup.topo_data
+        azims = asarray(azims, dtype=float).ravel()
+        elevs = asarray(elevs, dtype=float).ravel()
+        if not len(azims) == len(elevs):
+            raise ValueError("Azimuth and elevation arrays need to have the "
+                             "same length")
+        if max_dist is None:
+            max_dist = self.geo_setup.vectors["source2cam"].magnitude * 1.10
+        step = topo_res_m / 1000.  # km
+        dists = arange(int(ceil(max_dist / step)) + 1) * step
+        # elevation grid is converted only once for all directions
+        grid = _TopoGrid(topo)
+        z_cam = grid(self.cam.latitude, self.cam.longitude)
+        z_start = z_cam + self._cam["altitude_offs"]
+
+        res = {"dists": [],
+               "dists_err": [],
+               "geo_points": [],
+               "ok": []}
+        for k in range(0, len(azims), chunk_size):
+            chunk = self._topo_intersections(
+                grid, azims[k:k + chunk_size], elevs[k:k + chunk_size], dists,
+                z_start, min_slope_angle, max_dist * .01, local_tolerance)
+            for key, val in zip(["dists", "dists_err", "ok"], chunk[:3]):
+                res[key].extend(val)
+            lats, lons, alts = chunk[3:]
+            for i, ok in enumerate(chunk[2]):
+                p = None
+                if ok and geo_points:
+                    p = GeoPoint(lats[i], lons[i], alts[i])
+                res["geo_points"].append(p)
+        res["azims"] = azims
+        res["elevs"] = elevs
+        for key in res:
+            res[key] = asarray(res[key])
+        return res
+
+    def _topo_intersections(self, grid, azims, elevs, dists, z_start,
+                            min_slope_angle=5., min_dist=0.0,
+                            local_tolerance=3):
+        """Find first intersections of viewing directions with topography.
+
+        Low level method for :func:`get_topo_distances_pixels`
+        """
+        num, step = len(azims), dists[1] - dists[0]
+        rows = arange(num)
+        # coordinates of all profile samples (spherical earth)
+        lat0 = radians(self.cam.latitude)
+        lon0 = radians(self.cam.longitude)
+        az = radians(azims)[:, newaxis]
+        delta = dists[newaxis, :] / 6371.0
+        lats = arcsin(sin(lat0) * cos(delta) + cos(lat0) * sin(delta) *
+                      cos(az))
+        lons = lon0 + arctan2(sin(az) * sin(delta) * cos(lat0),
+                              cos(delta) - sin(lat0) * sin(lats))
+        lats, lons = rad2deg(lats), rad2deg(lons)
+        z = grid(lats, lons)
+        # relative altitude of viewing directions with respect to topography
+        diff = (z_start - z +
+                1000 * tan(radians(elevs))[:, newaxis] * dists[newaxis, :])
+        above = diff > 0
+        valid = isfinite(diff)
+        # only transitions from above to below the topography (i.e. rays
+        # entering the terrain)
+        cross = (above[:, :-1] & ~above[:, 1:] & valid[:, :-1] &
+                 valid[:, 1:] & (dists[newaxis, 1:] > min_dist))
+        ok = cross.any(axis=1)
+        idx = cross.argmax(axis=1)
+        d0, d1 = diff[rows, idx], diff[rows, idx + 1]
+        with errstate(invalid="ignore", divide="ignore"):
+            frac = where(ok, d0 / (d0 - d1), 0.0)
+        dist = dists[idx] + frac * step
+
+        # uncertainty from spread of close to zero points around intersection
+        near = ((abs(diff) < 1000. * step) &
+                (abs(dists[newaxis, :] - dist[:, newaxis]) <=
+                 local_tolerance * step))
+        n = near.sum(axis=1)
+        with errstate(invalid="ignore", divide="ignore"):
+            m1 = (near * dists).sum(axis=1) / n
+            m2 = (near * dists ** 2).sum(axis=1) / n
+        dist_err = where(n > 0, sqrt(clip(m2 - m1 ** 2, 0, None)), 0.0)
+
+        # slope angle of topography at intersection
+        i = clip(idx, 1, len(dists) - 2)
+        slope = rad2deg(arctan((z[rows, i + 1] - z[rows, i - 1]) /
+                               (2000. * step)))
+        if min_slope_angle > 0:
+            with errstate(invalid="ignore"):
+                ok = ok & (slope >= min_slope_angle)
+
+        def at_intersection(arr):
+            return arr[rows, idx] + frac * (arr[rows, idx + 1] -
+                                            arr[rows, idx])
+        return (where(ok, dist, nan), where(ok, dist_err, nan), ok,
+                at_intersection(lats), at_intersection(lons),
+                at_intersection(z))
+
     def get_angular_displacement_pix_to_cfov(self, pos_x, pos_y):
         """Get the angular difference between pixel and detector center.
 
@@ -1266,10 +1476,8 @@ class MeasGeometry(object):
         ratio_hor = self._cam["pix_width"] / self._cam["focal_length"]  # in m
         # ratio_vert = self.cam["pix_height"] / self.cam["focal_length"] #in m
 
-        azims = self.all_azimuths_camfov()
-        elevs = self.all_elevs_camfov()
-
-        plume_dists = self.plume_dist(azims, elevs)  # * 1000.0 #in m
+        # plume distances are computed only once per geometry setup
+        plume_dists = self.get_geometry_maps()["plume_dists"].copy()
         col_dists_m = plume_dists * ratio_hor
 
         # col_dists_m, plume_dists = self.calculate_pixel_col_distances()
@@ -1291,6 +1499,159 @@ class MeasGeometry(object):
             plume_dist_img.crop(roi_abs)
         return (col_dist_img, row_dist_img, plume_dist_img)
 
+    @property
+    def param_hash(self):
+        """Hash of all camera, source and wind parameters.
+
+        Identifies the geometrical configuration, e.g. for caching of
+        geometry maps (cf. :func:`get_geometry_maps`). The topographic data
+        is identified separately (cf. :attr:`topo_id`).
+        """
+        params = [(k, v) for d in (self._cam, self._source, self._wind)
+                  for k, v in six.iteritems(d) if k not in ("cam_id", "serno",
+                                                            "name")]
+        return sha1(repr(params).encode("utf-8")).hexdigest()
+
+    @property
+    def topo_id(self):
+        """Identifier of the topographic data (DEM) of the geo setup.
+
+        Hash of data ID, grid and elevation data of ``geo_setup.topo_data``
+        (or of the topo access settings, if no data is loaded yet). Used to
+        identify cached topographic distance maps (cf.
+        :func:`get_geometry_maps`).
+        """
+        topo = self.geo_setup.topo_data
+        if not isinstance(topo, TopoData):
+            params = [self.geo_setup.topo_access_mode,
+                      self.geo_setup.local_topo_path]
+            return sha1(repr(params).encode("utf-8")).hexdigest()[:16]
+        if self._topo_id is None or self._topo_id[0] is not topo:
+            h = sha1(repr([topo.data_id, topo.data.shape, topo.lat0,
+                           topo.lat1, topo.lon0, topo.lon1]).encode("utf-8"))
+            h.update(ascontiguousarray(topo.data).view("uint8"))
+            self._topo_id = (topo, h.hexdigest()[:16])
+        return self._topo_id[1]
+
+    def get_geometry_maps(self, topo_dists=False, topo_pyrlevel=3,
+                          topo_res_m=5., min_slope_angle=5.):
+        """Get geometrical information for all pixels of the detector.
+
+        The maps are computed only once for a given configuration of camera,
+        source and wind (:attr:`param_hash`) and are cached in memory (up to
+        :attr:`max_cached_geometries` configurations) and, if
+        :attr:`cache_dir` is set, also on disk (one ``.npz`` file per
+        configuration). Topographic distance maps are additionally
+        identified by the topographic data used (:attr:`topo_id`).
+
+        Parameters
+        ----------
+        topo_dists : bool
+            if True, the map of distances to the topography is included (is
+            computed using :func:`get_topo_distances_pixels`)
+        topo_pyrlevel : int
+            pyramid level of topographic distance map (the retrieval for all
+            pixels at pyramid level 0 is usually not necessary)
+        topo_res_m : float
+            horizontal sampling resolution of elevation profiles in m
+        min_slope_angle : float
+            mininum angle of slope of topography at intersection
+
+        Returns
+        -------
+        OrderedDict
+            dictionary containing azimuth angles of all pixel columns
+            (``azims``), elevation angles of all pixel rows (``elevs``),
+            plume distances in m (``plume_dists``, 2D) and, if requested,
+            the topographic distances in m at pyramid level
+            ``topo_pyrlevel`` (``topo_dists``, 2D, NaN where no intersection
+            with topography was found)
+
+        """
+        key = self.param_hash
+        try:
+            maps = self._geometry_maps.pop(key)
+        except KeyError:
+            maps = self._load_geometry_maps(key)
+        self._geometry_maps[key] = maps
+        while len(self._geometry_maps) > max(self.max_cached_geometries, 1):
+            self._geometry_maps.popitem(last=False)
+        changed = False
+        if "plume_dists" not in maps:
+            maps["azims"] = self.all_azimuths_camfov()
+            maps["elevs"] = self.all_elevs_camfov()
+            maps["plume_dists"] = self.plume_dist(maps["azims"],
+                                                  maps["elevs"])
+            changed = True
+        topo_key = None
+        if topo_dists:
+            if not isinstance(self.geo_setup.topo_data, TopoData):
+                self.geo_setup.load_topo_data()
+            topo_key = "topo_dists_%d_%s_%s_%s" % (topo_pyrlevel, topo_res_m,
+                                                   min_slope_angle,
+                                                   self.topo_id)
+        if topo_dists and topo_key not in maps:
+            maps[topo_key] = self._compute_topo_dist_map(
+                maps["azims"], maps["elevs"], topo_pyrlevel, topo_res_m,
+                min_slope_angle)
+            changed = True
+        if changed:
+            self._save_geometry_maps(key, maps)
+        res = od([(k, maps[k]) for k in ("azims", "elevs", "plume_dists")])
+        if topo_dists:
+            res["topo_dists"] = maps[topo_key]
+        return res
+
+    def _compute_topo_dist_map(self, azims, elevs, pyrlevel=3, topo_res_m=5.,
+                               min_slope_angle=5.):
+        """Compute map of distances to topography at a pyramid level."""
+        fac = 2 ** pyrlevel
+        # pixel center coordinates at pyrlevel in absolute coordinates
+        cols = (arange(int(ceil(len(azims) / fac))) + 0.5) * fac - 0.5
+        rows = (arange(int(ceil(len(elevs) / fac))) + 0.5) * fac - 0.5
+        az = interp(cols, arange(len(azims)), azims)
+        el = interp(rows, arange(len(elevs)), elevs)
+        az_grid, el_grid = meshgrid(az, el)
+        res = self.get_topo_distances_pixels(az_grid, el_grid,
+                                             topo_res_m=topo_res_m,
+                                             min_slope_angle=min_slope_angle,
+                                             geo_points=False)
+        return res["dists"].reshape(az_grid.shape) * 1000.
+
+    def _geometry_cache_file(self, key):
+        """Return path of cache file for geometry maps (or None)."""
+        if self.cache_dir is None:
+            return None
+        return join(self.cache_dir, "geometry_%s.npz" % key)
+
+    def _load_geometry_maps(self, key):
+        """Load geometry maps from cache directory (if available)."""
+        path = self._geometry_cache_file(key)
+        if path is None or not exists(path):
+            return od()
+        try:
+            with load(path) as data:
+                maps = od([(k, data[k]) for k in data.files])
+            logger.info("Loaded geometry maps from %s" % path)
+            return maps
+        except Exception as e:
+            logger.warning("Failed to load geometry maps from %s: %s"
+                           % (path, repr(e)))
+            return od()
+
+    def _save_geometry_maps(self, key, maps):
+        """Save geometry maps in cache directory (if specified)."""
+        path = self._geometry_cache_file(key)
+        if path is None:
+            return
+        try:
+            if not isdir(self.cache_dir):
+                makedirs(self.cache_dir)
+            savez_compressed(path, **maps)
+        except Exception as e:
+            logger.warning("Failed to save geometry maps in %s: %s"
+                           % (path, repr(e)))
+
     def get_plume_direction(self):
         """Return the plume direction plus error based on wind direction."""
         return (self._wind["dir"] + 180) % 360, self._wind["dir_err"]
@@ -36,7 +36,9 @@ from matplotlib import gridspec
 import matplotlib.cm as cmaps
 from matplotlib.pyplot import figure, tight_layout
 from numpy import (ndarray, argmax, histogram, uint, nan, linspace, isnan,
-                   uint8, float32, finfo, ones, invert, log, ogrid, asarray)
+                   uint8, float32, finfo, ones, invert, log, ogrid, asarray,
+                   add, subtract, multiply, divide, broadcast, issubdtype,
+                   floating)
 from numpy.ma import masked_array
 from json import loads, dumps
 from os.path import abspath, splitext, basename, exists, join, isdir, dirname
@@ -157,6 +159,8 @@ class Img(object):
 
         # : the actual image data (use method `img` for access)
         self._img = None
+        # converted copies of this image (see :func:`convert`)
+        self._converted = {}
         self.dtype = dtype
         self.vign_mask = None
 
@@ -250,6 +254,7 @@ class Img(object):
     def img(self, val):
         """Set image data."""
         self._img = val  # .astype(self.dtype)
+        self._converted = {}
 
     @property
     def start_acq(self):
@@ -552,12 +557,14 @@ class Img(object):
         self.roi_abs = roi_abs  # updates current roi_abs setting
         roi = self.roi  # .roi is @property method and takes care of ROI conv
         sub = self.img[roi[1]:roi[3], roi[0]:roi[2]]
-        im = self
         if new_img:
-            im = self.duplicate()
+            # the sub array is assigned anyways, avoid copying the full image
+            im = self._duplicate_meta(sub)
+        else:
+            im = self
+            im.img = sub
 #        im._roi_abs = roi
         im.edit_log["crop"] = True
-        im.img = sub
         return im
 
     def correct_dark_offset(self, dark, offset):
@@ -589,22 +596,27 @@ class Img(object):
 
         return dark
 
-    def subtract_dark_image(self, dark):
+    def subtract_dark_image(self, dark, inplace=False):
         """Subtracts a dark (+offset) image and updates ``self.edit_log``.
 
         :param Img dark: dark image data
+        :param bool inplace: if True, the result is written into the current
+            image data array (if possible, see :func:`_inplace_possible`)
+            which avoids the allocation of a new array
 
         Simple image subtraction without any modifications of input image
         """
-        try:
+        if isinstance(dark, Img):
+            dark = dark.img
+        if inplace and self._inplace_possible(dark):
+            corr = subtract(self.img, dark, out=self.img, casting="same_kind")
+        else:
             corr = self.img - dark
-        except BaseException:
-            corr = self.img - dark.img
         corr[corr <= 0] = finfo(float32).eps
         self.img = corr
         self.edit_log["darkcorr"] = True
 
-    def correct_vignetting(self, mask, new_state=True):
+    def correct_vignetting(self, mask, new_state=True, inplace=False):
         """Apply vignetting correction.
 
         Performs either of the following operations::
@@ -615,6 +627,8 @@ class Img(object):
         :param ndarray mask: vignetting correction mask
         :param bool reverse: if False, the inverse correction is applied (img
             needs to be corrected)
+        :param bool inplace: if True, the result is written into the current
+            image data array (if possible, see :func:`_inplace_possible`)
         """
         if new_state == self.edit_log["vigncorr"]:
             return self
@@ -623,11 +637,14 @@ class Img(object):
         except BaseException:
             pass
         try:
-            # then, new_state is 0, i.e. want uncorrected image
-            if self.edit_log["vigncorr"]:
-                self.img = self.img * mask
-            else:  # then, new_state is 1, i.e. want corrected image
-                self.img = self.img / mask
+            # multiply if new_state is 0, i.e. want uncorrected image, else
+            # divide (i.e. want corrected image)
+            fun = multiply if self.edit_log["vigncorr"] else divide
+            if inplace and self._inplace_possible(mask):
+                self.img = fun(self.img, mask, out=self.img,
+                               casting="same_kind")
+            else:
+                self.img = fun(self.img, mask)
         except Exception as e:
             logger.info(type(e),
                   type(e)(str(e) + "\nPlease check vignetting mask"))
@@ -920,15 +937,18 @@ class Img(object):
             (this object remains unchanged)
 
         """
-        tau = self
-        if new_img:
-            tau = self.duplicate()
         if isinstance(bg, Img):
             bg = bg.img
 
-        r = bg / tau.img
+        r = bg / self.img
         r[r <= 0] = finfo(float).eps
-        tau.img = log(r)
+        log(r, out=r)
+        if new_img:
+            # r is assigned anyways, avoid copying the image data
+            tau = self._duplicate_meta(r)
+        else:
+            tau = self
+            tau.img = r
         tau.edit_log["is_tau"] = True
         return tau
 
@@ -942,6 +962,52 @@ class Img(object):
         else:
             return self.pyr_up(-steps)
 
+    def convert(self, to_pyrlevel=None, to_roi_abs=None):
+        """Get copy of this image at a certain pyramid level and / or ROI.
+
+        Unlike :func:`to_pyrlevel` and :func:`crop`, this image remains
+        unchanged. The converted images are cached, i.e. repeated calls
+        return the same object as long as the image data and edit state of
+        this image remain unchanged. This is intended for static images
+        (e.g. background images, correction masks) that are required at
+        the pyramid level of other images. The returned image should
+        therefore not be modified (use :func:`duplicate` if needed).
+
+        Parameters
+        ----------
+        to_pyrlevel : :obj:`int`, optional
+            pyramid level of the result (if None, the current level is used)
+        to_roi_abs : :obj:`list`, optional
+            if specified, the result is cropped to this ROI (in absolute
+            image coordinates, cf. :func:`crop`)
+
+        Returns
+        -------
+        Img
+            converted image (this object if no conversion is required)
+
+        """
+        if to_pyrlevel is None:
+            to_pyrlevel = self.pyrlevel
+        roi = None if to_roi_abs is None else tuple(to_roi_abs)
+        if to_pyrlevel == self.pyrlevel and roi is None:
+            return self
+        state = (tuple(self.edit_log.values()), tuple(self._roi_abs))
+        conv = getattr(self, "_converted", {})
+        if conv.get("state") != state:
+            conv = {"state": state}
+            self._converted = conv
+        key = (to_pyrlevel, roi)
+        if key not in conv:
+            # pyrDown / pyrUp create new arrays, the data of this image is
+            # not copied unless cropping is the only conversion
+            img = self._duplicate_meta(self.img).to_pyrlevel(to_pyrlevel)
+            if roi is not None:
+                img.crop(to_roi_abs)
+                img.img = img.img.copy()
+            conv[key] = img
+        return conv[key]
+
     def pyr_down(self, steps=0):
         """Reduce the image size using gaussian pyramide.
 
@@ -982,9 +1048,8 @@ class Img(object):
         :param int high: mapping value of cmax
         :param int low: mapping value of cmin
         """
-        img = deepcopy(self)
-        img.img = bytescale(self.img, cmin, cmax, high, low)
-        return img
+        return self._duplicate_meta(bytescale(self.img, cmin, cmax, high,
+                                              low))
 
     def _to_8bit_int(self, current_bit_depth=None, new_img=True):
         """Convert image to 8 bit representation and return new image object.
@@ -1046,6 +1111,56 @@ class Img(object):
         # print self.meta["file_name") + ' successfully duplicated'
         return deepcopy(self)
 
+    def _duplicate_meta(self, img):
+        """Duplicate this image using new image data.
+
+        Like :func:`duplicate` but without copying the current image data,
+        which is replaced with the input array in the new object.
+
+        :param ndarray img: image data of the new object
+        :return: new image object
+        """
+        return deepcopy(self, {id(self._img): img})
+
+    def __getstate__(self):
+        """Remove cached conversions when copying or pickling the image."""
+        state = self.__dict__.copy()
+        state["_converted"] = {}
+        return state
+
+    def _inplace_possible(self, val):
+        """Check if an operation with input can be written into image data.
+
+        This requires a writeable floating point image array that does not
+        change its shape when broadcasted with the input.
+
+        :param val: second operand (e.g. array or scalar)
+        :return: bool
+        """
+        img = self.img
+        return (isinstance(img, ndarray) and img.flags.writeable and
+                issubdtype(img.dtype, floating) and
+                broadcast(img, val).shape == img.shape)
+
+    def _inplace_op(self, fun, val):
+        """Apply arithmetic operation in place (if possible).
+
+        The result is written into the current image data array if this is
+        possible (see :func:`_inplace_possible`), else the image data is
+        replaced with the result.
+
+        :param fun: numpy ufunc (e.g. :func:`numpy.subtract`)
+        :param val: second operand (e.g. Img, array or scalar)
+        :return: this object
+        """
+        if isinstance(val, Img):
+            val = val.img
+        if self._inplace_possible(val):
+            self.img = fun(self.img, val, out=self.img, casting="same_kind")
+        else:
+            self.img = fun(self.img, val)
+        return self
+
     def normalise(self, blur=1):
         """Normalise this image."""
         new = self.duplicate()
@@ -1091,6 +1206,7 @@ class Img(object):
         """
         mask = self.img < threshold
         self.img[mask] = val
+        self._converted = {}
         self.edit_log["others"] = True
 
     def set_val_above_thresh(self, val, threshold):
@@ -1110,6 +1226,7 @@ class Img(object):
         """
         mask = self.img > threshold
         self.img[mask] = val
+        self._converted = {}
         self.edit_log["others"] = True
 
     def blend_other(self, other, fac=0.5):
@@ -1473,6 +1590,38 @@ class Img(object):
             raise TypeError("Could not divide image by input %s"
                             % type(val))
 
+    def __iadd__(self, val):
+        """Add another image object in place.
+
+        :param Img img_obj: object to be added
+        :return: this image object
+        """
+        return self._inplace_op(add, val)
+
+    def __isub__(self, val):
+        """Subtract another image object in place.
+
+        :param Img img_obj: object to be subtracted
+        :return: this image object
+        """
+        return self._inplace_op(subtract, val)
+
+    def __imul__(self, val):
+        """Multiply another image object in place.
+
+        :param Img img_obj: object to be multiplied
+        :return: this image object
+        """
+        return self._inplace_op(multiply, val)
+
+    def __itruediv__(self, val):
+        """Divide by another image object in place (float division).
+
+        :param Img img_obj: divisor
+        :return: this image object
+        """
+        return self._inplace_op(divide, val)
+
 
 def model_dark_image(texp, dark, offset):
     r"""Model a dark image for input image based on dark and offset images.
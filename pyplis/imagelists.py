@@ -28,7 +28,10 @@ compute optical flow between current and next image).
 """
 from __future__ import (absolute_import, division)
 from numpy import (asarray, zeros, argmin, arange, ndarray, float32, isnan,
-                   logical_or, uint8, exp, ones)
+                   logical_or, uint8, exp, ones, ascontiguousarray,
+                   savez_compressed, load, argsort, searchsorted, clip, where,
+                   minimum, isnat, datetime64, timedelta64, concatenate,
+                   unique, empty)
 from numpy.ma import nomask
 from datetime import timedelta, datetime, date
 
@@ -38,22 +41,36 @@ from matplotlib.pyplot import figure, draw, ion, ioff, close
 from copy import deepcopy
 from scipy.ndimage.filters import gaussian_filter
 
-from os.path import exists, abspath, dirname, join, basename
-from os import mkdir
+from os.path import (exists, abspath, dirname, join, basename, isdir,
+                     getsize, getmtime)
+from os import mkdir, makedirs, listdir
+from select import select
+from time import time, sleep
+from hashlib import sha1
+import json
 from collections import OrderedDict as od
+from concurrent.futures import ThreadPoolExecutor
 
 from traceback import format_exc
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    INOTIFY_AVAILABLE = True
+except BaseException:
+    INOTIFY_AVAILABLE = False
+
 from pyplis import logger, print_log
 from .glob import DEFAULT_ROI
 from .image import Img, model_dark_image
 from .exceptions import ImgMetaError
 from .setupclasses import Camera
 from .geometry import MeasGeometry
-from .processing import ImgStack, PixelMeanTimeSeries
+from .processing import PixelMeanTimeSeries
 from .utils import LineOnImage
 # from .optimisation import PolySurfaceFit
 from .plumebackground import PlumeBackgroundModel
-from .plumespeed import OptflowFarneback, LocalPlumeProperties
+from .plumespeed import OptflowFarneback
+from .pipeline import (ImgListPipeline, StackConsumer, RoiMeanConsumer,
+                       FlowHistoConsumer)
 from .helpers import check_roi, map_roi, _print_list, closest_index, exponent,\
     isnum, get_pyr_factor_rel
 from .calib_base import CalibData
@@ -101,6 +118,22 @@ class BaseImgList(object):
                  camera=None, geometry=None, init=True, **img_prep_settings):
         # this list will be filled with filepaths
         self.files = []
+        # background loader for upcoming images (see prefetch_mode)
+        self._prefetch = None
+        # watcher for new files in a growing directory (see tail_mode)
+        self._tail = None
+        # meta index of files in tail mode, allows appending files
+        self._tail_index = None
+        # LRU cache of prepared images (see prep_cache_mode)
+        self._prep_cache = None
+        # size reduced correction masks and background model (see
+        # ImgList.reduce_first_mode)
+        self._reduced_inputs = {}
+        # meta information of all files accessible from the file names
+        # (see meta_index)
+        self._meta_index = None
+        # acq. times of files sorted in time (see _get_time_index)
+        self._time_index = None
         # id of this list
         self.list_id = list_id
         self.list_type = list_type
@@ -128,6 +161,8 @@ class BaseImgList(object):
 
         self._roi_abs = DEFAULT_ROI  # in original img resolution
         self._auto_reload = True
+        # data type of images on load (None: default of :class:`Img`)
+        self._img_dtype = None
 
         self._list_modes = {}  # init for :class:`ImgList` object
 
@@ -277,7 +312,7 @@ class BaseImgList(object):
         if isnum(v):
             return v
         elif isinstance(v, Img):
-            return v.to_pyrlevel(0)
+            return v.convert(0)
         self._get_and_set_geometry_info()
         return self._plume_dists
 
@@ -370,7 +405,7 @@ class BaseImgList(object):
         if isnum(v):
             return v
         elif isinstance(v, Img):
-            return v.to_pyrlevel(self.pyrlevel)
+            return v.convert(self.pyrlevel)
         self._get_and_set_geometry_info()
         return self._integration_step_lengths
 
@@ -398,6 +433,42 @@ class BaseImgList(object):
             logger.info("Reloading images...")
             self.load()
 
+    @property
+    def prefetch_mode(self):
+        """Activate / deactivate background prefetching of images.
+
+        See :func:`activate_prefetch_mode` for details.
+        """
+        return isinstance(self._prefetch, _ImgPrefetcher)
+
+    @prefetch_mode.setter
+    def prefetch_mode(self, val):
+        self.activate_prefetch_mode(val)
+
+    @property
+    def tail_mode(self):
+        """Activate / deactivate tailing of a growing image directory.
+
+        See :func:`activate_tail_mode` for details.
+        """
+        return isinstance(self._tail, _DirWatcher)
+
+    @tail_mode.setter
+    def tail_mode(self, val):
+        self.activate_tail_mode(val)
+
+    @property
+    def prep_cache_mode(self):
+        """Activate / deactivate caching of prepared images.
+
+        See :func:`activate_prep_cache` for details.
+        """
+        return isinstance(self._prep_cache, _PreparedImgCache)
+
+    @prep_cache_mode.setter
+    def prep_cache_mode(self, val):
+        self.activate_prep_cache(val)
+
     @property
     def crop(self):
         """Activate / deactivate crop mode."""
@@ -426,6 +497,26 @@ class BaseImgList(object):
             self.img_prep["pyrlevel"] = int(value)
             self.load()
 
+    @property
+    def img_dtype(self):
+        """Data type of image arrays on load (e.g. ``numpy.float32``).
+
+        If None (default), the default data type of :class:`Img` is used
+        (i.e. 64 bit float for FITS files). Using 32 bit floats halves the
+        memory footprint of the loaded and prepared images.
+
+        Note
+        ----
+        images are reloaded on change
+        """
+        return self._img_dtype
+
+    @img_dtype.setter
+    def img_dtype(self, val):
+        if val != self._img_dtype:
+            self._img_dtype = val
+            self.load()
+
     @property
     def gaussian_blurring(self):
         """Return current blurring level.
@@ -509,22 +600,27 @@ class BaseImgList(object):
         ts = self.get_img_meta_all_filenames()[0]
         return ts
 
-    def timestamp_to_index(self, val=datetime(1900, 1, 1)):
+    def timestamp_to_index(self, val=datetime(1900, 1, 1), tolerance=None):
         """Convert a datetime to the list index.
 
         Returns the list index that is closest in time to the input time
-        stamp.
+        stamp (binary search in the sorted acq. times of the list).
 
         Parameters
         ----------
         val : datetime
             time stamp
+        tolerance : :obj:`timedelta`, optional
+            maximum allowed time difference between ``val`` and the closest
+            image
 
         Raises
         ------
         AttributeError
             if time stamps of images in list cannot be accessed from their
             file names
+        ValueError
+            if no image is found within ``tolerance``
 
         Returns
         -------
@@ -532,11 +628,16 @@ class BaseImgList(object):
             corresponding list index
 
         """
-        times = self.start_acq
-        if not len(times) == self.nof:
+        times, times_sorted, order = self._get_time_index()
+        if not len(times) == self.nof or isnat(times).any():
             raise AttributeError("Failed to access all acq. time stamps could "
                                  "not be accessed")
-        return argmin(abs(val - times))
+        idx = _nearest_time_indices(times_sorted, order,
+                                    [datetime64(val, "ns")], tolerance)[0]
+        if idx < 0:
+            raise ValueError("No image found within %s of %s in list %s"
+                             % (tolerance, val, self.list_id))
+        return idx
 
     def index_to_timestamp(self, val=0):
         """Get timestamp of input list index.
@@ -605,6 +706,9 @@ class BaseImgList(object):
             desired image index, defaults to 0
 
         """
+        if self._prefetch is not None:
+            self._prefetch.clear()
+        self.clear_prep_cache()
         self.iter_indices(to_index=at_index)
         for key, val in six.iteritems(self.loaded_images):
             self.loaded_images[key] = None
@@ -648,16 +752,21 @@ class BaseImgList(object):
                   % self.list_id)
             return False
         try:
-            img = self._load_image(self.index)
-            self._load_edit["this"].update(img.edit_log)
-            self.loaded_images["this"] = img
-            if img.vign_mask is not None:
-                self.vign_mask = img.vign_mask
-
-            if self.update_cam_geodata:
+            if not self._load_cached("this", self.index):
+                img = self._get_raw_image(self.index)
+                self._load_edit["this"].update(img.edit_log)
+                self.loaded_images["this"] = img
+                if img.vign_mask is not None:
+                    self.vign_mask = img.vign_mask
+
+                if self.update_cam_geodata:
+                    self.meas_geometry.update_cam_specs(**self.this.meta)
+
+                self._apply_edit("this")
+                self._store_cached("this", self.index)
+            elif self.update_cam_geodata:
                 self.meas_geometry.update_cam_specs(**self.this.meta)
-
-            self._apply_edit("this")
+            self._update_prefetch()
 
         except IOError:
             print_log.warning("Invalid file encountered at list index %s, file will"
@@ -678,7 +787,14 @@ class BaseImgList(object):
         return True
 
     def goto_next(self):
-        """Goto next index in list."""
+        """Goto next index in list.
+
+        In :attr:`tail_mode`, this method waits for the next image, if the
+        last image of the list is reached.
+        """
+        if (self.tail_mode and not self._tail_next_available() and
+                not self._wait_next_tail()):
+            return self.this
         if self.nof < 2:
             print_log.warning("Only one image available, no index change or "
                  "reload performed")
@@ -723,6 +839,9 @@ class BaseImgList(object):
         elif to_index == self.prev_index:
             self.goto_prev()
         else:
+            if self.prefetch_mode and self._prefetch.auto:
+                # images ahead of the old index are not needed anymore
+                self._prefetch.clear()
             self.iter_indices(to_index)
             self.load()
 
@@ -772,6 +891,345 @@ class BaseImgList(object):
         except IndexError:
             pass
 
+    def activate_prefetch_mode(self, value=True, num=4, max_workers=None):
+        """Activate / deactivate background prefetching of images.
+
+        If active, the next ``num`` image files ahead of the current list
+        index are loaded (unedited) in a thread pool, while the current
+        images are processed. Prefetched images are consumed whenever the
+        list index is changed (e.g. in :func:`goto_next`), which hides the
+        file read latency in loops over many images (e.g. in
+        :func:`make_stack` or :func:`EmissionRateAnalysis.run_retrieval`).
+        Pending images are cancelled when jumping to a different index
+        (:func:`goto_img`) or when the file list or camera changes.
+
+        Note
+        ----
+        In :class:`ImgList` objects, the corresponding images of all
+        linked lists (e.g. offband list) and of the dark and offset lists are
+        prefetched as well, using the same thread pool.
+
+        Parameters
+        ----------
+        value : bool
+            activate / deactivate prefetch mode
+        num : int
+            maximum number of images loaded in advance (size of the
+            prefetch queue)
+        max_workers : :obj:`int`, optional
+            number of worker threads, defaults to ``num``
+
+        """
+        if self._prefetch is not None:
+            self._release_prefetch()
+        if value:
+            self._prefetch = _ImgPrefetcher(num, max_workers)
+            self._update_prefetch()
+
+    def activate_tail_mode(self, value=True, directory=None, timeout=None,
+                           poll_interval=1.0, settle_time=0.5,
+                           use_inotify=True):
+        """Activate / deactivate tailing of a directory with incoming images.
+
+        If active, image files that are added to ``directory`` (e.g. by the
+        acquisition software of a camera in near-real-time applications) are
+        appended to this list, sorted by their acquisition time. Files that
+        exist on activation are ignored and only files that match the file
+        type of the camera and the filter of this list (:attr:`filter`, if
+        specified, cf. :class:`Dataset`) are added.
+
+        New files are detected using inotify, if the optional package
+        ``inotify_simple`` is installed (Linux only), else by polling the
+        directory. They are added in :func:`update_files` which is called
+        automatically in :func:`goto_next` if the last image of the list is
+        reached. :func:`goto_next` then blocks until the next image arrives
+        (or until ``timeout`` is exceeded). See also :func:`iter_tail`.
+
+        Parameters
+        ----------
+        value : bool
+            activate / deactivate tail mode
+        directory : :obj:`str`, optional
+            directory that is watched, defaults to the directory of the last
+            file in this list
+        timeout : :obj:`float`, optional
+            maximum time in s :func:`goto_next` waits for the next image (if
+            None, it waits until the image arrives)
+        poll_interval : float
+            time interval in s for checking the directory (only relevant if
+            inotify is not used)
+        settle_time : float
+            minimum time in s during which the size and modification time of
+            a new file must not change, before it is added (only relevant if
+            inotify is not used, avoids reading incompletely written files)
+        use_inotify : bool
+            if False, polling is used even if inotify is available
+
+        """
+        if self._tail is not None:
+            self._tail.close()
+            self._tail = None
+            self._tail_index = None
+        if not value:
+            return
+        if directory is None:
+            if not self.nof:
+                raise ValueError("Please specify directory for tail mode of "
+                                 "empty list %s" % self.list_id)
+            directory = dirname(self.files[-1])
+        self._tail = _DirWatcher(directory, timeout, poll_interval,
+                                 settle_time, use_inotify)
+        self._tail_index = _TailIndex(self.meta_index)
+
+    def update_files(self, timeout=0):
+        """Add new image files from watched directory (cf. :attr:`tail_mode`).
+
+        The new files are sorted by acquisition time and appended to the
+        list. Only if they are older than the last image in the list, the
+        whole list is sorted again. The current images are reloaded if the
+        index of the current or next image changed.
+
+        Parameters
+        ----------
+        timeout : :obj:`float`, optional
+            time in s to wait for new files (if None, waits until at least
+            one file arrives). By default, the directory is checked only once
+
+        Returns
+        -------
+        int
+            number of added files
+
+        """
+        if not self.tail_mode:
+            raise AttributeError("Tail mode is not active in list %s"
+                                 % self.list_id)
+        return self._add_and_sync(timeout)
+
+    def iter_tail(self):
+        """Iterate over the images of this list as they arrive.
+
+        Requires :attr:`tail_mode`. Yields the current image and then, the
+        next image whenever it is available (cf. :func:`goto_next`). The
+        iteration stops if no new image arrives within the timeout of the
+        tail mode.
+
+        Yields
+        ------
+        Img
+            current image
+        """
+        if not self.tail_mode:
+            raise AttributeError("Tail mode is not active in list %s"
+                                 % self.list_id)
+        if not self.nof:
+            self.update_files(self._tail.timeout)
+            if not self.nof:
+                return
+        yield self.this
+        while self._wait_next_tail():
+            self.goto_next()
+            yield self.this
+
+    def _tail_next_available(self):
+        """Check if next image is available in tail mode (no wrap around)."""
+        return self.nof > 1 and self.next_index > self.index
+
+    def _wait_next_tail(self):
+        """Wait until the next image is available in tail mode.
+
+        Returns False if no new image arrived within timeout of tail mode.
+        """
+        t0 = time()
+        timeout = self._tail.timeout
+        while not self._tail_next_available():
+            if timeout is None:
+                remaining = None
+            else:
+                remaining = max(timeout - (time() - t0), 0)
+            if not self._add_and_sync(remaining) and remaining == 0:
+                logger.info("No new image arrived in list %s within %s s"
+                            % (self.list_id, timeout))
+                return False
+        return True
+
+    def _add_and_sync(self, timeout, reload=True):
+        """Add new files, update linked lists and reload images if needed.
+
+        The current image is only reloaded if its index changed, if only
+        the index of the next image changed, the next image is reloaded
+        (cf. :func:`_load_next`).
+
+        Returns
+        -------
+        int
+            number of added files
+        """
+        index, next_index = self.index, self.next_index
+        num_before = self.nof
+        resorts = self._tail.num_resorts
+        num = self._add_tail_files(self._poll_tail_files(timeout))
+        if num:
+            resorted = self._tail.num_resorts > resorts
+            self._sync_linked_lists(num_before, resorted)
+            if not reload:
+                pass
+            elif not num_before or resorted or not index == self.index:
+                self.load()
+            elif not next_index == self.next_index:
+                self._load_next()
+        return num
+
+    def _load_next(self):
+        """Load next image after index change of the latter.
+
+        Does nothing here (only the current image is loaded), see
+        :class:`ImgList`.
+        """
+        pass
+
+    def _poll_tail_files(self, timeout):
+        """Wait for new files belonging to this list.
+
+        Returns
+        -------
+        DataFrame
+            meta index of new files (cf. :attr:`meta_index`) sorted by acq.
+            time
+        """
+        t0 = time()
+        ftype = self.camera.file_type
+        while True:
+            if timeout is None:
+                remaining = None
+            else:
+                remaining = max(timeout - (time() - t0), 0)
+            paths = self._tail.poll(remaining)
+            if isinstance(ftype, str):
+                paths = [p for p in paths if p.endswith(ftype)]
+            index = self.camera.get_img_meta_index(paths)
+            f = self.filter
+            if f is not None:
+                # only files of this image type (cf. Dataset.fill_image_lists)
+                index = index[((index["filter_id"] == f.acronym) &
+                               (index["meas_type"] == f.meas_type_acro)
+                               ).values]
+            if len(index) or remaining == 0:
+                return index.sort_values(["start_acq", "path"],
+                                         kind="mergesort")
+
+    def _add_tail_files(self, index):
+        """Append files to list, such that it remains sorted in time.
+
+        Returns
+        -------
+        int
+            number of added files
+        """
+        num = len(index)
+        if not num:
+            return 0
+        num_before = self.nof
+        if not self._tail_index_valid():
+            self._tail_index = _TailIndex(self.meta_index)
+        tail = self._tail_index
+        times = index["start_acq"].values
+        if num_before and (times < tail.times[num_before - 1]).any():
+            # images arrived out of order, resort whole list
+            current = self.files[self.index]
+            meta = concat([self.meta_index, index], ignore_index=True)
+            meta = meta.sort_values("start_acq", kind="mergesort")
+            meta = meta.reset_index(drop=True)
+            self.files = meta["path"].tolist()
+            self._meta_index = meta
+            self._tail_index = _TailIndex(meta)
+            self._tail.num_resorts += 1
+            if self._prefetch is not None:
+                self._prefetch.clear()
+            self.clear_prep_cache()
+            self.iter_indices(to_index=self.files.index(current))
+        else:
+            # the meta index DataFrame is updated on next access (see
+            # meta_index)
+            tail.append(index)
+            self.files.extend(tail.paths[num_before:])
+            self.iter_indices(to_index=self.index if num_before else 0)
+        logger.info("Added %d new files to list %s" % (num, self.list_id))
+        return num
+
+    def _tail_index_valid(self, list_index=None):
+        """Check if tail index corresponds to the list files.
+
+        Only the file at ``list_index`` (or the last file) is compared,
+        apart from the number of files (cf. :func:`_meta_index_valid`).
+        """
+        tail = self._tail_index
+        if tail is None or not tail.num == self.nof:
+            return False
+        if not self.nof:
+            return True
+        if list_index is None:
+            list_index = self.nof - 1
+        return tail.paths[list_index] == self.files[list_index]
+
+    def _sync_linked_lists(self, num_before, resorted):
+        """Update lists linked to this list after files were added.
+
+        Does nothing here, see :class:`ImgList`.
+        """
+        pass
+
+    def activate_prep_cache(self, value=True, max_bytes=500e6,
+                            cache_dir=None):
+        """Activate / deactivate caching of prepared images.
+
+        If active, images are stored after all image preparation steps of
+        the list were applied (e.g. dark correction, tau / AA computation,
+        calibration, Gauss pyramid, blurring, see :func:`_apply_edit`). When
+        an image is revisited (e.g. :func:`goto_img` back and forth, or
+        repeated loops over the same index range), it is taken from the
+        cache instead of being loaded and prepared again.
+
+        Cached images are identified by their list index and the current
+        edit state of the list (see :func:`_prep_state`), that is, images
+        prepared with different list modes (e.g. :attr:`tau_mode`) or image
+        preparation settings (e.g. :attr:`pyrlevel`) are never mixed up.
+        The cache is cleared whenever the file list, the camera, the
+        background image or model, the extinction coefficients, the
+        calibration data or the dark images change. Use
+        :func:`clear_prep_cache` after modifying any of these objects (e.g.
+        a background mask) in place.
+
+        If ``cache_dir`` is specified, prepared images that are tau or AA
+        images (including calibrated images) are furthermore saved on disk
+        and are reused in later sessions (e.g. reruns of an emission rate
+        analysis with different retrieval lines), as long as the image files
+        and the content of all objects used for the image preparation are
+        unchanged (see :func:`_prep_file_key`). Files in the cache directory
+        are never deleted automatically.
+
+        Parameters
+        ----------
+        value : bool
+            activate / deactivate cache
+        max_bytes : float
+            maximum memory (in bytes) used for the cached images, the least
+            recently used images are removed if the budget is exceeded
+        cache_dir : :obj:`str`, optional
+            directory for storage of prepared tau / AA images on disk
+
+        """
+        if value:
+            self._prep_cache = _PreparedImgCache(max_bytes, cache_dir)
+        else:
+            self._prep_cache = None
+
+    def clear_prep_cache(self):
+        """Remove all images from the prepared image cache."""
+        if self._prep_cache is not None:
+            self._prep_cache.clear()
+        self._reduced_inputs = {}
+
     def clear(self):
         """Empty this list (i.e. :attr:`files`)."""
         self.files = []
@@ -846,6 +1304,9 @@ class BaseImgList(object):
         else:
             if cam_id is not None:
                 self.camera = Camera(cam_id)
+        if self._prefetch is not None:
+            self._prefetch.clear()
+        self.clear_prep_cache()
 
         # if not isinstance(camera, Camera):
         #    camera = Camera(cam_id)
@@ -876,9 +1337,107 @@ class BaseImgList(object):
         info = self.camera.get_img_meta_from_filename(file_path)
         return {"start_acq": info[0], "texp": info[3]}
 
+    @property
+    def meta_index(self):
+        """Meta information of all files in this list (from file names).
+
+        :class:`DataFrame` with one row per file (columns ``path``,
+        ``start_acq``, ``filter_id``, ``meas_type`` and ``texp``, see
+        :func:`CameraBaseInfo.get_img_meta_index`). The index is created on
+        first access (or if the files in this list changed) and can also be
+        assigned, e.g. from an index shared by all lists of a
+        :class:`Dataset`.
+        """
+        if not self._meta_index_valid():
+            if self._tail_index_valid():
+                # files were added in tail mode
+                self._meta_index = self._tail_index.to_frame()
+            else:
+                self._meta_index = self.camera.get_img_meta_index(self.files)
+        return self._meta_index
+
+    @meta_index.setter
+    def meta_index(self, val):
+        if not isinstance(val, DataFrame) or "path" not in val:
+            raise TypeError("Invalid input for meta index, need DataFrame "
+                            "with column path")
+        self._meta_index = val.reset_index(drop=True)
+        if self._tail_index is not None:
+            self._tail_index = _TailIndex(self._meta_index)
+
+    def _meta_index_valid(self, list_index=None):
+        """Check if current meta index corresponds to the list files.
+
+        If ``list_index`` is specified, only the file at this index is
+        compared (apart from the number of files).
+        """
+        idx = self._meta_index
+        if idx is None or not len(idx) == self.nof:
+            return False
+        paths = idx["path"]
+        if list_index is not None:
+            return paths.iat[list_index] == self.files[list_index]
+        return paths.tolist() == list(self.files)
+
+    def _get_time_index(self):
+        """Get acq. times of all files as ``datetime64`` array (cached).
+
+        If the file names only contain time information (i.e. the date is
+        1900-01-01), the date of the current image is used.
+
+        Returns
+        -------
+        tuple
+            3-element tuple containing
+
+            - array, acq. times of all files (``NaT`` if not accessible)
+            - array, sorted acq. times
+            - array, list indices of the sorted acq. times
+
+        """
+        tail = self._tail_index
+        if self._tail_index_valid() and not tail.time_only:
+            # grows with files added in tail mode, without sorting
+            return tail.time_index()
+        index = self.meta_index
+        cached = self._time_index
+        if cached is None or cached[0] is not index:
+            times = index["start_acq"].values.astype("datetime64[ns]")
+            day0 = datetime64("1900-01-01", "D")
+            if len(times) and times[0].astype("datetime64[D]") == day0:
+                try:
+                    d = self.this.meta["start_acq"].date()
+                    print_log.warning("Warning accessing acq. time stamps from "
+                                      "file names in ImgList: date information "
+                                      "could not be accessed, using date of "
+                                      "currently loaded image meta info: %s"
+                                      % d)
+                    times = times + (datetime64(d, "D") - day0)
+                except BaseException:
+                    pass
+            order = argsort(times, kind="mergesort")
+            cached = (index, times, times[order], order)
+            self._time_index = cached
+        return cached[1:]
+
+    def _get_img_meta(self, list_index):
+        """Get meta input dict for image at list index (cf. meta_index)."""
+        if self._tail_index_valid(list_index):
+            return self._tail_index.get_meta(list_index)
+        if not self._meta_index_valid(list_index):
+            return self.get_img_meta_from_filename(self.files[list_index])
+        idx = self._meta_index
+        start_acq, texp = (idx["start_acq"].iat[list_index],
+                           idx["texp"].iat[list_index])
+        return {"start_acq": None if pd.isnull(start_acq)
+                else start_acq.to_pydatetime(),
+                "texp": None if isnan(texp) else float(texp)}
+
     def get_img_meta_all_filenames(self):
         """Try to load acquisition and exposure times from filenames.
 
+        The information is retrieved from :attr:`meta_index`.
+
         Note
         ----
         Only works if relevant information is specified in ``self.camera`` and
@@ -893,15 +1452,11 @@ class BaseImgList(object):
             - list, containing all retrieved exposure times
 
         """
-        times, texps = asarray([None] * self.nof), asarray([None] * self.nof)
-
-        for k in range(self.nof):
-            try:
-                info = self.camera.get_img_meta_from_filename(self.files[k])
-                times[k] = info[0]
-                texps[k] = info[3]
-            except BaseException:
-                pass
+        idx = self.meta_index
+        times = asarray(idx["start_acq"].dt.to_pydatetime(), dtype=object)
+        times[idx["start_acq"].isnull().values] = None
+        texps = idx["texp"].values.astype(object)
+        texps[idx["texp"].isnull().values] = None
         try:
             if times[0].date() == date(1900, 1, 1):
                 d = self.this.meta["start_acq"].date()
@@ -915,13 +1470,25 @@ class BaseImgList(object):
             pass
         return times, texps
 
-    def assign_indices_linked_list(self, lst):
+    def assign_indices_linked_list(self, lst, tolerance=None):
         """Create a look up table for fast indexing between image lists.
 
+        For each image in this list, the index of the image in the other list
+        that is closest in time is determined (using a binary search in the
+        sorted acq. times of the other list).
+
         Parameters
         ----------
         lst : BaseImgList
             image list supposed to be linked
+        tolerance : :obj:`timedelta`, optional
+            maximum allowed time difference between linked images
+
+        Raises
+        ------
+        ValueError
+            if images in this list have no image in the other list within
+            ``tolerance``
 
         Returns
         -------
@@ -930,23 +1497,23 @@ class BaseImgList(object):
 
         """
         idx_array = zeros(self.nof, dtype=int)
-        times, _ = self.get_img_meta_all_filenames()
-        times_lst, _ = lst.get_img_meta_all_filenames()
         if lst.nof == 1:
             logger.warning("Other list contains only one file, assign all indices to "
                  "the corresponding image")
-        elif (any([x is None for x in times]) or
-              any([x is None for x in times_lst])):
+            return idx_array
+        times = self._get_time_index()[0]
+        _, times_sorted, order = lst._get_time_index()
+        if isnat(times).any() or isnat(times_sorted).any():
             print_log.warning("Image acquisition times could not be accessed from file "
                  "names, assigning by indices")
-            lst_idx = arange(lst.nof)
-            for k in range(self.nof):
-                idx_array[k] = abs(k - lst_idx).argmin()
-        else:
-            for k in range(self.nof):
-                idx = abs(times[k] - times_lst).argmin()
-                idx_array[k] = idx
-
+            return minimum(arange(self.nof), lst.nof - 1)
+        idx_array = _nearest_time_indices(times_sorted, order, times,
+                                          tolerance)
+        num_fail = (idx_array < 0).sum()
+        if num_fail:
+            raise ValueError("%d images in list %s have no image in list %s "
+                             "within %s" % (num_fail, self.list_id,
+                                            lst.list_id, tolerance))
         return idx_array
 
     def same_preedit_settings(self, settings_dict):
@@ -973,7 +1540,7 @@ class BaseImgList(object):
     def make_stack(self, stack_id=None, pyrlevel=None, roi_abs=None,
                    start_idx=0, stop_idx=None, ref_check_roi_abs=None,
                    ref_check_min_val=None, ref_check_max_val=None,
-                   dtype=float32):
+                   dtype=float32, memmap_file=None):
         """Stack all images in this list.
 
         The stacking is performed using the current image preparation
@@ -983,8 +1550,8 @@ class BaseImgList(object):
         Note
         ----
         In case of ``MemoryError`` try stacking less images (specifying
-        start / stop index) or reduce the size setting a different Gauss
-        pyramid level.
+        start / stop index), reduce the size setting a different Gauss
+        pyramid level or store the stack data on disk (``memmap_file``).
 
         Parameters
         ----------
@@ -1022,6 +1589,9 @@ class BaseImgList(object):
             calib mode)
         dtype
             data type of stack
+        memmap_file : :obj:`str`, optional
+            if specified, the stack data is stored in a memory-mapped file at
+            this location rather than in RAM (see :class:`ImgStack`)
 
         Returns
         -------
@@ -1038,80 +1608,47 @@ class BaseImgList(object):
         if stop_idx is None or stop_idx > self.nof:
             stop_idx = self.nof
 
-        num = self._iter_num(start_idx, stop_idx)
         # remember last image shape settings
         _roi = deepcopy(self._roi_abs)
         _pyrlevel = deepcopy(self.pyrlevel)
         _crop = self.crop
 
-        self.auto_reload = False
-        if pyrlevel is not None and pyrlevel != _pyrlevel:
-            logger.info("Changing image list pyrlevel from %d to %d"
-                  % (_pyrlevel, pyrlevel))
-            self.pyrlevel = pyrlevel
-        if check_roi(roi_abs):
-            logger.info("Activate cropping in ROI %s (absolute coordinates)"
-                  % roi_abs)
-            self.roi_abs = roi_abs
-            self.crop = True
-
         if stack_id is None:
             stack_id = self.list_id
 
-        self.goto_img(start_idx)
-
-        self.auto_reload = True
-        h, w = self.current_img().shape
-        stack = ImgStack(h, w, num, dtype, stack_id, camera=self.camera,
-                         img_prep=self.current_img().edit_log)
-        lid = self.list_id
-        ref_check = True
-        if not check_roi(ref_check_roi_abs):
-            ref_check = False
-        try:
-            ref_check_min_val = float(ref_check_min_val)
-        except BaseException:
-            ref_check = False
-        try:
-            ref_check_max_val = float(ref_check_max_val)
-        except BaseException:
-            ref_check = False
-        exp = int(10**exponent(num) / 4.0)
-        if not exp:
-            exp = 1
-        for k in range(num):
-            if k % exp == 0:
-                print_log.info("Building img-stack from list %s, progress: (%s | %s)"
-                      % (lid, k, num - 1))
-            img = self.loaded_images["this"]
-            append = True
-            if ref_check:
-                sub_val = img.crop(roi_abs=ref_check_roi_abs, new_img=1).mean()
-                if not ref_check_min_val <= sub_val <= ref_check_max_val:
-                    print_log.warning("Exclude image no. %d from stack, got value=%.2f in "
-                          "ref check ROI (out of specified range)"
-                          % (k, sub_val))
-                append = False
-            if append:
-                stack.add_img(img.img, img.meta["start_acq"],
-                              img.meta["texp"])
-            self.goto_next()
-            k += 1
-        stack.start_acq = asarray(stack.start_acq)
-        stack.texps = asarray(stack.texps)
-        stack.roi_abs = self._roi_abs
-
-        print_log.info("Img stack calculation finished, rolling back to intial list"
-              "state:\npyrlevel: %d\ncrop modus: %s\nroi (abs coords): %s "
-              % (_pyrlevel, _crop, _roi))
         self.auto_reload = False
-        self.pyrlevel = _pyrlevel
-        self.crop = _crop
-        self.roi_abs = _roi
-        self.goto_img(cfn)
-        self.auto_reload = True
-        if not sum(stack._access_mask) > 0:
-            raise ValueError("Failed to build stack, stack is empty...")
+        try:
+            if pyrlevel is not None and pyrlevel != _pyrlevel:
+                logger.info("Changing image list pyrlevel from %d to %d"
+                            % (_pyrlevel, pyrlevel))
+                self.pyrlevel = pyrlevel
+            if check_roi(roi_abs):
+                logger.info("Activate cropping in ROI %s (absolute "
+                            "coordinates)" % roi_abs)
+                self.roi_abs = roi_abs
+                self.crop = True
+
+            self.goto_img(start_idx)
+
+            self.auto_reload = True
+            consumer = StackConsumer(stack_id, ref_check_roi_abs,
+                                     ref_check_min_val, ref_check_max_val,
+                                     dtype=dtype, memmap_file=memmap_file)
+            pipe = ImgListPipeline(self, [consumer])
+            stack = pipe.run(start_idx, stop_idx,
+                             restore_index=False)["stack"]
+        finally:
+            # roll back list state, also if the stack could not be built
+            print_log.info("Img stack calculation finished, rolling back to "
+                           "intial list state:\npyrlevel: %d\ncrop modus: %s"
+                           "\nroi (abs coords): %s " % (_pyrlevel, _crop,
+                                                        _roi))
+            self.auto_reload = False
+            self.pyrlevel = _pyrlevel
+            self.crop = _crop
+            self.roi_abs = _roi
+            self.goto_img(cfn)
+            self.auto_reload = True
         return stack
 
     def get_mean_img(self, start_idx=0, stop_idx=None):
@@ -1199,52 +1736,8 @@ class BaseImgList(object):
         """
         if not self.data_available:
             raise IndexError("No images available in ImgList object")
-        dat = []
-        num_rois = len(rois)
-        if num_rois == 0:
-            raise ValueError("No ROIs provided...")
-        for roi in rois:
-            dat.append([[], [], [], []])
-        cfn = self.cfn
-        if isinstance(start_idx, datetime):
-            start_idx = self.timestamp_to_index(start_idx)
-        if isinstance(stop_idx, datetime):
-            stop_idx = self.timestamp_to_index(stop_idx)
-        if stop_idx is None or stop_idx > self.nof:
-            stop_idx = self.nof
-
-        self.goto_img(start_idx)
-        num = self._iter_num(start_idx, stop_idx)
-
-        lid = self.list_id
-        pnum = int(10**exponent(num) / 2.0)
-        for k in range(num):
-            try:
-                if k % pnum == 0:
-                    print_log.info("Calc pixel mean t-series in list %s (%d | %d)"
-                          % (lid, (k + 1), num))
-            except BaseException:
-                pass
-            img = self.loaded_images["this"]
-            for i in range(num_rois):
-                roi = rois[i]
-                d = dat[i]
-                d[0].append(img.meta["texp"])
-                d[1].append(img.meta["start_acq"])
-                sub = img.img[roi[1]:roi[3], roi[0]:roi[2]]
-                d[2].append(sub.mean())
-                d[3].append(sub.std())
-
-            self.goto_next()
-
-        self.goto_img(cfn)
-        means = []
-        for i in range(num_rois):
-            d = dat[i]
-            mean = PixelMeanTimeSeries(d[2], d[1], d[3], d[0], rois[i],
-                                       img.edit_log)
-            means.append(mean)
-        return means
+        pipe = ImgListPipeline(self, [RoiMeanConsumer(*rois)])
+        return pipe.run(start_idx, stop_idx)["roi_means"]
 
     def get_mean_value(self, start_idx=0, stop_idx=None, roi=DEFAULT_ROI,
                        apply_img_prep=True):
@@ -1556,7 +2049,7 @@ class BaseImgList(object):
         """
         file_path = self.files[list_index]
         try:
-            meta = self.get_img_meta_from_filename(file_path)
+            meta = self._get_img_meta(list_index)
         except:
             print_log.warning("Failed to retrieve image meta information from file path %s"
                  % file_path)
@@ -1564,7 +2057,198 @@ class BaseImgList(object):
         meta["filter_id"] = self.list_id
         return Img(file_path,
                    import_method=self.camera.image_import_method,
-                   **meta)
+                   dtype=self._img_dtype, **meta)
+
+    def _get_raw_image(self, list_index):
+        """Return unedited image at list index.
+
+        Uses the prefetched image if available (cf. :attr:`prefetch_mode`),
+        else the image is loaded via :func:`_load_image`.
+
+        Parameters
+        ----------
+        list_index : int
+            Index of image in file list ``self.files``
+
+        Returns
+        -------
+        Img
+            the loaded image data (unmodified)
+
+        """
+        if self._prefetch is not None:
+            future = self._prefetch.pop(list_index)
+            if future is not None:
+                return future.result()
+        return self._load_image(list_index)
+
+    def _loaded_indices(self):
+        """List indices of images that are currently loaded."""
+        return [self.index]
+
+    def _prefetch_window(self):
+        """List indices of upcoming images in prefetch mode."""
+        loaded = self._loaded_indices()
+        step = self.skip_files + 1
+        indices = []
+        for k in range(1, self._prefetch.num + len(loaded) + 1):
+            idx = (self.index + k * step) % self.nof
+            if idx not in loaded and idx not in indices:
+                indices.append(idx)
+        return indices[:self._prefetch.num]
+
+    def _prefetch_targets(self):
+        """Return lists whose images are prefetched along with this list.
+
+        Returns
+        -------
+        list
+            list of tuples ``(lst, idx_array, cancel_others)`` containing
+            the image list, the array mapping indices of this list to
+            indices in ``lst`` and whether or not pending images in ``lst``
+            not requested are supposed to be cancelled
+        """
+        return []
+
+    def _prefetch_indices(self, indices, cancel_others=True):
+        """Schedule background loading of images at input indices.
+
+        The corresponding images of all lists returned by
+        :func:`_prefetch_targets` are scheduled as well.
+        """
+        loaded = self._loaded_indices()
+        self._prefetch.schedule(self._load_image,
+                                [x for x in indices if x not in loaded],
+                                cancel_others)
+        for lst, idx_array, cancel in self._prefetch_targets():
+            if lst._prefetch is None:
+                lst._prefetch = _ImgPrefetcher(
+                    self._prefetch.num, executor=self._prefetch.executor,
+                    auto=False)
+            if not lst._prefetch.auto and lst.nof > 0:
+                lst._prefetch_indices([int(idx_array[x]) for x in indices],
+                                      cancel)
+
+    def _update_prefetch(self):
+        """Prefetch images ahead of current index (if prefetch mode)."""
+        if (self.prefetch_mode and self._prefetch.auto and self.nof > 1):
+            self._prefetch_indices(self._prefetch_window())
+
+    def _release_prefetch(self):
+        """Stop prefetching in this list and all lists driven by it."""
+        for lst, _, _ in self._prefetch_targets():
+            if lst._prefetch is not None and not lst._prefetch.auto:
+                lst._release_prefetch()
+        self._prefetch.shutdown()
+        self._prefetch = None
+
+    def _prep_settings(self):
+        """Return all settings and objects affecting image preparation.
+
+        Contains everything that is used in :func:`_apply_edit` and is
+        used to identify prepared images in the cache (see
+        :func:`activate_prep_cache`).
+
+        Returns
+        -------
+        list
+            current edit settings
+        """
+        return [self.img_prep, self._roi_abs, self._img_dtype]
+
+    def _prep_state(self):
+        """Return hashable representation of current image edit state.
+
+        Returns
+        -------
+        tuple
+            current edit state (cf. :func:`_prep_settings`)
+        """
+        return _hashable_state(self._prep_settings())
+
+    def _prep_file_key(self, list_index, state):
+        """Return identifier of prepared image in cache directory.
+
+        The identifier is a SHA-1 hash of the image file (path, size and
+        modification time) and of the content of all objects affecting the
+        image preparation (see :func:`_prep_settings`).
+
+        Parameters
+        ----------
+        list_index : int
+            index of image in file list
+        state : tuple
+            current edit state (cf. :func:`_prep_state`), used to avoid
+            recomputing the hash of the edit settings for each image
+
+        Returns
+        -------
+        str
+            hex digest
+        """
+        digests = self._prep_cache.digests
+        if state not in digests:
+            hasher = sha1()
+            _update_digest(hasher, self._prep_settings())
+            digests[state] = hasher.hexdigest()
+        path = self.files[list_index]
+        try:
+            file_info = [getsize(path), getmtime(path)]
+        except (OSError, TypeError):
+            file_info = []
+        hasher = sha1()
+        _update_digest(hasher, [path, list_index, file_info, digests[state]])
+        return hasher.hexdigest()
+
+    def _load_cached(self, key, list_index):
+        """Set prepared image from cache (if available).
+
+        Parameters
+        ----------
+        key : str
+            image identifier (e.g. "this")
+        list_index : int
+            index of image in file list
+
+        Returns
+        -------
+        bool
+            True if image was found in cache and assigned to
+            ``self.loaded_images[key]``, else False
+        """
+        if self._prep_cache is None or not self.edit_active:
+            return False
+        state = self._prep_state()
+        file_key = None
+        if self._prep_cache.cache_dir is not None:
+            file_key = self._prep_file_key(list_index, state)
+        entry = self._prep_cache.get((list_index, state), file_key)
+        if entry is None:
+            return False
+        img, load_edit = entry
+        self._load_edit[key].update(load_edit)
+        self.loaded_images[key] = img.duplicate()
+        return True
+
+    def _store_cached(self, key, list_index):
+        """Store prepared image in cache (if cache is active).
+
+        Parameters
+        ----------
+        key : str
+            image identifier (e.g. "this")
+        list_index : int
+            index of image in file list
+        """
+        if self._prep_cache is None or not self.edit_active:
+            return
+        state = self._prep_state()
+        img = self.loaded_images[key]
+        file_key = None
+        if self._prep_cache.cache_dir is not None and img.is_tau:
+            file_key = self._prep_file_key(list_index, state)
+        self._prep_cache.put((list_index, state), img.duplicate(),
+                             dict(self._load_edit[key]), file_key)
 
     def _apply_edit(self, key):
         """Apply the current image edit settings to image.
@@ -1791,6 +2475,632 @@ class _LinkedLists:
         raise NotImplementedError
 
 
+class _ImgPrefetcher(object):
+    """Background loader for upcoming images of an image list.
+
+    Unedited images (as returned by :func:`BaseImgList._load_image`) are
+    loaded in a thread pool ahead of the current list index. The number of
+    pending images is bounded by :attr:`num`, images that are not requested
+    anymore (e.g. after a jump to a different list index) are cancelled.
+
+    Parameters
+    ----------
+    num : int
+        maximum number of images that are loaded in advance
+    max_workers : :obj:`int`, optional
+        number of worker threads, defaults to ``num``
+    executor : :obj:`ThreadPoolExecutor`, optional
+        existing thread pool that is supposed to be used (e.g. the one of a
+        parent list). If None, a new pool is created on first use
+    auto : bool
+        if True, images are scheduled automatically whenever the index of
+        the corresponding list changes. If False, scheduling is done
+        externally, by the list this list is linked to
+
+    """
+
+    def __init__(self, num=4, max_workers=None, executor=None, auto=True):
+        num = int(num)
+        if num < 1:
+            raise ValueError("Number of prefetched images must be at least 1")
+        self.num = num
+        self.max_workers = max_workers
+        self.auto = auto
+
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._futures = od()
+
+    @property
+    def executor(self):
+        """Thread pool used for loading the images."""
+        if self._executor is None:
+            workers = self.max_workers
+            if workers is None:
+                workers = self.num
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+            self._owns_executor = True
+        return self._executor
+
+    @property
+    def pending(self):
+        """List indices of images that are currently prefetched."""
+        return list(self._futures.keys())
+
+    def schedule(self, load_fun, indices, cancel_others=True):
+        """Submit loading of images at the input list indices.
+
+        Parameters
+        ----------
+        load_fun : callable
+            function that loads an image given a list index
+        indices : list
+            list indices of images that are supposed to be loaded (in order
+            of priority)
+        cancel_others : bool
+            if True, pending images that are not in ``indices`` are
+            cancelled, else, the oldest pending images are cancelled only if
+            the queue exceeds :attr:`num`
+
+        """
+        requested = []
+        for idx in indices:
+            if idx not in requested:
+                requested.append(idx)
+        requested = requested[:self.num]
+        if cancel_others:
+            for idx in list(self._futures.keys()):
+                if idx not in requested:
+                    self._futures.pop(idx).cancel()
+        for idx in requested:
+            if idx not in self._futures:
+                self._futures[idx] = self.executor.submit(load_fun, idx)
+        while len(self._futures) > self.num:
+            self._futures.popitem(last=False)[1].cancel()
+
+    def pop(self, idx):
+        """Remove and return future of image at list index (None if n/a)."""
+        return self._futures.pop(idx, None)
+
+    def clear(self):
+        """Cancel all pending images."""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures = od()
+
+    def shutdown(self):
+        """Cancel all pending images and shut down thread pool."""
+        self.clear()
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._executor = None
+
+    def __getstate__(self):
+        # thread pool and pending images cannot be copied / pickled
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        state["_futures"] = od()
+        return state
+
+
+class _DirWatcher(object):
+    """Detect new files in a directory (cf. :attr:`BaseImgList.tail_mode`).
+
+    Uses inotify (if package ``inotify_simple`` is available) or else polls
+    the directory. Files that exist on initialisation are ignored.
+
+    Parameters
+    ----------
+    directory : str
+        directory that is watched
+    timeout : :obj:`float`, optional
+        maximum time in s an image list waits for the next image
+    poll_interval : float
+        time interval in s for checking the directory (polling mode)
+    settle_time : float
+        minimum time in s during which the size and modification time of a
+        new file must not change before it is reported (polling mode). The
+        time is measured from when the file is first seen, since copied files
+        may keep the modification time of the source file
+    use_inotify : bool
+        if False, polling mode is used
+
+    """
+
+    def __init__(self, directory, timeout=None, poll_interval=1.0,
+                 settle_time=0.5, use_inotify=True):
+        if not isdir(directory):
+            raise IOError("Directory %s does not exist" % directory)
+        self.directory = directory
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        # number of times, an image list was resorted due to new files
+        # arriving out of order
+        self.num_resorts = 0
+
+        self._inotify = None
+        if use_inotify and INOTIFY_AVAILABLE:
+            try:
+                self._inotify = INotify()
+                self._inotify.add_watch(directory, inotify_flags.CLOSE_WRITE |
+                                        inotify_flags.MOVED_TO)
+            except Exception as e:
+                logger.warning("Failed to watch directory %s using inotify, "
+                               "using polling instead: %s"
+                               % (directory, repr(e)))
+                self._inotify = None
+        self._known = set(join(directory, f) for f in listdir(directory))
+        # new files that are not settled yet, values are tuples containing
+        # size, modification time and time of last change
+        self._pending = {}
+        self._mtime = None
+
+    def poll(self, timeout=0):
+        """Return new files, waits until files arrive or timeout is exceeded.
+
+        Parameters
+        ----------
+        timeout : :obj:`float`, optional
+            maximum waiting time in s (if None, waits until files arrive)
+
+        Returns
+        -------
+        list
+            sorted list of new file paths
+
+        """
+        t0 = time()
+        while True:
+            new = self._check()
+            if timeout is None:
+                remaining = self.poll_interval
+            else:
+                remaining = timeout - (time() - t0)
+            if new or remaining <= 0:
+                return sorted(new)
+            if self._inotify is not None:
+                select([self._inotify], [], [], remaining)
+            else:
+                sleep(min(self.poll_interval, remaining))
+
+    def _check(self):
+        """Check directory for new files (non-blocking)."""
+        new = []
+        if self._inotify is not None:
+            for event in self._inotify.read(timeout=0):
+                path = join(self.directory, event.name)
+                if path not in self._known:
+                    self._known.add(path)
+                    new.append(path)
+            return new
+        mtime = getmtime(self.directory)
+        now = time()
+        # the directory is listed only if it was modified (or recently, in
+        # case of coarse time resolution of the file system)
+        if (mtime == self._mtime and not self._pending and
+                now - mtime > 2.0):
+            return new
+        self._mtime = mtime
+        pending = {}
+        for name in listdir(self.directory):
+            path = join(self.directory, name)
+            if path in self._known:
+                continue
+            try:
+                if isdir(path):
+                    self._known.add(path)
+                    continue
+                stat = (getsize(path), getmtime(path))
+            except OSError:
+                continue
+            last = self._pending.get(path)
+            if last is None or last[:2] != stat:
+                # file is new or still being written
+                last = stat + (now,)
+            if now - last[2] >= self.settle_time:
+                self._known.add(path)
+                new.append(path)
+            else:
+                pending[path] = last
+        self._pending = pending
+        return new
+
+    def close(self):
+        """Stop watching the directory."""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __getstate__(self):
+        # inotify instances cannot be copied / pickled, copies use polling
+        state = self.__dict__.copy()
+        state["_inotify"] = None
+        return state
+
+
+class _TailIndex(object):
+    """Meta index of an image list in tail mode.
+
+    Acquisition times (also sorted) and meta information of the list files
+    are stored in buffers that grow geometrically (cf. :class:`ImgStack`),
+    such that new files, which are more recent than the files in the list,
+    are appended without copying or sorting all times (cf.
+    :func:`BaseImgList._get_time_index`).
+
+    Parameters
+    ----------
+    index : DataFrame
+        meta index of list files (cf. :attr:`BaseImgList.meta_index`)
+
+    """
+
+    COLUMNS = ["path", "filter_id", "meas_type", "texp"]
+
+    def __init__(self, index):
+        self.num = 0
+        self._times = empty(0, dtype="datetime64[ns]")
+        self._times_sorted = empty(0, dtype="datetime64[ns]")
+        self._order = empty(0, dtype=int)
+        self._cols = od([(col, []) for col in self.COLUMNS])
+        self.append(index)
+        # only time information in file names (date is 1900-01-01)
+        self.time_only = bool(
+            self.num and self._times[0].astype("datetime64[D]") ==
+            datetime64("1900-01-01", "D"))
+
+    @property
+    def paths(self):
+        """List of file paths."""
+        return self._cols["path"]
+
+    @property
+    def times(self):
+        """Acquisition times of all files."""
+        return self._times[:self.num]
+
+    def time_index(self):
+        """Return times, sorted times and order (cf. _get_time_index)."""
+        n = self.num
+        return self._times[:n], self._times_sorted[:n], self._order[:n]
+
+    def get_meta(self, list_index):
+        """Get meta input dict for file at list index."""
+        start_acq = self._times[list_index]
+        texp = self._cols["texp"][list_index]
+        return {"start_acq": None if isnat(start_acq)
+                else pd.Timestamp(start_acq).to_pydatetime(),
+                "texp": None if isnan(texp) else float(texp)}
+
+    def append(self, index):
+        """Append meta index of new files."""
+        k = len(index)
+        n = self.num
+        if n + k > len(self._times):
+            size = max(n + k, 2 * len(self._times), 16)
+            for attr in ("_times", "_times_sorted", "_order"):
+                buf = getattr(self, attr)
+                new = empty(size, dtype=buf.dtype)
+                new[:n] = buf[:n]
+                setattr(self, attr, new)
+        times = index["start_acq"].values.astype("datetime64[ns]")
+        self._times[n:n + k] = times
+        order = argsort(times, kind="mergesort")
+        first = times[order[:1]]
+        if not n or (len(first) and not isnat(first[0]) and
+                     not isnat(self._times_sorted[n - 1]) and
+                     first[0] >= self._times_sorted[n - 1]):
+            self._order[n:n + k] = order + n
+            self._times_sorted[n:n + k] = times[order]
+        else:
+            order = argsort(self._times[:n + k], kind="mergesort")
+            self._order[:n + k] = order
+            self._times_sorted[:n + k] = self._times[:n + k][order]
+        for col, vals in six.iteritems(self._cols):
+            vals.extend(index[col].tolist())
+        self.num = n + k
+
+    def to_frame(self):
+        """Return meta index as DataFrame."""
+        return DataFrame(od([("path", list(self.paths)),
+                             ("start_acq", self.times.copy()),
+                             ("filter_id", list(self._cols["filter_id"])),
+                             ("meas_type", list(self._cols["meas_type"])),
+                             ("texp", asarray(self._cols["texp"],
+                                              dtype=float))]))
+
+
+def _nearest_time_indices(times_sorted, order, query, tolerance=None):
+    """Find indices of closest time stamps using binary search.
+
+    Parameters
+    ----------
+    times_sorted : array
+        sorted time stamps (``datetime64``)
+    order : array
+        indices of the sorted time stamps in the original (unsorted) array
+    query : array
+        time stamps for which the closest time stamps are searched
+    tolerance : :obj:`timedelta`, optional
+        maximum allowed time difference
+
+    Returns
+    -------
+    array
+        indices (in original array) of closest time stamp for each query time
+        stamp. If several time stamps are equally close, the smallest index
+        is used. Entries that are not within ``tolerance`` are set to -1
+
+    """
+    query = asarray(query, dtype="datetime64[ns]")
+    times_sorted = asarray(times_sorted, dtype="datetime64[ns]")
+    last = len(times_sorted) - 1
+    pos = searchsorted(times_sorted, query)
+    # first of equal time stamps (i.e. smallest index, sorting is stable)
+    left = searchsorted(times_sorted, times_sorted[clip(pos - 1, 0, last)])
+    right = clip(pos, 0, last)
+    del_left = abs(query - times_sorted[left])
+    del_right = abs(times_sorted[right] - query)
+    use_right = ((del_right < del_left) |
+                 ((del_right == del_left) & (order[right] < order[left])))
+    idx = order[where(use_right, right, left)]
+    if tolerance is not None:
+        del_t = minimum(del_left, del_right)
+        idx[del_t > timedelta64(tolerance)] = -1
+    return idx
+
+
+class _Identity(object):
+    """Hashable reference to an unhashable object (e.g. numpy array).
+
+    Two references are equal if they point to the same object. The object
+    itself is stored, such that its id cannot be reused by a different
+    object as long as the reference exists (cf. :func:`_hashable_state`).
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __hash__(self):
+        return id(self.obj)
+
+    def __eq__(self, other):
+        return isinstance(other, _Identity) and other.obj is self.obj
+
+    def __ne__(self, other):
+        return not self == other
+
+
+def _hashable_state(val):
+    """Convert input into hashable object for edit state comparison.
+
+    Containers are converted into tuples, all other unhashable objects
+    (e.g. numpy arrays) are represented by a reference to the object (see
+    :class:`_Identity`), i.e. objects modified in place are not detected.
+    """
+    if isinstance(val, dict):
+        return tuple((k, _hashable_state(v)) for k, v in sorted(val.items()))
+    elif isinstance(val, (list, tuple)):
+        return tuple(_hashable_state(v) for v in val)
+    try:
+        hash(val)
+        return val
+    except TypeError:
+        return _Identity(val)
+
+
+def _update_digest(hasher, val):
+    """Update hash object with the content of input (cf. :func:`sha1`).
+
+    Unlike :func:`_hashable_state`, the content of images, arrays, image
+    lists (file paths) and calibration objects is considered, such that
+    the hash can be used to identify prepared images across sessions.
+    """
+    if isinstance(val, dict):
+        for k in sorted(val.keys(), key=str):
+            hasher.update(str(k).encode("utf-8"))
+            _update_digest(hasher, val[k])
+    elif isinstance(val, (list, tuple)):
+        hasher.update(("seq%d" % len(val)).encode("utf-8"))
+        for v in val:
+            _update_digest(hasher, v)
+    elif isinstance(val, ndarray):
+        hasher.update(("%s%s" % (val.dtype, val.shape)).encode("utf-8"))
+        hasher.update(ascontiguousarray(val).tobytes())
+    elif isinstance(val, Img):
+        _update_digest(hasher, [val.img, val.edit_log, list(val._roi_abs)])
+    elif isinstance(val, Series):
+        _update_digest(hasher, [val.values, [str(x) for x in val.index]])
+    elif isinstance(val, BaseImgList):
+        _update_digest(hasher, val.files)
+    elif isinstance(val, MeasGeometry):
+        hasher.update(val.param_hash.encode("utf-8"))
+    elif isinstance(val, CalibData):
+        fun = val.calib_fun
+        _update_digest(hasher, [type(val).__name__,
+                                getattr(fun, "__name__", repr(fun)),
+                                val._calib_coeffs, val._polyorder,
+                                val.poly_through_origin, val.tau_vec,
+                                val.cd_vec, val.cd_vec_err])
+    else:
+        hasher.update(repr(val).encode("utf-8"))
+
+
+def _json_default(val):
+    """Encode objects not supported by :mod:`json` (e.g. datetime)."""
+    if isinstance(val, datetime):
+        return {"__datetime__": val.strftime("%Y%m%d%H%M%S%f")}
+    try:
+        return val.item()  # numpy scalars
+    except AttributeError:
+        return str(val)
+
+
+def _json_pairs_hook(pairs):
+    """Decode objects encoded using :func:`_json_default`."""
+    d = od(pairs)
+    if list(d.keys()) == ["__datetime__"]:
+        return datetime.strptime(d["__datetime__"], "%Y%m%d%H%M%S%f")
+    return d
+
+
+def _save_prepared_img(path, img, load_edit):
+    """Save prepared image and meta information as compressed .npz file."""
+    info = json.dumps({"meta": img.meta, "edit_log": img.edit_log,
+                       "load_edit": load_edit,
+                       "dtype": getattr(img.dtype, "__name__", img.dtype)},
+                      default=_json_default)
+    arrays = {"img": img.img, "roi_abs": asarray(img._roi_abs),
+              "info": array(info)}
+    if isinstance(img.vign_mask, ndarray):
+        arrays["vign_mask"] = img.vign_mask
+    savez_compressed(path, **arrays)
+
+
+def _load_prepared_img(path):
+    """Load prepared image saved with :func:`_save_prepared_img`.
+
+    Returns
+    -------
+    tuple
+        2-element tuple containing the image (:obj:`Img`) and the edit log
+        of the original image file (:obj:`dict`)
+    """
+    with load(path) as data:
+        info = json.loads(str(data["info"]), object_pairs_hook=_json_pairs_hook)
+        img = Img(data["img"], dtype=info["dtype"])
+        img._roi_abs = [int(x) for x in data["roi_abs"]]
+        if "vign_mask" in data.files:
+            img.vign_mask = data["vign_mask"]
+    img.edit_log.update(info["edit_log"])
+    img.meta.update(info["meta"])
+    return img, dict(info["load_edit"])
+
+
+class _PreparedImgCache(object):
+    """LRU cache for prepared images of an image list.
+
+    Images are stored together with the edit log of the original image file
+    (cf. ``_load_edit`` in :class:`BaseImgList`) and accessed via keys
+    containing the list index and the edit state of the list. The least
+    recently used images are removed if the memory used exceeds
+    :attr:`max_bytes`.
+
+    If :attr:`cache_dir` is specified, images can additionally be stored on
+    disk (one compressed ``.npz`` file per image), identified by a file key
+    that is persistent across sessions (see
+    :func:`BaseImgList._prep_file_key`).
+
+    Parameters
+    ----------
+    max_bytes : float
+        memory budget in bytes
+    cache_dir : :obj:`str`, optional
+        directory for storage of prepared images on disk
+
+    """
+
+    def __init__(self, max_bytes=500e6, cache_dir=None):
+        if not max_bytes > 0:
+            raise ValueError("Memory budget of image cache must be positive")
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.nbytes = 0
+        self._entries = od()
+        # hashes of edit settings (for file keys), keys are edit states
+        self.digests = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def file_path(self, file_key):
+        """Return path of cache file for input file key."""
+        return join(self.cache_dir, "prep_%s.npz" % file_key)
+
+    def get(self, key, file_key=None):
+        """Return cached entry ``(img, load_edit)`` (None if n/a).
+
+        If the image is not in memory and a file key is provided, the image
+        is loaded from the cache directory (if available).
+        """
+        try:
+            entry = self._entries.pop(key)
+        except KeyError:
+            entry = self._load(file_key)
+            if entry is None:
+                return None
+            self.put(key, *entry)
+            return entry
+        self._entries[key] = entry
+        return entry
+
+    def put(self, key, img, load_edit, file_key=None):
+        """Add prepared image to cache and remove least recently used.
+
+        If a file key is provided, the image is also saved in the cache
+        directory (if it does not exist yet).
+        """
+        if file_key is not None:
+            self._save(file_key, img, load_edit)
+        nbytes = img.img.nbytes
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[0].img.nbytes
+        self._entries[key] = (img, load_edit)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= self._entries.popitem(last=False)[1][0].img.nbytes
+
+    def clear(self):
+        """Remove all cached images from memory.
+
+        Note
+        ----
+        Files in the cache directory are not deleted.
+        """
+        self._entries = od()
+        self.digests = {}
+        self.nbytes = 0
+
+    def _load(self, file_key):
+        """Load entry from cache directory (None if n/a)."""
+        if file_key is None:
+            return None
+        path = self.file_path(file_key)
+        if not exists(path):
+            return None
+        try:
+            return _load_prepared_img(path)
+        except Exception as e:
+            logger.warning("Failed to load prepared image from %s: %s"
+                           % (path, repr(e)))
+            return None
+
+    def _save(self, file_key, img, load_edit):
+        """Save entry in cache directory."""
+        path = self.file_path(file_key)
+        if exists(path):
+            return
+        try:
+            if not isdir(self.cache_dir):
+                makedirs(self.cache_dir)
+            _save_prepared_img(path, img, load_edit)
+        except Exception as e:
+            logger.warning("Failed to save prepared image in %s: %s"
+                           % (path, repr(e)))
+
+    def __getstate__(self):
+        # cached images are not copied / pickled
+        state = self.__dict__.copy()
+        state["_entries"] = od()
+        state["digests"] = {}
+        state["nbytes"] = 0
+        return state
+
+
 class ImgList(BaseImgList):
     u"""Image list object with expanded functionality (cf. :class:`BaseImgList`).
 
@@ -1846,7 +3156,8 @@ class ImgList(BaseImgList):
             "senscorr": False,  # correct for cross-detector sensitivity
                                 # variations
             "gascalib": False,
-            "shift": False
+            "shift": False,
+            "reduce_first": False  # reduce image size before corrections
         })  # load as calibrated SO2 images
 
         self._ext_coeffs = None
@@ -1858,6 +3169,9 @@ class ImgList(BaseImgList):
         self._bg_list_id = None  # ID of linked background list
 
         self.bg_model = PlumeBackgroundModel()
+        # settings of background models of last prepared image (see
+        # _prep_state)
+        self._bg_model_state = None
 
         self._senscorr_mask = None
         self._calib_data = None
@@ -1962,6 +3276,18 @@ class ImgList(BaseImgList):
     def dilcorr_mode(self, val):
         self.activate_dilcorr_mode(val)
 
+    @property
+    def reduce_first_mode(self):
+        """Activate / deactivate size reduction prior to image corrections.
+
+        See :func:`activate_reduce_first_mode` for details.
+        """
+        return self._list_modes["reduce_first"]
+
+    @reduce_first_mode.setter
+    def reduce_first_mode(self, val):
+        self.activate_reduce_first_mode(val)
+
     @property
     def sensitivity_corr_mode(self):
         """Activate / deactivate AA sensitivity correction mode."""
@@ -2060,6 +3386,7 @@ class ImgList(BaseImgList):
         if not isinstance(val, Series):
             raise ValueError("Need pandas Series object")
         self._ext_coeffs = val
+        self.clear_prep_cache()
 
     @property
     def bg_img(self):
@@ -2150,6 +3477,7 @@ class ImgList(BaseImgList):
                                  "mask and list images")
 
         self._senscorr_mask = val
+        self.clear_prep_cache()
 
     @property
     def calib_data(self):
@@ -2170,6 +3498,7 @@ class ImgList(BaseImgList):
             raise ValueError("Cannot set calibration data in image list, "
                              "calibration object is not ready")
         self._calib_data = val
+        self.clear_prep_cache()
 
     @property
     def doas_fov(self):
@@ -2281,6 +3610,44 @@ class ImgList(BaseImgList):
         self._check_shift_others()
         self.load()
 
+    def activate_reduce_first_mode(self, value=True):
+        """Activate / deactivate size reduction prior to image corrections.
+
+        If active, loaded images are converted to the pyramid level of this
+        list (:attr:`pyrlevel`) before all other preparation steps (e.g.
+        dark correction, computation of tau or AA images), which reduces the
+        computational cost considerably if images are analysed at a reduced
+        resolution. If :attr:`crop` is active, the images are also cropped
+        before the dark and vignetting correction (in intensity mode) or
+        directly after the computation of tau or AA images (since the
+        reference areas of the background model may be located outside the
+        ROI). Dark and background images and correction masks are reduced
+        accordingly (only once, not for each image) and the background
+        model settings are converted (see
+        :func:`PlumeBackgroundModel.convert`).
+
+        Note
+        ----
+        Dark subtraction commutes with the size reduction, all other
+        operations (e.g. the logarithm in tau and AA images) only
+        approximately, i.e. prepared images may deviate slightly from those
+        prepared in the default order. The mode has no effect if shift or
+        dilution correction mode are active or if the pyramid level of this
+        list is smaller than the one of the raw images. In AA mode, it
+        should also be activated in the linked off-band list.
+
+        Parameters
+        ----------
+        value : bool
+            new mode
+
+        """
+        value = bool(value)
+        if value is self.reduce_first_mode:
+            return
+        self._list_modes["reduce_first"] = value
+        self.load()
+
     def activate_tau_mode(self, value=True):
         """Activate tau mode.
 
@@ -2665,6 +4032,7 @@ class ImgList(BaseImgList):
                 self.vign_mask  # raises AttributeError if not available
             except AttributeError:
                 self.det_vign_mask_from_bg_img()
+        self.clear_prep_cache()
         self._check_shift_others()
 
     def _check_shift_others(self):
@@ -2937,6 +4305,7 @@ class ImgList(BaseImgList):
         self._linked_indices[list_id] = idx_array
         # self.change_index_linked_lists()
         other_list.bg_model.update(**self.bg_model.settings_dict())
+        self.clear_prep_cache()
 
         self.load()
 
@@ -2951,6 +4320,7 @@ class ImgList(BaseImgList):
         del self.linked_lists[list_id]
         del self._linked_indices[list_id]
         del self._always_reload[list_id]
+        self.clear_prep_cache()
 
     def link_dark_offset_lists(self, *lists):
         """Assign dark and offset image lists to this object.
@@ -3024,9 +4394,89 @@ class ImgList(BaseImgList):
             value["idx"] = self.assign_indices_linked_list(value["list"])
         for gain, value in six.iteritems(self.offset_lists):
             value["idx"] = self.assign_indices_linked_list(value["list"])
+        self.clear_prep_cache()
         _print_list(warnings)
         return dark_assigned, offset_assigned
 
+    def _sync_linked_lists(self, num_before, resorted):
+        """Update lists linked to this list after files were added.
+
+        Linked lists and dark / offset lists in tail mode are updated as well
+        (without waiting for new files) and only the linked indices that
+        may have changed are determined again (cf. :func:`update_files`).
+
+        Parameters
+        ----------
+        num_before : int
+            number of files in this list before the files were added
+        resorted : bool
+            whether this list was sorted again, since the new files were
+            not the most recent ones
+
+        """
+        changed = False
+        for key, lst in six.iteritems(self.linked_lists):
+            idx, chg = self._update_linked_indices(
+                lst, self._linked_indices[key], num_before, resorted)
+            self._linked_indices[key] = idx
+            changed = changed or chg
+        for lists in [self.dark_lists, self.offset_lists]:
+            for value in lists.values():
+                value["idx"], chg = self._update_linked_indices(
+                    value["list"], value["idx"], num_before, resorted)
+                changed = changed or chg
+        if changed:
+            # prepared images of existing indices might be outdated
+            self.clear_prep_cache()
+
+    def _update_linked_indices(self, lst, idx_array, num_before, resorted):
+        """Update look up table of a linked list after files were added.
+
+        Indices of new files in this list are assigned. If the linked list
+        got new images, too (in tail mode), the indices of the files in this
+        list that are more recent than the previously last image in the
+        linked list are assigned again (all other files cannot be closer in
+        time to any of the new images).
+
+        Returns
+        -------
+        tuple
+            updated look up table and bool specifying whether indices of
+            existing files (before update) changed
+        """
+        lst_num_before, lst_resorts = lst.nof, None
+        if lst.tail_mode:
+            lst_resorts = lst._tail.num_resorts
+            last = lst._get_time_index()[1][-1:].copy()
+            lst._add_and_sync(0, reload=False)
+        if lst.nof == 1:
+            # all images are assigned to the only image in the linked list
+            return zeros(self.nof, dtype=int), False
+        times = self._get_time_index()[0]
+        lst_times = lst._get_time_index()[1]
+        if (resorted or lst_num_before < 2 or
+                (lst_resorts is not None and
+                 lst._tail.num_resorts > lst_resorts) or
+                isnat(times).any() or isnat(lst_times).any()):
+            new_idx = self.assign_indices_linked_list(lst)
+            return new_idx, bool((new_idx[:num_before] !=
+                                  idx_array[:num_before]).any())
+        rows = arange(num_before, self.nof)
+        if lst.nof > lst_num_before and len(last):
+            # files in this list more recent than previous last image in
+            # linked list
+            _, times_sorted, order = self._get_time_index()
+            pos = searchsorted(times_sorted, last[0], side="right")
+            rows = unique(concatenate([order[pos:], rows]))
+        idx_array = concatenate([idx_array,
+                                 zeros(self.nof - num_before, dtype=int)])
+        old = idx_array[rows[rows < num_before]].copy()
+        _, lst_sorted, lst_order = lst._get_time_index()
+        idx_array[rows] = _nearest_time_indices(lst_sorted, lst_order,
+                                                times[rows])
+        return idx_array, bool((idx_array[rows[rows < num_before]] !=
+                                old).any())
+
     """INDEX AND IMAGE LOAD MANAGEMENT"""
 
     def change_index_linked_lists(self):
@@ -3042,10 +4492,7 @@ class ImgList(BaseImgList):
             print_log.warning("Image load aborted...")
             return False
         if self.nof > 1:
-            next_img = self._load_image(self.next_index)
-            self.loaded_images["next"] = next_img
-            self._load_edit["next"].update(next_img.edit_log)
-            self._apply_edit("next")
+            self._load_next()
         else:
             print_log.warning("Image list contains only one image. Setting this image both "
                  "in <this> and <next> attr.")
@@ -3062,8 +4509,32 @@ class ImgList(BaseImgList):
                 self.optflow_mode = 0
         return True
 
+    def _load_next(self):
+        """Load and prepare image at next index (or take it from cache).
+
+        In :attr:`tail_mode`, the current image is used if the current index
+        is the last one (the next image is loaded when it arrives).
+        """
+        if self.tail_mode and not self._tail_next_available():
+            self.loaded_images["next"] = self.loaded_images["this"]
+            self._load_edit["next"].update(self._load_edit["this"])
+            return
+        if not self._load_cached("next", self.next_index):
+            next_img = self._get_raw_image(self.next_index)
+            self.loaded_images["next"] = next_img
+            self._load_edit["next"].update(next_img.edit_log)
+            self._apply_edit("next")
+            self._store_cached("next", self.next_index)
+
     def goto_next(self):
-        """Load next image in list."""
+        """Load next image in list.
+
+        In :attr:`tail_mode`, this method waits for the next image, if the
+        last image of the list is reached.
+        """
+        if (self.tail_mode and not self._tail_next_available() and
+                not self._wait_next_tail()):
+            return False
         if self.nof < 2 or not self._auto_reload:
             logger.warning("Could not load next image, number of files in list: " +
                   str(self.nof))
@@ -3082,10 +4553,8 @@ class ImgList(BaseImgList):
         if self.update_cam_geodata:
             self.meas_geometry.update_cam_specs(**this_img.meta)
 
-        next_img = self._load_image(self.next_index)
-        self.loaded_images["next"] = next_img
-        self._load_edit["next"].update(next_img.edit_log)
-        self._apply_edit("next")
+        self._load_next()
+        self._update_prefetch()
         if self.optflow_mode:
             try:
                 self.set_flow_images()
@@ -3133,43 +4602,10 @@ class ImgList(BaseImgList):
             each of the provided input :class:`LineOnImage` objects.
 
         """
-        if lines is None:
-            lines = []
-        cfn_tmp = self.cfn
-        if isinstance(start_idx, datetime):
-            start_idx = self.timestamp_to_index(start_idx)
-        if isinstance(stop_idx, datetime):
-            stop_idx = self.timestamp_to_index(stop_idx)
-        if stop_idx is None or stop_idx > self.nof:
-            stop_idx = self.nof
-
-        num = self._iter_num(start_idx, stop_idx)
-        flm = self.optflow_mode
-        self.goto_img(start_idx)
         self.optflow.settings.update(**optflow_settings)
-        props = []
-        for line in lines:
-            if isinstance(line, LineOnImage):
-                props.append(LocalPlumeProperties(line.line_id,
-                                                  color=line.color))
-
-        if len(props) == 0:
-            lines = [None]
-            props.append(
-                LocalPlumeProperties("thresh_%.1f" % intensity_thresh))
-
-        self.optflow_mode = True
-        for k in range(num):
-            plume_mask = self.get_thresh_mask(intensity_thresh)
-            for i in range(len(props)):
-                props[i].get_and_append_from_farneback(self.optflow,
-                                                       line=lines[i],
-                                                       pix_mask=plume_mask)
-
-            self.goto_next()
-        self.goto_img(cfn_tmp)
-        self.optflow_mode = flm
-        return props
+        consumer = FlowHistoConsumer(lines, intensity_thresh)
+        pipe = ImgListPipeline(self, [consumer])
+        return pipe.run(start_idx, stop_idx)["flow_histo"]
 
     def get_thresh_mask(self, thresh=None, this_and_next=True):
         """Get bool mask based on intensity threshold.
@@ -3488,7 +4924,7 @@ class ImgList(BaseImgList):
         if calc_mask or compute_bg:
             # model OD image for computation of plume pixel mask and current
             # sky background
-            bg_raw = self.bg_img.to_pyrlevel(img.pyrlevel)
+            bg_raw = self.bg_img.convert(img.pyrlevel)
             tau_uncorr = self.bg_model.get_tau_image(
                 img, bg_raw, check_state=img_check_plumemask)
 
@@ -3701,6 +5137,159 @@ class ImgList(BaseImgList):
 
     """Private methods"""
 
+    def _loaded_indices(self):
+        """List indices of images that are currently loaded."""
+        return [self.index, self.next_index]
+
+    def _prefetch_targets(self):
+        """Return lists whose images are prefetched along with this list.
+
+        These are all linked lists and all dark and offset lists (see
+        :func:`BaseImgList._prefetch_targets`).
+        """
+        targets = []
+        for key, lst in six.iteritems(self.linked_lists):
+            targets.append((lst, self._linked_indices[key], True))
+        for lists in (self.dark_lists, self.offset_lists):
+            for info in lists.values():
+                if "idx" in info:
+                    targets.append((info["list"], info["idx"], False))
+        return targets
+
+    def _prep_settings(self):
+        """Return all settings and objects affecting image preparation.
+
+        In addition to the image preparation settings (see
+        :func:`BaseImgList._prep_settings`), this includes the list modes and
+        all objects required for the active modes (e.g. dark images,
+        background image and model, linked off-band list, calibration data).
+
+        Returns
+        -------
+        list
+            current edit settings
+        """
+        modes = dict(self._list_modes)
+        modes.pop("optflow")
+        settings = super(ImgList, self)._prep_settings() + [modes]
+        if self.darkcorr_mode:
+            settings.append([self.darkcorr_opt, self.master_dark,
+                             self.master_offset, self.dark_lists,
+                             self.offset_lists])
+        if self.shift_mode:
+            settings.append(self.camera.reg_shift_off)
+        if self.vigncorr_mode or self.dilcorr_mode:
+            settings.append(self._vign_mask)
+        if self.tau_mode or self.aa_mode:
+            settings.extend([self._bg_settings(),
+                             self.bg_model.settings_dict()])
+            if self.aa_mode:
+                off_list = self.get_off_list()
+                settings.extend([off_list, self._linked_indices,
+                                 off_list._prep_settings(),
+                                 off_list._bg_settings()])
+        if self.dilcorr_mode:
+            s = self.dilcorr_settings
+            settings.append([s.tau_thresh, s.erosion_kernel_size,
+                             s.dilation_kernel_size,
+                             s.bg_model.settings_dict(), self._ext_coeffs,
+                             self._meas_geometry])
+        if self.sensitivity_corr_mode:
+            settings.append(self._senscorr_mask)
+        if self.calib_mode:
+            settings.append(self._calib_data)
+        return settings
+
+    def _prep_state(self):
+        """Return hashable representation of current image edit state.
+
+        The prepared image cache is cleared if the settings of
+        :attr:`bg_model` (or of the background model used for the dilution
+        correction) changed since the last call.
+
+        Returns
+        -------
+        tuple
+            current edit state (cf. :func:`_prep_settings`)
+        """
+        bg_state = _hashable_state([self.bg_model.settings_dict(),
+                                    self.dilcorr_settings.bg_model.
+                                    settings_dict()])
+        if bg_state != self._bg_model_state:
+            if self._bg_model_state is not None:
+                self.clear_prep_cache()
+            self._bg_model_state = bg_state
+        return super(ImgList, self)._prep_state()
+
+    def _bg_settings(self):
+        """Background image or list state (cf. :func:`_prep_settings`)."""
+        if isinstance(self._bg_img, Img):
+            return self._bg_img
+        try:
+            lst = self.bg_list
+        except AttributeError:
+            return None
+        return [lst, lst.index, lst._prep_settings()]
+
+    def _reduce_first_possible(self, img):
+        """Check if loaded image can be reduced prior to corrections.
+
+        See :func:`activate_reduce_first_mode`.
+        """
+        return (self.reduce_first_mode and not self.shift_mode and
+                not self.dilcorr_mode and
+                self.img_prep["pyrlevel"] >= img.pyrlevel)
+
+    def _get_reduced_mask(self, name, mask, pyrlevel_raw, pyrlevel,
+                          crop=False):
+        """Return correction mask converted to pyramid level (and ROI).
+
+        Used in :attr:`reduce_first_mode` for correction masks that refer to
+        the raw images. The converted masks are cached (see
+        :func:`Img.convert`) and only updated if the mask is replaced.
+
+        Parameters
+        ----------
+        name : str
+            name of mask (e.g. "vign")
+        mask : ndarray
+            correction mask (remains unchanged)
+        pyrlevel_raw : int
+            pyramid level of the raw images (and the mask)
+        pyrlevel : int
+            pyramid level of result
+        crop : bool
+            if True, the result is cropped to :attr:`roi_abs`
+
+        Returns
+        -------
+        Img
+            converted mask
+
+        """
+        entry = self._reduced_inputs.get(name)
+        if entry is None or entry[0] is not mask or entry[1] != pyrlevel_raw:
+            img = Img(mask)
+            img.edit_log["pyrlevel"] = pyrlevel_raw
+            entry = (mask, pyrlevel_raw, img)
+            self._reduced_inputs[name] = entry
+        return entry[2].convert(pyrlevel, self.roi_abs if crop else None)
+
+    def _get_reduced_bg_model(self, pyrlevel_rel):
+        """Return background model for images reduced after loading.
+
+        The converted model (see :func:`PlumeBackgroundModel.convert`) is
+        cached and only updated if the settings of :attr:`bg_model` change.
+        """
+        model = self.bg_model
+        settings = (pyrlevel_rel, _hashable_state(model.settings_dict()))
+        entry = self._reduced_inputs.get("bg_model")
+        if entry is not None and entry[0] is model and entry[1] == settings:
+            return entry[2]
+        reduced = model.convert(pyrlevel_rel)
+        self._reduced_inputs["bg_model"] = (model, settings, reduced)
+        return reduced
+
     def _apply_edit(self, key):
         """Apply the current image edit settings to image.
 
@@ -3715,10 +5304,20 @@ class ImgList(BaseImgList):
                  "be performed" % self.list_id)
             return
         img = self.loaded_images[key]
+        # pyramid level of raw image on load
+        pyrlevel_raw = img.pyrlevel
+        reduce_first = self._reduce_first_possible(img)
+        cropped = False
+        if reduce_first:
+            img.to_pyrlevel(self.img_prep["pyrlevel"])
+            if self.img_prep["crop"] and not (self.tau_mode or self.aa_mode):
+                img.crop(self.roi_abs)
+                cropped = True
         # apply dark correction
         if self.darkcorr_mode:
-            dark = self.get_dark_image(key).to_pyrlevel(img.pyrlevel)
-            img.subtract_dark_image(dark)
+            dark = self.get_dark_image(key).convert(
+                img.pyrlevel, self.roi_abs if cropped else None)
+            img.subtract_dark_image(dark, inplace=True)
         if self.shift_mode:
             if img.pyrlevel != 0:
                 raise AttributeError("Shift cannot be applied for images that "
@@ -3761,8 +5360,8 @@ class ImgList(BaseImgList):
                     raise AttributeError("Off-band image is in tau mode, "
                                          "please deactivate tau_mode in "
                                          "offband list...")
-                bg_on = self.bg_img.to_pyrlevel(img.pyrlevel)
-                bg_off = off_list.bg_img.to_pyrlevel(img.pyrlevel)
+                bg_on = self.bg_img.convert(img.pyrlevel)
+                bg_off = off_list.bg_img.convert(img.pyrlevel)
                 aa_uncorr = self.bg_model.get_aa_image(img, off_img,
                                                        bg_on, bg_off)
                 plume_pix_mask = self.calc_plumepix_mask(
@@ -3807,11 +5406,14 @@ class ImgList(BaseImgList):
 
         else:
             bg = None
+            bg_model = self.bg_model
+            if reduce_first and img.pyrlevel != pyrlevel_raw:
+                bg_model = self._get_reduced_bg_model(img.pyrlevel -
+                                                      pyrlevel_raw)
             if self.tau_mode:
                 if self.bg_model.mode > 0:  # dilution_corr is not active
-                    bg = self.bg_img.to_pyrlevel(img.pyrlevel)
-                img = self.bg_model.get_tau_image(plume_img=img,
-                                                  bg_img=bg)
+                    bg = self.bg_img.convert(img.pyrlevel)
+                img = bg_model.get_tau_image(plume_img=img, bg_img=bg)
             elif self.aa_mode:
                 off_list = self.get_off_list()
                 off_img = off_list.loaded_images[key].to_pyrlevel(img.pyrlevel)
@@ -3835,20 +5437,28 @@ class ImgList(BaseImgList):
                         "Please deactivate...")
 
                 if self.bg_model.mode > 0:  # dilution_corr is not active
-                    bg = self.bg_img.to_pyrlevel(img.pyrlevel)
+                    bg = self.bg_img.convert(img.pyrlevel)
 
                 # make sure, the dilution correction mode is activated in the
                 # off list if it is activated here
-                bg_off = off_list.bg_img.to_pyrlevel(img.pyrlevel)
-
-                img = self.bg_model.get_aa_image(plume_on=img,
-                                                 plume_off=off_img,
-                                                 bg_on=bg,
-                                                 bg_off=bg_off)
+                bg_off = off_list.bg_img.convert(img.pyrlevel)
+
+                img = bg_model.get_aa_image(plume_on=img,
+                                            plume_off=off_img,
+                                            bg_on=bg,
+                                            bg_off=bg_off)
+            if reduce_first and self.img_prep["crop"]:
+                img.crop(self.roi_abs)
+                cropped = True
         # if image is tau or AA
         if img.is_tau:
             if self.sensitivity_corr_mode:
-                img = img / self.senscorr_mask
+                mask = self.senscorr_mask
+                if reduce_first:
+                    mask = self._get_reduced_mask("senscorr", mask.img,
+                                                  pyrlevel_raw, img.pyrlevel,
+                                                  cropped)
+                img /= mask
                 img.edit_log["senscorr"] = 1
             if self.calib_mode:
                 img.img = self.calib_data(img.img)
@@ -3856,10 +5466,16 @@ class ImgList(BaseImgList):
 
         # apply vignetting correction only to images in intensity space
         if not img.is_tau and self.vigncorr_mode:
-            img.correct_vignetting(self.vign_mask, new_state=True)
+            mask = self.vign_mask
+            if reduce_first:
+                mask = self._get_reduced_mask("vign",
+                                              getattr(mask, "img", mask),
+                                              pyrlevel_raw, img.pyrlevel,
+                                              cropped)
+            img.correct_vignetting(mask, new_state=True, inplace=True)
 
         img.to_pyrlevel(self.img_prep["pyrlevel"])
-        if self.img_prep["crop"]:
+        if self.img_prep["crop"] and not cropped:
             img.crop(self.roi_abs)
         if self.img_prep["8bit"]:
             img._to_8bit_int(new_im=False)
@@ -3873,8 +5489,8 @@ class ImgList(BaseImgList):
         """Try to compute an AA test-image."""
         on = self._load_image(self.index)
         off = off_list._load_image(off_list.index)
-        bg_on = self.bg_img.to_pyrlevel(on.pyrlevel)
-        bg_off = off_list.bg_img.to_pyrlevel(off.pyrlevel)
+        bg_on = self.bg_img.convert(on.pyrlevel)
+        bg_off = off_list.bg_img.convert(off.pyrlevel)
         return self.bg_model.get_aa_image(on, off, bg_on, bg_off,
                                           check_state=False)
 
@@ -4122,7 +5738,7 @@ class ImgListLayered(ImgList):
         # errors.
         image = Img(input=img_file,
                     import_method=self.camera.image_import_method,
-                    **meta)
+                    dtype=self._img_dtype, **meta)
         return image
 
 # OLD version of ImgList before major changes (stamp: 3/3/2018)
@@ -23,15 +23,43 @@ import six
 
 # Polynomial fit functions of different order, including versions that go
 # through the origin of the coordinate system
-# (e.g. used in doascalib.py), dictionary keys are the polynomial order
-polys = {1: lambda x, a0, a1: a0 * x + a1,
-         2: lambda x, a0, a1, a2: a0 * x**2 + a1 * x + a2,
-         3: lambda x, a0, a1, a2, a3: a0 * x**3 + a1 * x**2 + a2 * x + a3}
-
-polys_through_origin = {1: lambda x, a0: a0 * x,
-                        2: lambda x, a0, a1: a0 * x**2 + a1 * x,
-                        3: lambda x, a0, a1, a2: a0 * x**3 + a1 * x**2 + a2 * x
-                        }
+# (e.g. used in doascalib.py). These are defined as module level functions
+# (and not as lambdas) such that calibration objects can be pickled (e.g. for
+# multiprocessing)
+
+
+def poly1(x, a0, a1):
+    return a0 * x + a1
+
+
+def poly2(x, a0, a1, a2):
+    return a0 * x**2 + a1 * x + a2
+
+
+def poly3(x, a0, a1, a2, a3):
+    return a0 * x**3 + a1 * x**2 + a2 * x + a3
+
+
+def poly1_through_origin(x, a0):
+    return a0 * x
+
+
+def poly2_through_origin(x, a0, a1):
+    return a0 * x**2 + a1 * x
+
+
+def poly3_through_origin(x, a0, a1, a2):
+    return a0 * x**3 + a1 * x**2 + a2 * x
+
+
+# dictionary keys are the polynomial order
+polys = {1: poly1,
+         2: poly2,
+         3: poly3}
+
+polys_through_origin = {1: poly1_through_origin,
+                        2: poly2_through_origin,
+                        3: poly3_through_origin}
 
 
 def cfun_kern2015(x, a0, a1):
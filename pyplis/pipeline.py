@@ -0,0 +1,598 @@
+# -*- coding: utf-8 -*-
+#
+# Pyplis is a Python library for the analysis of UV SO2 camera data
+# Copyright (C) 2017 Jonas Gliss (jonasgliss@gmail.com)
+#
+# This program is free software: you can redistribute it and/or
+# modify it under the terms of the GNU General Public License a
+# published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""Pyplis module for single pass analysis of image lists.
+
+The :class:`ImgListPipeline` iterates once over an image list and passes
+each (prepared) image to an arbitrary number of registered consumers, e.g.
+for stacking, pixel mean time series, PCS profiles, optical flow histogram
+analysis and emission rate retrieval. Thus, each image needs to be loaded
+and prepared (dark correction, tau / AA calculation, etc.) only once,
+irrespective of the number of analyses performed.
+"""
+from __future__ import (absolute_import, division)
+from numpy import asarray, empty, float32, nan
+from scipy.ndimage.filters import median_filter
+from collections import OrderedDict as od
+from datetime import datetime
+from pandas import DataFrame
+import six
+
+from pyplis import print_log
+from .helpers import check_roi, exponent
+from .image import ProfileTimeSeriesImg
+from .processing import ImgStack, PixelMeanTimeSeries
+from .utils import LineOnImage, LineProfileSampler
+from .plumespeed import LocalPlumeProperties
+
+
+class ImgListPipeline(object):
+    """Single pass analysis of the images in an image list.
+
+    The list is iterated once and each image (including all image
+    preparation settings of the list, e.g. dark correction, tau mode, etc.)
+    is passed to all registered consumers (see :class:`PipelineConsumer`).
+
+    Note
+    ----
+    All consumers receive the same prepared images, that is, the image
+    preparation settings of the list (including Gauss pyramid level and
+    cropping) need to be set before calling :func:`run`. Consumers may
+    adapt the list settings in :func:`PipelineConsumer.prepare` (e.g.
+    :class:`EmissionRateConsumer` activates the calibration mode), which
+    then applies to all consumers.
+
+    Parameters
+    ----------
+    imglist : BaseImgList
+        image list
+    consumers : list
+        optional, list of :class:`PipelineConsumer` objects
+
+    Example
+    -------
+    >>> pipe = ImgListPipeline(aa_list)
+    >>> pipe.add_consumer(StackConsumer(), "stack")
+    >>> pipe.add_consumer(RoiMeanConsumer([10, 10, 50, 50]), "means")
+    >>> results = pipe.run()
+    >>> stack = results["stack"]
+
+    """
+
+    def __init__(self, imglist, consumers=None):
+        self.imglist = imglist
+        self.consumers = od()
+        if consumers is None:
+            consumers = []
+        for consumer in consumers:
+            self.add_consumer(consumer)
+
+    @property
+    def consumer_ids(self):
+        """IDs of all registered consumers."""
+        return list(self.consumers.keys())
+
+    def add_consumer(self, consumer, consumer_id=None):
+        """Register a consumer.
+
+        Parameters
+        ----------
+        consumer : PipelineConsumer
+            the consumer
+        consumer_id : :obj:`str`, optional
+            ID of consumer (key in result dictionary returned by
+            :func:`run`), if None, :attr:`PipelineConsumer.consumer_id` is
+            used
+
+        Returns
+        -------
+        PipelineConsumer
+            the registered consumer
+
+        """
+        if not isinstance(consumer, PipelineConsumer):
+            raise TypeError("Invalid input, need PipelineConsumer object")
+        if consumer_id is None:
+            consumer_id = consumer.consumer_id
+        if consumer_id in self.consumers:
+            raise KeyError("A consumer with ID %s already exists"
+                           % consumer_id)
+        consumer.consumer_id = consumer_id
+        self.consumers[consumer_id] = consumer
+        return consumer
+
+    def run(self, start_idx=0, stop_idx=None, restore_index=True):
+        """Iterate over list images and pass them to all consumers.
+
+        Parameters
+        ----------
+        start_idx : :obj:`int` or :obj:`datetime`
+            index or timestamp of first considered image
+        stop_idx : :obj:`int` or :obj:`datetime`, optional
+            stop index (exclusive), if None, the last image in the list is
+            included
+        restore_index : bool
+            if True, the list is set back to the current index after the
+            analysis
+
+        Returns
+        -------
+        OrderedDict
+            results of all consumers (keys are consumer IDs, values are the
+            return values of :func:`PipelineConsumer.finish`)
+
+        """
+        if not bool(self.consumers):
+            raise AttributeError("No consumers registered in pipeline")
+        lst = self.imglist
+        for consumer in self.consumers.values():
+            consumer.prepare(lst)
+        cfn = lst.cfn
+        if isinstance(start_idx, datetime):
+            start_idx = lst.timestamp_to_index(start_idx)
+        if isinstance(stop_idx, datetime):
+            stop_idx = lst.timestamp_to_index(stop_idx)
+        if stop_idx is None or stop_idx > lst.nof:
+            stop_idx = lst.nof
+        num = lst._iter_num(start_idx, stop_idx)
+        optflow = any([c.optflow_required for c in self.consumers.values()])
+        flm = lst.optflow_mode
+        try:
+            lst.goto_img(start_idx)
+            if optflow:
+                lst.optflow_mode = True
+            for consumer in self.consumers.values():
+                consumer.start(lst, num)
+
+            pnum = max(int(10**exponent(num) / 4.0), 1) if num > 0 else 1
+            for k in range(num):
+                if k % pnum == 0:
+                    print_log.info("Pipeline in list %s, progress: (%d | %d)"
+                                   % (lst.list_id, k, num - 1))
+                for consumer in self.consumers.values():
+                    consumer.process(lst, k)
+                lst.goto_next()
+
+            results = od()
+            for cid, consumer in six.iteritems(self.consumers):
+                results[cid] = consumer.finish(lst)
+        finally:
+            # restore list state, also if one of the consumers failed
+            if optflow:
+                lst.optflow_mode = flm
+            if restore_index:
+                lst.goto_img(cfn)
+        return results
+
+
+class PipelineConsumer(object):
+    """Base class for consumers of :class:`ImgListPipeline`.
+
+    Subclasses implement :func:`process` (called for each image) and
+    :func:`finish` (returns the result) and may implement :func:`prepare`
+    and :func:`start`.
+
+    Attributes
+    ----------
+    consumer_id : str
+        ID of the consumer
+    optflow_required : bool
+        if True, the optical flow mode of the list is activated during the
+        iteration
+
+    """
+
+    consumer_id = "consumer"
+    optflow_required = False
+
+    def prepare(self, lst):
+        """Prepare image list (called before index of list is changed)."""
+        pass
+
+    def start(self, lst, num):
+        """Initialise consumer (list is at first image of iteration).
+
+        Parameters
+        ----------
+        lst : BaseImgList
+            the image list
+        num : int
+            number of images that will be processed
+
+        """
+        pass
+
+    def process(self, lst, k):
+        """Process current image of list.
+
+        Parameters
+        ----------
+        lst : BaseImgList
+            the image list
+        k : int
+            iteration index
+
+        """
+        raise NotImplementedError
+
+    def finish(self, lst):
+        """Finalise and return result."""
+        raise NotImplementedError
+
+
+class StackConsumer(PipelineConsumer):
+    """Build an :class:`ImgStack` from the list images.
+
+    See :func:`BaseImgList.make_stack` for a description of the input
+    parameters.
+    """
+
+    consumer_id = "stack"
+
+    def __init__(self, stack_id=None, ref_check_roi_abs=None,
+                 ref_check_min_val=None, ref_check_max_val=None,
+                 dtype=float32, memmap_file=None):
+        self.stack_id = stack_id
+        self.ref_check_roi_abs = ref_check_roi_abs
+        self.ref_check_min_val = ref_check_min_val
+        self.ref_check_max_val = ref_check_max_val
+        self.dtype = dtype
+        self.memmap_file = memmap_file
+        self.stack = None
+        self._ref_check = False
+
+    def start(self, lst, num):
+        """Create the stack."""
+        stack_id = self.stack_id
+        if stack_id is None:
+            stack_id = lst.list_id
+        img = lst.current_img()
+        h, w = img.shape
+        self.stack = ImgStack(h, w, num, self.dtype, stack_id,
+                              camera=lst.camera, img_prep=img.edit_log,
+                              memmap_file=self.memmap_file)
+        ref_check = check_roi(self.ref_check_roi_abs)
+        try:
+            self.ref_check_min_val = float(self.ref_check_min_val)
+            self.ref_check_max_val = float(self.ref_check_max_val)
+        except BaseException:
+            ref_check = False
+        self._ref_check = ref_check
+
+    def process(self, lst, k):
+        """Add current image to stack."""
+        img = lst.loaded_images["this"]
+        if self._ref_check:
+            sub_val = img.crop(roi_abs=self.ref_check_roi_abs,
+                               new_img=1).mean()
+            if not self.ref_check_min_val <= sub_val <= self.ref_check_max_val:
+                print_log.warning("Exclude image no. %d from stack, got "
+                                  "value=%.2f in ref check ROI (out of "
+                                  "specified range)" % (k, sub_val))
+                return
+        self.stack.add_img(img.img, img.meta["start_acq"], img.meta["texp"])
+
+    def finish(self, lst):
+        """Finalise and return the stack."""
+        stack = self.stack
+        # remove space of images excluded in ref check
+        stack.finalize()
+        stack.start_acq = asarray(stack.start_acq)
+        stack.texps = asarray(stack.texps)
+        stack.roi_abs = lst._roi_abs
+        if not sum(stack._access_mask) > 0:
+            raise ValueError("Failed to build stack, stack is empty...")
+        return stack
+
+
+class RoiMeanConsumer(PipelineConsumer):
+    """Determine pixel mean time series in rectangular ROIs.
+
+    Result is a list containing one :class:`PixelMeanTimeSeries` per ROI
+    (cf. :func:`BaseImgList.get_mean_tseries_rects`).
+
+    Parameters
+    ----------
+    *rois
+        rectangles ``[x0, y0, x1, y1]`` (in coordinates of the list images)
+
+    """
+
+    consumer_id = "roi_means"
+
+    def __init__(self, *rois):
+        if len(rois) == 0:
+            raise ValueError("No ROIs provided...")
+        self.rois = rois
+        self._data = []
+        self._edit_log = None
+
+    def start(self, lst, num):
+        """Reset data."""
+        self._data = [[[], [], [], []] for roi in self.rois]
+
+    def process(self, lst, k):
+        """Append mean and std of current image in all ROIs."""
+        img = lst.loaded_images["this"]
+        for roi, d in zip(self.rois, self._data):
+            d[0].append(img.meta["texp"])
+            d[1].append(img.meta["start_acq"])
+            sub = img.img[roi[1]:roi[3], roi[0]:roi[2]]
+            d[2].append(sub.mean())
+            d[3].append(sub.std())
+        self._edit_log = img.edit_log
+
+    def finish(self, lst):
+        """Return list of :class:`PixelMeanTimeSeries` objects."""
+        return [PixelMeanTimeSeries(d[2], d[1], d[3], d[0], roi,
+                                    self._edit_log)
+                for roi, d in zip(self.rois, self._data)]
+
+
+class PcsProfilesConsumer(PipelineConsumer):
+    """Extract profile time series along lines.
+
+    The profiles of all lines are extracted at once (cf.
+    :class:`LineProfileSampler`). Result is a dictionary containing one
+    :class:`ProfileTimeSeriesImg` per line.
+
+    Parameters
+    ----------
+    lines : list
+        list of :class:`LineOnImage` objects (are converted to the pyramid
+        level and ROI of the list images). Can also be a dictionary, whose
+        keys are then used as keys in the result dictionary (else, the line
+        IDs are used)
+    dist_img : Img
+        optional, image containing pixel to pixel distances (at the pyramid
+        level and ROI of the list images), if provided, the profiles are
+        multiplied with the distances along each line
+
+    """
+
+    consumer_id = "pcs_profiles"
+
+    def __init__(self, lines, dist_img=None):
+        if isinstance(lines, LineOnImage):
+            lines = [lines]
+        if not isinstance(lines, dict):
+            lines = od([(line.line_id, line) for line in lines])
+        self.lines = lines
+        self.dist_img = dist_img
+        self._lines_conv = None
+        self._sampler = None
+        self._profiles = None
+        self._times = None
+
+    def start(self, lst, num):
+        """Convert lines and initiate profile arrays."""
+        self._lines_conv = od()
+        for key, line in six.iteritems(self.lines):
+            self._lines_conv[key] = line.convert(to_pyrlevel=lst.pyrlevel,
+                                                 to_roi_abs=lst.roi_abs)
+        self._sampler = LineProfileSampler(self._lines_conv)
+        self._profiles = od([(lid, empty((l.profile_coords.shape[1], num),
+                                         dtype=float32))
+                             for lid, l in six.iteritems(self._lines_conv)])
+        self._times = []
+        self._num = 0
+
+    def process(self, lst, k):
+        """Extract profiles from current image."""
+        profiles = self._sampler.get_profiles(lst.current_img().img)
+        for lid, prof in six.iteritems(profiles):
+            self._profiles[lid][:, self._num] = prof
+        self._times.append(lst.current_time())
+        self._num += 1
+
+    def finish(self, lst):
+        """Return dictionary containing profile images."""
+        img_prep = lst.current_img().edit_log
+        res = od()
+        for lid, line in six.iteritems(self._lines_conv):
+            profiles = self._profiles[lid][:, :self._num]
+            if self.dist_img is not None:
+                dists = line.get_line_profile(self.dist_img.img)
+                profiles = profiles * dists.reshape((len(dists), 1))
+            res[lid] = ProfileTimeSeriesImg(profiles,
+                                            time_stamps=self._times,
+                                            img_id=line.line_id,
+                                            profile_info_dict=line.to_dict(),
+                                            **img_prep)
+        return res
+
+
+class FlowHistoConsumer(PipelineConsumer):
+    """Optical flow histogram analysis along lines.
+
+    Result is a list containing :class:`LocalPlumeProperties` objects (cf.
+    :func:`ImgList.optflow_histo_analysis`).
+
+    Parameters
+    ----------
+    lines : list
+        list containing :class:`LineOnImage` instances, if empty, the
+        analysis is performed for all pixels exceeding
+        ``intensity_thresh``
+    intensity_thresh : float
+        intensity threshold used to identify plume pixels
+
+    """
+
+    consumer_id = "flow_histo"
+    optflow_required = True
+
+    def __init__(self, lines=None, intensity_thresh=0):
+        if lines is None:
+            lines = []
+        self.lines = [l for l in lines if isinstance(l, LineOnImage)]
+        self.intensity_thresh = intensity_thresh
+        self.props = []
+
+    def start(self, lst, num):
+        """Initiate :class:`LocalPlumeProperties` objects."""
+        self.props = [LocalPlumeProperties(l.line_id, color=l.color)
+                      for l in self.lines]
+        self._lines = list(self.lines)
+        if len(self.props) == 0:
+            self._lines = [None]
+            self.props.append(LocalPlumeProperties("thresh_%.1f"
+                                                   % self.intensity_thresh))
+
+    def process(self, lst, k):
+        """Append flow histogram parameters of current image."""
+        plume_mask = lst.get_thresh_mask(self.intensity_thresh)
+        for line, props in zip(self._lines, self.props):
+            props.get_and_append_from_farneback(lst.optflow, line=line,
+                                                pix_mask=plume_mask)
+
+    def finish(self, lst):
+        """Return list of :class:`LocalPlumeProperties` objects."""
+        return self.props
+
+
+class EmissionRateConsumer(PipelineConsumer):
+    """Emission rate retrieval of an :class:`EmissionRateAnalysis`.
+
+    The pipeline list needs to be the image list of the analysis
+    (:attr:`EmissionRateAnalysis.imglist`). Result are the emission rate
+    results (:attr:`EmissionRateAnalysis.results`).
+
+    Parameters
+    ----------
+    analysis : EmissionRateAnalysis
+        the analysis object
+    check_list : bool
+        if True, :func:`EmissionRateAnalysis.check_and_init_list` is called
+        before the iteration (applies to all consumers of the pipeline)
+
+    """
+
+    consumer_id = "emission_rates"
+
+    def __init__(self, analysis, check_list=True):
+        self.analysis = analysis
+        self.check_list = check_list
+        self._state = None
+
+    @property
+    def optflow_required(self):
+        """Optical flow is required for flow based velocity modes."""
+        ana = self.analysis
+        return ana.flow_required and ana.imglist_optflow is ana.imglist
+
+    def prepare(self, lst):
+        """Check that list is analysis list and initiate list."""
+        if lst is not self.analysis.imglist:
+            raise ValueError("Pipeline list is not the image list of the "
+                             "emission rate analysis")
+        if self.check_list:
+            self.analysis.check_and_init_list()
+
+    def start(self, lst, num):
+        """Initiate retrieval."""
+        self._state = self.analysis._init_retrieval(num,
+                                                    set_optflow_mode=False)
+
+    def process(self, lst, k):
+        """Retrieve emission rates from current image."""
+        self.analysis._retrieve_current_img(self._state, k)
+
+    def finish(self, lst):
+        """Return emission rate results."""
+        counter = self.analysis._finish_retrieval(self._state)
+        if not counter > 0:
+            raise ValueError("Emission rate retrieval failed for all images "
+                             "in image list...")
+        return self.analysis.results
+
+
+class ExtCoeffsConsumer(PipelineConsumer):
+    """Retrieve extinction coefficients using a :class:`DilutionCorr` object.
+
+    Result is a :class:`DataFrame` (cf.
+    :func:`DilutionCorr.get_ext_coeffs_imglist`).
+
+    Parameters
+    ----------
+    dilcorr : DilutionCorr
+        dilution correction object (topographic distances need to be
+        available)
+    roi_ambient : list
+        region of interest used to estimate ambient intensity, if None, the
+        :attr:`scale_rect` of the background model of the list is used
+    apply_median : int
+        if > 0, then a median filter of provided width is applied to
+        the result time series
+    **kwargs
+        additional keyword args passed to
+        :func:`DilutionCorr.apply_dilution_fit`
+
+    """
+
+    consumer_id = "ext_coeffs"
+
+    def __init__(self, dilcorr, roi_ambient=None, apply_median=5, **kwargs):
+        self.dilcorr = dilcorr
+        self.roi_ambient = roi_ambient
+        self.apply_median = apply_median
+        self.fit_kwargs = kwargs
+        self._data = None
+
+    def prepare(self, lst):
+        """Activate vignetting correction and check ambient ROI."""
+        lst.vigncorr_mode = True
+        if not check_roi(self.roi_ambient):
+            try:
+                self.roi_ambient = lst.bg_model.scale_rect
+            except BaseException:
+                pass
+            if not check_roi(self.roi_ambient):
+                raise ValueError("Input parameter roi_ambient is not a valied"
+                                 "ROI and neither is scale_rect in background "
+                                 "model of input image list...")
+
+    def start(self, lst, num):
+        """Reset data."""
+        self._data = od([("coeffs", []), ("i0", []), ("ia", []),
+                         ("times", [])])
+
+    def process(self, lst, k):
+        """Apply dilution fit to current image."""
+        d = self._data
+        img = lst.current_img()
+        d["times"].append(lst.current_time())
+        try:
+            ia = img.crop(self.roi_ambient, True).mean()
+            ext, i0, _, _ = self.dilcorr.apply_dilution_fit(
+                img=img, rad_ambient=ia, plot=False, **self.fit_kwargs)
+        except BaseException:
+            ext, i0, ia = nan, nan, nan
+        d["coeffs"].append(ext)
+        d["i0"].append(i0)
+        d["ia"].append(ia)
+
+    def finish(self, lst):
+        """Return data frame containing results."""
+        d = self._data
+        coeffs, i0s, ias = d["coeffs"], d["i0"], d["ia"]
+        if self.apply_median > 0:
+            coeffs = median_filter(coeffs, self.apply_median)
+            i0s = median_filter(i0s, self.apply_median)
+            ias = median_filter(ias, self.apply_median)
+        return DataFrame(dict(coeffs=coeffs, i0=i0s, ia=ias),
+                         index=d["times"])
@@ -18,7 +18,9 @@
 """Pyplis module containing features related to plume background analysis."""
 from __future__ import (absolute_import, division)
 from numpy import (polyfit, poly1d, linspace, logical_and, log, argmin,
-                   gradient, nan, ndarray, arange, ones, finfo, asarray)
+                   gradient, nan, ndarray, arange, ones, finfo, asarray,
+                   empty, float32, divide, vander, ndim, subtract,
+                   result_type, newaxis, issubdtype, floating)
 from matplotlib.patches import Rectangle
 from matplotlib.pyplot import figure, subplots, setp
 import matplotlib.colors as colors
@@ -29,9 +31,10 @@ import six
 
 from pyplis import logger, print_log
 from .image import Img
+from .processing import ImgStack
 from .utils import LineOnImage
 from .optimisation import PolySurfaceFit
-from .helpers import shifted_color_map, _roi_coordinates
+from .helpers import shifted_color_map, _roi_coordinates, map_roi
 from .plumespeed import find_movement
 
 
@@ -61,6 +64,8 @@ class PlumeBackgroundModel(object):
 
         self.last_tau_img = None
         self._last_surffit = None
+        # reusable array for intermediate results (see _scratch_buffer)
+        self._scratch = empty(0)
         #: Correction mode
         self._mode = 0
 
@@ -346,8 +351,8 @@ class PlumeBackgroundModel(object):
         if pyrlevel_rel < 0:
             print_log.warning("Pyramid level of input image (%d) is larger than desired "
                  "pyramid level for computation of surface fit (%d). Using "
-                 "the current pyrlevel %d of input image" % (plume.pyrlevel,
-                                                             pyrlevel))
+                 "the current pyrlevel of input image" % (plume.pyrlevel,
+                                                          pyrlevel))
             pyrlevel_rel = 0
         # update settings from input keyword arg
 
@@ -403,27 +408,22 @@ class PlumeBackgroundModel(object):
             logger.warning("plume image is not corrected for dark current")
         if plume_img.is_tau:
             raise AttributeError("Input image is already tau image")
-        tau = None
         if self.mode == 0:  # no sky radiance image, poly surface fit
             bg = self.bg_from_poly_surface_fit(plume_img,
                                                self.surface_fit_mask,
                                                self.surface_fit_polyorder,
                                                self.surface_fit_pyrlevel)
-            r = bg / plume_img.img
-            # make sure no 0 values or neg. numbers are in the image
-            r[r <= 0] = finfo(float).eps
-            tau = log(r)
-
         else:
             if check_state:
                 self._check_img_states(plume_img, bg_img)
+            bg = bg_img.img
 
-            r = bg_img.img / plume_img.img
-            # make sure no 0 values or neg. numbers are in the image
-            r[r <= 0] = finfo(float).eps
-            tau = log(r)
-            if self.mode != 99:
-                tau = self.correct_tau_curvature_ref_areas(tau)
+        # make sure no 0 values or neg. numbers are in the image
+        tau = _bg_ratio(bg, plume_img.img,
+                        self._new_buffer(bg, plume_img.img))
+        log(tau, out=tau)
+        if 1 <= self.mode <= 6:
+            self.correct_tau_curvature_ref_areas_stack(tau[newaxis])
 
         tau_img = Img(tau, **plume_img.meta)
         tau_img.edit_log.update(plume_img.edit_log)
@@ -477,25 +477,21 @@ class PlumeBackgroundModel(object):
             pyr = self.surface_fit_pyrlevel
             bg_on = self.bg_from_poly_surface_fit(plume_on, mask, po, pyr)
             bg_off = self.bg_from_poly_surface_fit(plume_off, mask, po, pyr)
-            r_on = bg_on / plume_on.img
-            # make sure no 0 values or neg. numbers are in the image
-            r_on[r_on <= 0] = finfo(float).eps
-
-            r_off = bg_off / plume_off.img
-            # make sure no 0 values or neg. numbers are in the image
-            r_off[r_off <= 0] = finfo(float).eps
-            aa = log(r_on) - log(r_off)
         else:
             if check_state:
                 self._check_img_states(plume_on, plume_off, bg_on, bg_off)
-
-            r1 = bg_on.img / plume_on.img
-            r1[r1 <= 0] = finfo(float).eps
-            r2 = bg_off.img / plume_off.img
-            r2[r2 <= 0] = finfo(float).eps
-            aa = log(r1) - log(r2)
-            if self.mode != 99:
-                aa = self.correct_tau_curvature_ref_areas(aa)
+            bg_on, bg_off = bg_on.img, bg_off.img
+
+        # make sure no 0 values or neg. numbers are in the image
+        arrs = (bg_on, plume_on.img, bg_off, plume_off.img)
+        aa = _bg_ratio(arrs[0], arrs[1], self._new_buffer(*arrs))
+        log(aa, out=aa)
+        # the offband ratio is only needed temporarily
+        r_off = _bg_ratio(arrs[2], arrs[3],
+                          self._scratch_buffer(aa.shape, aa.dtype))
+        subtract(aa, log(r_off, out=r_off), out=aa)
+        if 1 <= self.mode <= 6:
+            self.correct_tau_curvature_ref_areas_stack(aa[newaxis])
 
         aa_img = Img(aa, **plume_on.meta)
         aa_img.edit_log.update(plume_on.edit_log)
@@ -582,6 +578,182 @@ class PlumeBackgroundModel(object):
                                                self.xgrad_line_mask,
                                                self.xgrad_line_polyorder)[0]
 
+    def correct_tau_curvature_ref_areas_stack(self, tau_stack):
+        """Scale and correct curvature of all images in a tau stack.
+
+        Stack version of :func:`correct_tau_curvature_ref_areas`: the
+        reference area means and the line profile fits are computed for all
+        images at once and the correction is applied in-place.
+
+        Parameters
+        ----------
+        tau_stack : ndarray
+            3D array containing initial tau images (``num, height, width``)
+
+        Returns
+        -------
+        ndarray
+            the modified input array
+
+        """
+        mode = self.mode
+        if not 1 <= mode <= 6:
+            raise ValueError("This method only works for background model"
+                             "modes (param CORR_MODE) 1-6")
+        if ndim(tau_stack) != 3:
+            raise ValueError("Need 3D array")
+        if mode == 1:
+            tau_stack -= _mean_in_rect_stack(tau_stack,
+                                             self.scale_rect)[:, None, None]
+            return tau_stack
+        if mode in (2, 4):
+            corr_tau_curvature_vert_two_rects_stack(tau_stack,
+                                                    self.scale_rect,
+                                                    self.ygrad_rect)
+        else:
+            corr_tau_curvature_vert_line_stack(tau_stack,
+                                               self.ygrad_line_colnum,
+                                               self.ygrad_line_startrow,
+                                               self.ygrad_line_stoprow,
+                                               self.ygrad_line_mask,
+                                               self.ygrad_line_polyorder)
+        if mode in (4, 5):
+            corr_tau_curvature_hor_two_rects_stack(tau_stack,
+                                                   self.scale_rect,
+                                                   self.xgrad_rect)
+        elif mode == 6:
+            corr_tau_curvature_hor_line_stack(tau_stack,
+                                              self.xgrad_line_rownum,
+                                              self.xgrad_line_startcol,
+                                              self.xgrad_line_stopcol,
+                                              self.xgrad_line_mask,
+                                              self.xgrad_line_polyorder)
+        return tau_stack
+
+    def get_tau_stack(self, plume_stack, bg_img=None, check_state=True,
+                      out=None):
+        """Determine tau images for all images in a stack.
+
+        Stack version of :func:`get_tau_image`. The computation is done
+        in-place on one float32 buffer (``out``) and the curvature
+        correction (modes 1 - 6) is vectorised along the time axis (see
+        :func:`correct_tau_curvature_ref_areas_stack`).
+
+        Parameters
+        ----------
+        plume_stack
+            :class:`ImgStack` or 3D numpy array (``num, height, width``)
+            containing plume images in intensity space
+        bg_img
+            sky radiance image (:obj:`Img` or 2D array, for
+            ``self.mode = 1 - 6, 99``)
+        check_state : bool
+            if True and input is :class:`ImgStack` and ``bg_img`` is
+            :class:`Img`, it is checked whether stack and background image
+            have the same dark correction and vignetting state
+        out : :obj:`ndarray`, optional
+            float32 array with the shape of the stack used to store the
+            result. This may be the data array of the input stack itself
+            (which is then overwritten). If None, a new array is allocated
+
+        Returns
+        -------
+        :obj:`ImgStack` or :obj:`ndarray`
+            tau stack (same type as input)
+
+        """
+        data = _stack_array(plume_stack)
+        if (isinstance(plume_stack, ImgStack) and
+                plume_stack.img_prep.get("is_tau", False)):
+            raise AttributeError("Input stack is already tau stack")
+        out = _stack_out_buffer(data, out)
+        if self.mode == 0:
+            self._ratios_surface_fit(plume_stack, data, out)
+        else:
+            if check_state:
+                _check_stack_states(plume_stack, bg_img)
+            bg = _bg_array(bg_img)
+            for sl in _stack_chunks(len(data)):
+                _bg_ratio(bg, data[sl], out[sl])
+        log(out, out=out)
+        if 1 <= self.mode <= 6:
+            self.correct_tau_curvature_ref_areas_stack(out)
+        return _make_tau_stack(plume_stack, out, aa=False)
+
+    def get_aa_stack(self, on_stack, off_stack, bg_on=None, bg_off=None,
+                     check_state=True, out=None):
+        """Determine AA images for all images in on and off-band stacks.
+
+        Stack version of :func:`get_aa_image`. The computation is done
+        in-place on one float32 buffer (``out``) and chunks of the
+        off-band ratio, and the curvature correction (modes 1 - 6) is
+        vectorised along the time axis (see
+        :func:`correct_tau_curvature_ref_areas_stack`).
+
+        Parameters
+        ----------
+        on_stack
+            :class:`ImgStack` or 3D numpy array (``num, height, width``)
+            containing on-band plume images
+        off_stack
+            :class:`ImgStack` or 3D numpy array containing the corresponding
+            off-band plume images (same shape as ``on_stack``)
+        bg_on
+            on-band sky radiance image (:obj:`Img` or 2D array, for
+            ``self.mode = 1 - 6, 99``)
+        bg_off
+            off-band sky radiance image (:obj:`Img` or 2D array, for
+            ``self.mode = 1 - 6, 99``)
+        check_state : bool
+            if True, stacks and background images (if provided as
+            :class:`ImgStack` and :class:`Img`) are checked for consistent
+            dark correction and vignetting state
+        out : :obj:`ndarray`, optional
+            float32 array with the shape of the stacks used to store the
+            result. This may be the data array of the on-band stack itself
+            (which is then overwritten). If None, a new array is allocated
+
+        Returns
+        -------
+        :obj:`ImgStack` or :obj:`ndarray`
+            AA stack (same type as ``on_stack``)
+
+        """
+        on, off = _stack_array(on_stack), _stack_array(off_stack)
+        if not on.shape == off.shape:
+            raise ValueError("Shape mismatch between on and off-band stack")
+        out = _stack_out_buffer(on, out)
+        if self.mode == 0:
+            self._ratios_surface_fit(on_stack, on, out)
+            r_off = empty(off.shape, float32)
+            self._ratios_surface_fit(off_stack, off, r_off)
+            out /= r_off
+        else:
+            if check_state:
+                _check_stack_states(on_stack, off_stack, bg_on, bg_off)
+            bg_on, bg_off = _bg_array(bg_on), _bg_array(bg_off)
+            for sl in _stack_chunks(len(on)):
+                r_off = _bg_ratio(bg_off, off[sl])
+                _bg_ratio(bg_on, on[sl], out[sl])
+                out[sl] /= r_off
+        log(out, out=out)
+        if 1 <= self.mode <= 6:
+            self.correct_tau_curvature_ref_areas_stack(out)
+        return _make_tau_stack(on_stack, out, aa=True)
+
+    def _ratios_surface_fit(self, stack, data, out):
+        """Compute ratios of surface fit background and stack images."""
+        pyrlevel = 0
+        if isinstance(stack, ImgStack):
+            pyrlevel = stack.pyrlevel
+        for k in range(len(data)):
+            img = Img(data[k])
+            img.edit_log["pyrlevel"] = pyrlevel
+            bg = self.bg_from_poly_surface_fit(img, self.surface_fit_mask,
+                                               self.surface_fit_polyorder,
+                                               self.surface_fit_pyrlevel)
+            _bg_ratio(bg, data[k], out[k])
+
     """Plotting"""
 
     def plot_sky_reference_areas(self, plume):
@@ -776,6 +948,76 @@ class PlumeBackgroundModel(object):
 
     """Helpers"""
 
+    def _new_buffer(self, *arrays):
+        """Allocate output array for tau / AA computation from inputs.
+
+        The input arrays are alternating background and plume images. If the
+        plume images are floating point arrays, their precision is used
+        (e.g. 32 bit float, see :attr:`ImgList.img_dtype`), else the data
+        type of arithmetic operations between all inputs.
+        """
+        dtype = result_type(*arrays[1::2])
+        if not issubdtype(dtype, floating):
+            dtype = result_type(*arrays)
+        return empty(arrays[-1].shape, dtype)
+
+    def _scratch_buffer(self, shape, dtype):
+        """Return reusable array for intermediate results.
+
+        The array is kept and only reallocated if shape or data type change
+        (e.g. due to changes of the pyramid level).
+        """
+        buf = self._scratch
+        if buf.shape != shape or buf.dtype != dtype:
+            buf = empty(shape, dtype)
+            self._scratch = buf
+        return buf
+
+    def __getstate__(self):
+        """Remove scratch array when pickling or copying the model."""
+        state = self.__dict__.copy()
+        state["_scratch"] = empty(0)
+        return state
+
+    def convert(self, pyrlevel_rel=0):
+        """Convert this model for images at a different pyramid level.
+
+        The reference rectangles, line coordinates and masks are mapped
+        onto images that are reduced in size by ``pyrlevel_rel`` Gauss
+        pyramid steps relative to the images the current settings refer to.
+
+        Parameters
+        ----------
+        pyrlevel_rel : int
+            relative pyramid level (steps down, must not be negative)
+
+        Returns
+        -------
+        PlumeBackgroundModel
+            new model with converted settings
+
+        """
+        if pyrlevel_rel < 0:
+            raise ValueError("Conversion of background model is only "
+                             "possible to higher pyramid levels")
+        d = self.settings_dict()
+        fac = 2**pyrlevel_rel
+        for key in ["scale_rect", "ygrad_rect", "xgrad_rect"]:
+            if d[key] is not None:
+                d[key] = map_roi(d[key], pyrlevel_rel)
+        for key in ["ygrad_line_colnum", "ygrad_line_startrow",
+                    "ygrad_line_stoprow", "xgrad_line_rownum",
+                    "xgrad_line_startcol", "xgrad_line_stopcol"]:
+            if d[key] is not None:
+                d[key] = int(d[key] // fac)
+        for key in ["ygrad_line_mask", "xgrad_line_mask"]:
+            if d[key] is not None:
+                d[key] = asarray(d[key])[::fac]
+        if d["surface_fit_mask"] is not None:
+            d["surface_fit_mask"] = asarray(d["surface_fit_mask"])[::fac,
+                                                                   ::fac]
+        return PlumeBackgroundModel(**d)
+
     def settings_dict(self):
         """Write current sky reference areas and masks into dictionary."""
         d = {}
@@ -905,6 +1147,104 @@ def _mean_in_rect(img_array, rect=None):
     return sub.mean(), sub.std()
 
 
+def _mean_in_rect_stack(stack, rect=None):
+    """Get pixel mean values within rectangle for all images in 3D array."""
+    if rect is None:
+        return stack.mean(axis=(1, 2))
+    return stack[:, rect[1]: rect[3], rect[0]: rect[2]].mean(axis=(1, 2))
+
+
+def _stack_array(stack):
+    """Return 3D data array of input stack (ImgStack or array)."""
+    try:
+        stack = stack.stack
+    except AttributeError:
+        pass
+    if ndim(stack) != 3:
+        raise ValueError("Invalid input, need ImgStack or 3D array")
+    return stack
+
+
+def _stack_out_buffer(data, out=None):
+    """Check or allocate float32 output buffer for stack computations."""
+    if out is None:
+        return empty(data.shape, float32)
+    if not (isinstance(out, ndarray) and out.dtype == float32 and
+            out.shape == data.shape):
+        raise ValueError("Output buffer needs to be float32 array with "
+                         "shape %s" % (data.shape,))
+    return out
+
+
+def _stack_chunks(num, chunk_size=16):
+    """Slices for chunk-wise processing of stack images."""
+    return [slice(i, i + chunk_size) for i in range(0, num, chunk_size)]
+
+
+def _bg_array(bg):
+    """Return background image array (input Img or array)."""
+    if bg is None:
+        raise ValueError("Background image is required for the current "
+                         "background modelling mode")
+    try:
+        return bg.img
+    except AttributeError:
+        return asarray(bg)
+
+
+def _bg_ratio(bg, plume, out=None):
+    """Ratio of background and plume images (non-positive values set to eps).
+
+    Equivalent to the computation in :func:`get_tau_image` prior to
+    taking the logarithm, the result is written into ``out`` (if provided).
+    """
+    if out is None:
+        out = empty(plume.shape, float32)
+    divide(bg, plume, out=out)
+    out[out <= 0] = finfo(float).eps
+    return out
+
+
+def _check_stack_states(stack, *more):
+    """Check dark and vignetting correction state of stacks and images."""
+    states = []
+    for obj in (stack,) + more:
+        if isinstance(obj, ImgStack):
+            states.append((obj.img_prep.get("vigncorr", False),
+                           obj.img_prep.get("darkcorr", False)))
+        elif isinstance(obj, Img):
+            states.append((obj.is_vigncorr, obj.is_darkcorr))
+    if not all([x[0] == states[0][0] for x in states]):
+        raise AttributeError("Cannot model tau stack: mismatch with regard "
+                             "to vignetting correction state between plume "
+                             "images and sky radiance image(s)")
+    elif not all([x[1] == states[0][1] for x in states]):
+        raise AttributeError("Cannot model tau stack: mismatch with regard "
+                             "to dark correction state between plume "
+                             "images and sky radiance image(s)")
+
+
+def _make_tau_stack(stack, data, aa=False):
+    """Create output of tau / AA stack computation.
+
+    Returns input array if input stack is no :class:`ImgStack`, else a new
+    :class:`ImgStack` (with meta information of input stack) containing
+    input data.
+    """
+    if not isinstance(stack, ImgStack):
+        return data
+    img_prep = dict(stack.img_prep)
+    img_prep["is_tau"] = True
+    img_prep["is_aa"] = aa
+    new = ImgStack(stack_id=stack.stack_id, img_prep=img_prep,
+                   camera=stack.camera)
+    new.set_stack_data(data, stack.start_acq.copy(), stack.texps.copy())
+    if stack.add_data is not None:
+        new.add_data = stack.add_data.copy()
+    new.roi_abs = stack.roi_abs
+    return new
+
+
 def scale_tau_img(tau, rect):
     """Scale tau image such that it fulfills tau==0 in reference area."""
     avg, _ = _mean_in_rect(tau, rect)
@@ -1081,6 +1421,116 @@ def corr_tau_curvature_hor_line(tau0, pos_y, start_x=0, stop_x=None,
     return (tau_mod, hor_poly)
 
 
+def corr_tau_curvature_vert_two_rects_stack(tau_stack, r0, r1):
+    """Stack version of :func:`corr_tau_curvature_vert_two_rects`.
+
+    :param ndarray tau_stack: 3D array of initial tau images (modified
+        in-place)
+    :param list r0: 1st rectanglular area ``[x0, y0, x1, y1]`
+    :param list r1: 2nd rectanglular area ``[x0, y0, x1, y1]`
+    :return ndarray: modified input array
+    """
+    y0, y1 = 0.5 * (r0[1] + r0[3]), 0.5 * (r1[1] + r1[3])
+    mean_r0 = _mean_in_rect_stack(tau_stack, r0)
+    mean_r1 = _mean_in_rect_stack(tau_stack, r1)
+    slope = (mean_r0 - mean_r1) / float(y0 - y1)
+    offs = mean_r1 - slope * y1
+    ygrid = arange(tau_stack.shape[1])
+    tau_stack -= (offs[:, None] + slope[:, None] * ygrid)[:, :, None]
+    return tau_stack
+
+
+def corr_tau_curvature_hor_two_rects_stack(tau_stack, r0, r1):
+    """Stack version of :func:`corr_tau_curvature_hor_two_rects`.
+
+    :param ndarray tau_stack: 3D array of initial tau images (modified
+        in-place)
+    :param list r0: 1st rectanglular area ``[x0, y0, x1, y1]`
+    :param list r1: 2nd rectanglular area ``[x0, y0, x1, y1]`
+    :return ndarray: modified input array
+    """
+    x0, x1 = 0.5 * (r0[0] + r0[2]), 0.5 * (r1[0] + r1[2])
+    mean_r0 = _mean_in_rect_stack(tau_stack, r0)
+    mean_r1 = _mean_in_rect_stack(tau_stack, r1)
+    slope = (mean_r0 - mean_r1) / float(x0 - x1)
+    offs = mean_r1 - slope * x1
+    xgrid = arange(tau_stack.shape[2])
+    tau_stack -= (offs[:, None] + slope[:, None] * xgrid)[:, None, :]
+    return tau_stack
+
+
+def _fit_profile_polys(profiles, grid, mask, polyorder):
+    """Fit polynomials to all profiles (columns) and evaluate on grid."""
+    coeffs = polyfit(grid[mask], profiles[mask], polyorder)
+    return vander(grid, polyorder + 1).dot(coeffs), coeffs
+
+
+def corr_tau_curvature_vert_line_stack(tau_stack, pos_x, start_y=0,
+                                       stop_y=None, row_mask=None,
+                                       polyorder=2):
+    """Stack version of :func:`corr_tau_curvature_vert_line`.
+
+    :param ndarray tau_stack: 3D array of initial tau images (modified
+        in-place)
+    :param int pos_x: x position of line (column number)
+    :param int start_y: first considered vertical index for fit (0)
+    :param int stop_y: last considered vertical index for fit (is set
+        to last row number if unspecified)
+    :param ndarray row_mask: boolean mask specifying considered row indices
+        (if valid, params start_y, stop_y are not considered)
+    :param int polyorder: order of polynomial to fit curvature
+    return tuple: 1st entry: modified input array, second: polynomial
+        coefficients (one column per image)
+    """
+    max_y = tau_stack.shape[1]
+    line_vert = LineOnImage(pos_x, 0, pos_x, max_y)
+    profiles = line_vert.get_line_profiles_stack(tau_stack)
+    if stop_y is None:
+        stop_y = max_y
+    ygrid = arange(max_y)
+    try:
+        if len(row_mask) == max_y:
+            mask = row_mask
+    except BaseException:
+        mask = logical_and(ygrid >= start_y, ygrid <= stop_y)
+    poly_vals, coeffs = _fit_profile_polys(profiles, ygrid, mask, polyorder)
+    tau_stack -= poly_vals.T[:, :, None]
+    return (tau_stack, coeffs)
+
+
+def corr_tau_curvature_hor_line_stack(tau_stack, pos_y, start_x=0,
+                                      stop_x=None, col_mask=None,
+                                      polyorder=2):
+    """Stack version of :func:`corr_tau_curvature_hor_line`.
+
+    :param ndarray tau_stack: 3D array of initial tau images (modified
+        in-place)
+    :param int pos_y: y position of line (row number)
+    :param int start_x: first considered horizontal index for fit (0)
+    :param int stop_x: last considered horizontal index for fit (is
+        set to last col number if unspecified)
+    :param ndarray col_mask: boolean mask specifying considered column
+        indices (if valid, params start_x, stop_x are not considered)
+    :param int polyorder: order of polynomial to fit curvature
+    return tuple: 1st entry: modified input array, second: polynomial
+        coefficients (one column per image)
+    """
+    max_x = tau_stack.shape[2]
+    line_hor = LineOnImage(0, pos_y, max_x, pos_y)
+    profiles = line_hor.get_line_profiles_stack(tau_stack)
+    if stop_x is None:
+        stop_x = max_x
+    xgrid = arange(max_x)
+    try:
+        if len(col_mask) == max_x:
+            mask = col_mask
+    except BaseException:
+        mask = logical_and(xgrid >= start_x, xgrid <= stop_x)
+    poly_vals, coeffs = _fit_profile_polys(profiles, xgrid, mask, polyorder)
+    tau_stack -= poly_vals.T[:, None, :]
+    return (tau_stack, coeffs)
+
+
 def find_sky_reference_areas(plume_img, sigma_blur=2, plot=False):
     """Take an input plume image and identify suitable sky reference areas."""
     try:
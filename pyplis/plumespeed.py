@@ -20,7 +20,9 @@ from __future__ import (absolute_import, division)
 from numpy import mgrid, vstack, int32, sqrt, arctan2, rad2deg, asarray, sin,\
     cos, logical_and, histogram, ceil, roll, argmax, arange, ndarray,\
     deg2rad, nan, dot, mean, isnan, float32, sum, empty, uint8, ones,\
-    zeros_like
+    zeros_like, where, inf, cumsum, errstate, concatenate
+from numpy.lib.format import open_memmap
+from numpy.fft import rfft, irfft
 from numpy.linalg import norm
 from traceback import format_exc
 from copy import deepcopy
@@ -34,6 +36,9 @@ from scipy.ndimage.filters import median_filter, gaussian_filter
 from scipy.stats.stats import pearsonr
 from os.path import isdir, join, isfile
 from os import getcwd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import cpu_count
 from six.moves import xrange
 import six
 
@@ -121,56 +126,24 @@ def get_veff(normal_vec, dir_mu, dir_sigma, len_mu, len_sigma,
     return (veff, verr)
 
 
-def find_signal_correlation(first_data_vec, next_data_vec,
-                            time_stamps=None, reg_grid_tres=None,
-                            freq_unit="S", itp_method="linear",
-                            max_shift_percent=20,
-                            sigma_smooth=1, plot=False,
-                            **kwargs):
-    """Determine cross correlation from two ICA time series.
+def _prepare_correlation_signals(first_data_vec, next_data_vec,
+                                 time_stamps=None, reg_grid_tres=None,
+                                 freq_unit="S", itp_method="linear"):
+    """Prepare two signals for cross correlation analysis.
 
-    Parameters
-    ----------
-    first_data_vec : array
-        first data vector (i.e. left or before ``next_data_vec``)
-    next_data_vec : array
-        second data vector (i.e. behind ``first_data_vec``)
-    time_stamps : array
-        array containing time stamps of the two data vectors. If default
-        (None), then the two vectors are assumed to be sampled on a regular
-        grid and the returned lag corresponds to the index shift with highest
-        correlation. If ``len(time_stamps) == len(first_data_vec)`` and if
-        entries are datetime objects, then the two input time series are
-        resampled and interpolated onto a regular grid, for resampling and
-        interpolation settings, see following 3 parameters.
-    reg_grid_tres : int
-        sampling resolution of resampled time series
-        data in units specified by input parameter ``freq_unit``. If None,
-        then the resolution is determined automatically based on the mean time
-        resolution of the data
-    freq_unit : str
-        pandas frequency unit (use S for seconds, L for ms)
-    itp_method : str
-        interpolation method, choose from ``["linear", "quadratic", "cubic"]``
-    max_shift_percent : float
-        percentage maximum shift applied to index of :arg:`first_data_vec`
-        to find pearson correlation with :arg:`next_data_vec`.
-    sigma_smooth : int
-        specify width of gaussian blurring kernel applied to data before
-        correlation analysis (default=1)
-    plot : bool
-        if True, result is plotted
+    See :func:`find_signal_correlation` for a description of the input
+    parameters.
 
     Returns
     -------
     tuple
-        5-element tuple containing
+        3-element tuple containing
 
-        - *float*: lag (in units of s or the index, see input specs)
-        - *array*: retrieved correlation coefficients for all shifts
-        - *Series*: analysis signal 1. data vector
-        - *Series*: analysis signal 2. data vector
-        - *Series*: analysis signal 2. data vector shifted using ``lag`
+        - *Series*: first signal (resampled onto a regular grid, if time \
+            stamps are provided)
+        - *Series*: second signal
+        - *float*: time resolution of signals in s (1 if no time stamps \
+            are provided)
 
     """
     if not all([isinstance(x, ndarray)
@@ -219,24 +192,84 @@ def find_signal_correlation(first_data_vec, next_data_vec,
     else:
         s1 = Series(first_data_vec)
         s2 = Series(next_data_vec)
+    return s1, s2, lag_fac
+
+
+def find_signal_correlation(first_data_vec, next_data_vec,
+                            time_stamps=None, reg_grid_tres=None,
+                            freq_unit="S", itp_method="linear",
+                            max_shift_percent=20,
+                            sigma_smooth=1, subsample_lag=True, plot=False,
+                            **kwargs):
+    """Determine cross correlation from two ICA time series.
+
+    Parameters
+    ----------
+    first_data_vec : array
+        first data vector (i.e. left or before ``next_data_vec``)
+    next_data_vec : array
+        second data vector (i.e. behind ``first_data_vec``)
+    time_stamps : array
+        array containing time stamps of the two data vectors. If default
+        (None), then the two vectors are assumed to be sampled on a regular
+        grid and the returned lag corresponds to the index shift with highest
+        correlation. If ``len(time_stamps) == len(first_data_vec)`` and if
+        entries are datetime objects, then the two input time series are
+        resampled and interpolated onto a regular grid, for resampling and
+        interpolation settings, see following 3 parameters.
+    reg_grid_tres : int
+        sampling resolution of resampled time series
+        data in units specified by input parameter ``freq_unit``. If None,
+        then the resolution is determined automatically based on the mean time
+        resolution of the data
+    freq_unit : str
+        pandas frequency unit (use S for seconds, L for ms)
+    itp_method : str
+        interpolation method, choose from ``["linear", "quadratic", "cubic"]``
+    max_shift_percent : float
+        percentage maximum shift applied to index of :arg:`first_data_vec`
+        to find pearson correlation with :arg:`next_data_vec`.
+    sigma_smooth : int
+        specify width of gaussian blurring kernel applied to data before
+        correlation analysis (default=1)
+    subsample_lag : bool
+        if True, the lag is refined to sub-sample precision by fitting a
+        parabola to the correlation coefficients around the maximum
+    plot : bool
+        if True, result is plotted
+
+    Note
+    ----
+    The pearson correlation coefficients for all shifts are computed at once
+    from the FFT based cross correlation of both signals (and cumulative
+    sums for the normalisation of the overlapping signal parts), see
+    :func:`shifted_pearson_coeffs`.
+
+    Returns
+    -------
+    tuple
+        5-element tuple containing
+
+        - *float*: lag (in units of s or the index, see input specs)
+        - *array*: retrieved correlation coefficients for all shifts
+        - *Series*: analysis signal 1. data vector
+        - *Series*: analysis signal 2. data vector
+        - *Series*: analysis signal 2. data vector shifted using ``lag`
 
+    """
+    s1, s2, lag_fac = _prepare_correlation_signals(first_data_vec,
+                                                   next_data_vec,
+                                                   time_stamps, reg_grid_tres,
+                                                   freq_unit, itp_method)
     s1_vec = gaussian_filter(s1, sigma_smooth)
     s2_vec = gaussian_filter(s2, sigma_smooth)
 
-    coeffs = []
-    max_coeff = -100
-    max_coeff_signal = None
     max_shift = int(len(s1_vec) * max_shift_percent / 100.0)
     logger.info("Signal correlation analysis running...")
-    for k in range(max_shift):
-        logger.info("Current shift=%d" % k)
-        shift_s1 = roll(s1_vec, k)[k:]
-        r = pearsonr(shift_s1, s2_vec[k:])
-        coeffs.append(r[0])
-        if coeffs[-1] > max_coeff:
-            max_coeff = coeffs[-1]
-            max_coeff_signal = Series(shift_s1, s1.index[k:])
-    coeffs = asarray(coeffs)
+    coeffs = shifted_pearson_coeffs(s1_vec, s2_vec, max_shift)
+    idx_max = argmax(where(isnan(coeffs), -inf, coeffs))
+    max_coeff_signal = Series(s1_vec[:len(s1_vec) - idx_max],
+                              s1.index[idx_max:])
     s1_ana = Series(s1_vec, s1.index)
     s2_ana = Series(s2_vec, s2.index)
 
@@ -265,10 +298,213 @@ def find_signal_correlation(first_data_vec, next_data_vec,
         # ax[1].set_xlabel("Shift")
         ax[2].set_ylabel("Correlation coeff")
         ax[2].set_title("Correlation signal")
-    lag = argmax(coeffs) * lag_fac
+    lag = idx_max
+    if subsample_lag and 0 < idx_max < len(coeffs) - 1:
+        lag += _parabolic_peak_offset(*coeffs[idx_max - 1:idx_max + 2])
+    lag = lag * lag_fac
     return lag, coeffs, s1_ana, s2_ana, max_coeff_signal, ax
 
 
+def shifted_pearson_coeffs(first_data_vec, next_data_vec, max_shift):
+    """Compute pearson correlation coefficients for a range of index shifts.
+
+    For each shift ``k`` (``0 <= k < max_shift``), the coefficient of the
+    overlapping signal parts ``first_data_vec[:N - k]`` and
+    ``next_data_vec[k:]`` is computed. The cross products of all shifts are
+    determined at once using FFT, i.e. the computation is O(N log N).
+
+    Parameters
+    ----------
+    first_data_vec : array
+        first data vector (length N)
+    next_data_vec : array
+        second data vector (length N)
+    max_shift : int
+        number of index shifts
+
+    Returns
+    -------
+    array
+        correlation coefficients (NaN if one of the signal parts is
+        constant)
+
+    """
+    x = asarray(first_data_vec, dtype=float)
+    y = asarray(next_data_vec, dtype=float)
+    num = len(x)
+    max_shift = min(max_shift, num)
+    # the coefficients are invariant to offsets, subtracting the means
+    # reduces the cancellation in the moment sums below
+    x = x - x.mean()
+    y = y - y.mean()
+    nfft = 1 << int(2 * num - 1).bit_length()
+    xy = irfft(rfft(x, nfft).conj() * rfft(y, nfft), nfft)[:max_shift]
+    n = num - arange(max_shift)
+    # sums over x[:N - k] and y[k:]
+    sx = cumsum(x)[n - 1]
+    sxx = cumsum(x * x)[n - 1]
+    sy = cumsum(y[::-1])[n - 1]
+    syy = cumsum((y * y)[::-1])[n - 1]
+    cov = xy - sx * sy / n
+    var = (sxx - sx ** 2 / n) * (syy - sy ** 2 / n)
+    with errstate(divide="ignore", invalid="ignore"):
+        coeffs = cov / sqrt(var)
+    coeffs[~(var > 0)] = nan
+    return coeffs.clip(-1, 1)
+
+
+def rolling_shifted_pearson_coeffs(first_data_vec, next_data_vec, window,
+                                   step, max_shift):
+    """Compute shifted pearson coefficients in sliding windows.
+
+    Computes, for each window and each shift ``k`` (``0 <= k < max_shift``),
+    the correlation coefficient of the same signal parts as
+    :func:`shifted_pearson_coeffs` does for the whole signals. The sums
+    required for all windows are retrieved from cumulative sums of the
+    signals (and of the shifted signal products), which are computed only
+    once, i.e. overlapping windows do not increase the computational cost.
+
+    Parameters
+    ----------
+    first_data_vec : array
+        first data vector (length N)
+    next_data_vec : array
+        second data vector (length N)
+    window : int
+        window size in indices
+    step : int
+        index step between the start indices of two consecutive windows
+    max_shift : int
+        number of index shifts
+
+    Returns
+    -------
+    tuple
+        2-element tuple containing
+
+        - *array*: start indices of windows
+        - *array*: 2D array containing correlation coefficients (first \
+            index is window, second index is shift)
+
+    """
+    x = asarray(first_data_vec, dtype=float)
+    y = asarray(next_data_vec, dtype=float)
+    num = len(x)
+    if not 1 < window <= num:
+        raise ValueError("Invalid window size %s for signal length %s"
+                         % (window, num))
+    max_shift = min(max_shift, window - 1)
+    x = x - x.mean()
+    y = y - y.mean()
+    starts = arange(0, num - window + 1, max(int(step), 1))
+    coeffs = empty((len(starts), max_shift))
+
+    def csum(vec):
+        return concatenate(([0.], cumsum(vec)))
+
+    cx, cxx, cy, cyy = csum(x), csum(x * x), csum(y), csum(y * y)
+    for k in range(max_shift):
+        n = window - k
+        # x[i0:i0 + n] and y[i0 + k:i0 + window]
+        sx = cx[starts + n] - cx[starts]
+        sxx = cxx[starts + n] - cxx[starts]
+        sy = cy[starts + window] - cy[starts + k]
+        syy = cyy[starts + window] - cyy[starts + k]
+        cxy = csum(x[:num - k] * y[k:])
+        sxy = cxy[starts + n] - cxy[starts]
+        cov = sxy - sx * sy / n
+        var = (sxx - sx ** 2 / n) * (syy - sy ** 2 / n)
+        with errstate(divide="ignore", invalid="ignore"):
+            coeffs[:, k] = cov / sqrt(var)
+        coeffs[~(var > 0), k] = nan
+    return starts, coeffs.clip(-1, 1)
+
+
+def rolling_signal_correlation(first_data_vec, next_data_vec, window, step,
+                               time_stamps=None, reg_grid_tres=None,
+                               freq_unit="S", itp_method="linear",
+                               max_shift_percent=20, sigma_smooth=1,
+                               subsample_lag=True, **kwargs):
+    """Determine lags between two signals in sliding windows.
+
+    Rolling version of :func:`find_signal_correlation`: the two signals are
+    prepared (resampled, smoothed) once and the lag of maximum correlation
+    is then determined in overlapping windows (see
+    :func:`rolling_shifted_pearson_coeffs`).
+
+    Parameters
+    ----------
+    first_data_vec : array
+        first data vector (i.e. left or before ``next_data_vec``)
+    next_data_vec : array
+        second data vector (i.e. behind ``first_data_vec``)
+    window : float
+        window size in units of s (or indices if no time stamps are provided)
+    step : float
+        step between consecutive windows in units of s (or indices if no time
+        stamps are provided)
+    time_stamps : array
+        time stamps of the two data vectors (cf.
+        :func:`find_signal_correlation`)
+    reg_grid_tres : int
+        see :func:`find_signal_correlation`
+    freq_unit : str
+        see :func:`find_signal_correlation`
+    itp_method : str
+        see :func:`find_signal_correlation`
+    max_shift_percent : float
+        maximum shift in percent of the window size
+    sigma_smooth : int
+        width of gaussian blurring kernel applied to the signals
+    subsample_lag : bool
+        if True, the lags are refined to sub-sample precision
+
+    Returns
+    -------
+    DataFrame
+        contains lags (in units of s or indices, column ``lag``) and
+        maximum correlation coefficient (column ``coeff``) for each window.
+        The index corresponds to the window centers (time stamps or
+        indices, depending on input)
+
+    """
+    s1, s2, lag_fac = _prepare_correlation_signals(first_data_vec,
+                                                   next_data_vec,
+                                                   time_stamps, reg_grid_tres,
+                                                   freq_unit, itp_method)
+    s1_vec = gaussian_filter(s1, sigma_smooth)
+    s2_vec = gaussian_filter(s2, sigma_smooth)
+    window_idx = int(round(window / lag_fac))
+    step_idx = int(round(step / lag_fac))
+    max_shift = int(window_idx * max_shift_percent / 100.0)
+    logger.info("Rolling signal correlation analysis running...")
+    starts, coeffs = rolling_shifted_pearson_coeffs(s1_vec, s2_vec,
+                                                    window_idx, step_idx,
+                                                    max_shift)
+    lags = empty(len(starts))
+    coeffs_max = empty(len(starts))
+    for i, cs in enumerate(coeffs):
+        if all(isnan(cs)):
+            lags[i], coeffs_max[i] = nan, nan
+            continue
+        idx_max = argmax(where(isnan(cs), -inf, cs))
+        lag = idx_max
+        if subsample_lag and 0 < idx_max < len(cs) - 1:
+            lag += _parabolic_peak_offset(*cs[idx_max - 1:idx_max + 2])
+        lags[i] = lag * lag_fac
+        coeffs_max[i] = cs[idx_max]
+    index = s1.index[starts + (window_idx - 1) // 2]
+    return DataFrame(od([("lag", lags), ("coeff", coeffs_max)]), index=index)
+
+
+def _parabolic_peak_offset(left, center, right):
+    """Sub-sample offset of the vertex of a parabola through three points."""
+    denom = left - 2 * center + right
+    if not denom < 0:
+        return 0.0
+    return 0.5 * (left - right) / denom
+
+
 def find_signal_correlation_old(first_data_vec, next_data_vec,
                                 time_stamps=None, reg_grid_tres=None,
                                 freq_unit="S", itp_method="linear",
@@ -482,7 +718,8 @@ class VeloCrossCorrEngine(object):
                         "coeffs": None,
                         "ica_tseries_pcs": None,
                         "ica_tseries_offset": None,
-                        "ica_tseries_shift": None}
+                        "ica_tseries_shift": None,
+                        "rolling": None}
 
         # see :func:`find_signal_correlation` for details about parameters
         self.settings = {"reg_grid_tres": None,
@@ -661,16 +898,6 @@ class VeloCrossCorrEngine(object):
             raise ValueError("Please set start / stop indices such that "
                              "at least 20 images are used for cross "
                              "correlation analysis")
-        # get the number of datapoints of the first profile line (the second
-        # one has the same length in this case, since it was created from the
-        # first one using pcs1.offset(pixel_num=40), see above..
-        profile_len = len(pcs1.get_line_profile(dist_img.img))
-
-        # now create two empty 2D numpy arrays with height == profile_len and
-        # width == number of images in aa_list
-        profiles1 = empty((profile_len, num), dtype=float32)
-        profiles2 = empty((profile_len, num), dtype=float32)
-
         # for each of the 2 lines, extract pixel to pixel distances from the
         # provided dist_img (comes from measurement geometry) which is required
         # in order to perform integration along the profiles
@@ -679,17 +906,13 @@ class VeloCrossCorrEngine(object):
         dists_pcs2 = pcs2.get_line_profile(
             dist_img.img)  # pix to pix dists line 2
 
-        # loop over all images in list, extract profiles and write in the
-        # corresponding column of the profile picture
-        times = []
-        data = stack.stack
-        for k in range(num):
-            if k % 25 == 0:
-                logger.info("Loading PCS profiles from stack: %d (%d)" % (k, num))
-            img = data[k]
-            profiles1[:, k] = pcs1.get_line_profile(img)
-            profiles2[:, k] = pcs2.get_line_profile(img)
-            times.append(stack.time_stamps[k])
+        # extract the profiles of all images in the stack at once, each
+        # column of the profile pictures corresponds to one image
+        logger.info("Loading PCS profiles from stack (%d images)" % num)
+        data = stack.stack[start_idx:stop_idx]
+        profiles1 = pcs1.get_line_profiles_stack(data).astype(float32)
+        profiles2 = pcs2.get_line_profiles_stack(data).astype(float32)
+        times = list(stack.time_stamps[start_idx:stop_idx])
 
         # mutiply pix to pix dists to the AA profiles in the 2 images
         profiles1 = profiles1 * dists_pcs1.reshape((len(dists_pcs1), 1))
@@ -741,21 +964,12 @@ class VeloCrossCorrEngine(object):
 
         """
         from pyplis.imagelists import BaseImgList
+        from pyplis.pipeline import ImgListPipeline, PcsProfilesConsumer
 
         lst = self.imglist
-        cfn_temp = lst.cfn
-        pcs1 = self.pcs.convert(to_pyrlevel=lst.pyrlevel,
-                                to_roi_abs=lst.roi_abs)
-        pcs2 = self.pcs_offset.convert(to_pyrlevel=lst.pyrlevel,
-                                       to_roi_abs=lst.roi_abs)
         if not isinstance(lst, BaseImgList):
             raise AttributeError("Image list is not set")
 
-        dist_img = self.get_pix_dist_img(lst.pyrlevel)
-
-        # go to first image in list
-        lst.goto_img(start_idx)
-
         if stop_idx is None:
             stop_idx = lst.nof
 
@@ -764,61 +978,20 @@ class VeloCrossCorrEngine(object):
             raise ValueError("Please set start / stop indices such that "
                              "at least 20 images are used for cross "
                              "correlation analysis")
-        # get the number of datapoints of the first profile line (the second
-        # one has the same length in this case, since it was created from the
-        # first one using pcs1.offset(pixel_num=40), see above..
-        profile_len = len(pcs1.get_line_profile(dist_img.img))
-
-        # now create two empty 2D numpy arrays with height == profile_len and
-        # width == number of images in aa_list
-        profiles1 = empty((profile_len, num), dtype=float32)
-        profiles2 = empty((profile_len, num), dtype=float32)
-
-        # for each of the 2 lines, extract pixel to pixel distances from the
-        # provided dist_img (comes from measurement geometry) which is required
-        # in order to perform integration along the profiles
-        dists_pcs1 = pcs1.get_line_profile(
-            dist_img.img)  # pix to pix dists line 1
-        dists_pcs2 = pcs2.get_line_profile(
-            dist_img.img)  # pix to pix dists line 2
-
-        # loop over all images in list, extract profiles and write in the
-        # corresponding column of the profile picture
-        times = []
-        for k in range(num):
-            if k % 25 == 0:
-                logger.info("Loading PCS profiles from list: %d (%d)" % (k, num))
-            img = lst.current_img().img
-            profiles1[:, k] = pcs1.get_line_profile(img)
-            profiles2[:, k] = pcs2.get_line_profile(img)
-            times.append(lst.current_time())
-            lst.goto_next()
-
-        # mutiply pix to pix dists to the AA profiles in the 2 images
-        profiles1 = profiles1 * dists_pcs1.reshape((len(dists_pcs1), 1))
-        profiles2 = profiles2 * dists_pcs2.reshape((len(dists_pcs2), 1))
-
-        # Get dictionary containing image preparation information
-        img_prep = lst.current_img().edit_log
-
-        # now create 2 ProfileTimeSeriesImg objects from the 2 just determined
-        # images and include meta information (e.g. time stamp vector, image
-        # preparation information)
-        prof_pic1 = ProfileTimeSeriesImg(profiles1, time_stamps=times,
-                                         img_id=pcs1.line_id,
-                                         profile_info_dict=pcs1.to_dict(),
-                                         **img_prep)
-
-        prof_pic2 = ProfileTimeSeriesImg(profiles2, time_stamps=times,
-                                         img_id=pcs2.line_id,
-                                         profile_info_dict=pcs2.to_dict(),
-                                         **img_prep)
+        # the profiles are multiplied with the pixel to pixel distances along
+        # each line (comes from measurement geometry) which is required in
+        # order to perform integration along the profiles
+        dist_img = self.get_pix_dist_img(lst.pyrlevel)
+        lines = od([("pcs", self.pcs), ("pcs_offset", self.pcs_offset)])
+        consumer = PcsProfilesConsumer(lines, dist_img=dist_img)
+        pipe = ImgListPipeline(lst, [consumer])
+        res = pipe.run(start_idx, stop_idx)["pcs_profiles"]
+        prof_pic1, prof_pic2 = res["pcs"], res["pcs_offset"]
 
         # save the two profile pics (these files are used in the main function
         # of this script in case they exist and option RELOAD = 0)
         self.profile_images["pcs"] = prof_pic1
         self.profile_images["pcs_offset"] = prof_pic2
-        lst.goto_img(cfn_temp)
 
         return (prof_pic1, prof_pic2)
 
@@ -833,10 +1006,6 @@ class VeloCrossCorrEngine(object):
         """
         self.update_settings(settings)
         prof_pic1, prof_pic2 = self.pcs_profile_pics
-        pcs1 = self.pcs.convert(prof_pic1.pyrlevel, prof_pic1.roi_abs)
-        pcs2 = self.pcs_offset.convert(prof_pic2.pyrlevel,
-                                       prof_pic2.roi_abs)
-        dist_img = self.get_pix_dist_img(pyrlevel=prof_pic1.pyrlevel)
 
         # Integrate the profiles for each image (y axis in profile images)
         icas1 = sum(prof_pic1.img, axis=0)
@@ -846,22 +1015,73 @@ class VeloCrossCorrEngine(object):
         res = find_signal_correlation(icas1, icas2, times, **self.settings)
         lag = res[0]
 
+        v = self._get_lines_distance_m(prof_pic1, prof_pic2) / lag
+
+        self.results.update({"velo": v,  # m/s
+                             "lag": lag,  # s
+                             "coeffs": res[1],
+                             "ica_tseries_pcs": res[2],
+                             "ica_tseries_offset": res[3],
+                             "ica_tseries_shift": res[4]})
+        return v
+
+    def run_rolling(self, window, step, **settings):
+        """Retrieve time series of velocities using sliding windows.
+
+        The ICA time series of both lines are computed once (i.e. from
+        :attr:`pcs_profile_pics`) and the lag of maximum correlation is
+        retrieved in overlapping time windows using
+        :func:`rolling_signal_correlation`. The result is also stored in
+        :attr:`results` (key ``rolling``).
+
+        Parameters
+        ----------
+        window : float
+            window size in s
+        step : float
+            time step between consecutive windows in s
+        **settings
+            optional keyword args passed to
+            :func:`rolling_signal_correlation`
+
+        Returns
+        -------
+        Series
+            velocities in m/s (index corresponds to the window centers, NaN
+            if no positive lag was found), can be used as time dependent
+            global velocity in
+            :class:`EmissionRateAnalysis` (``velo_glob``)
+
+        """
+        self.update_settings(settings)
+        prof_pic1, prof_pic2 = self.pcs_profile_pics
+
+        icas1 = sum(prof_pic1.img, axis=0)
+        icas2 = sum(prof_pic2.img, axis=0)
+        times = prof_pic1.time_stamps
+
+        df = rolling_signal_correlation(icas1, icas2, window, step, times,
+                                        **self.settings)
+        # windows without (positive) lag are set to NaN
+        lags = df["lag"].where(df["lag"] > 0)
+        df["velo"] = self._get_lines_distance_m(prof_pic1, prof_pic2) / lags
+        self.results["rolling"] = df
+        return df["velo"]
+
+    def _get_lines_distance_m(self, prof_pic1, prof_pic2):
+        """Get the distance between both lines in m."""
+        pcs1 = self.pcs.convert(prof_pic1.pyrlevel, prof_pic1.roi_abs)
+        pcs2 = self.pcs_offset.convert(prof_pic2.pyrlevel,
+                                       prof_pic2.roi_abs)
+        dist_img = self.get_pix_dist_img(pyrlevel=prof_pic1.pyrlevel)
+
         # Average pix-to-pix distances for both lines
         pix_dist_avg_line1 = pcs1.get_line_profile(dist_img.img).mean()
         pix_dist_avg_line2 = pcs2.get_line_profile(dist_img.img).mean()
 
         # Take the mean of those to determine distance between both lines in m
         pix_dist_avg = mean([pix_dist_avg_line1, pix_dist_avg_line2])
-
-        v = pcs1.dist_other(pcs2) * pix_dist_avg / lag
-
-        self.results = {"velo": v,  # m/s
-                        "lag": lag,  # s
-                        "coeffs": res[1],
-                        "ica_tseries_pcs": res[2],
-                        "ica_tseries_offset": res[3],
-                        "ica_tseries_shift": res[4]}
-        return v
+        return pcs1.dist_other(pcs2) * pix_dist_avg
 
     def create_parallel_pcs_offset(self, offset_pix=50, color="lime",
                                    linestyle="--"):
@@ -1080,7 +1300,13 @@ class VeloCrossCorrEngine(object):
         ax.grid()
         # ax[1].set_xlabel("Shift")
         ax.set_ylabel("Correlation coefficient")
-        x = arange(0, len(coeffs), 1) * lag / argmax(coeffs)
+        # time resolution of correlated signals
+        idx = self.results["ica_tseries_pcs"].index
+        try:
+            dt = (idx[1] - idx[0]).total_seconds()
+        except AttributeError:
+            dt = 1.0
+        x = arange(0, len(coeffs), 1) * dt
 
         ax.plot(x, coeffs, **kwargs)
 
@@ -2224,6 +2450,17 @@ class FarnebackSettings(object):
                 pass
 
 
+def _calc_flow_farneback(prep_this, prep_next, settings):
+    """Calculate Farneback flow of two prepared (8 bit) images.
+
+    Module level function used by :func:`OptflowFarneback.iter_flow` such
+    that it can also be submitted to process pools.
+    """
+    return calcOpticalFlowFarneback(prep_this, prep_next, flow=None,
+                                    flags=OPTFLOW_FARNEBACK_GAUSSIAN,
+                                    **settings)
+
+
 class OptflowFarneback(object):
     """Implementation of Optical flow Farneback algorithm of OpenCV library.
 
@@ -2458,15 +2695,118 @@ class OptflowFarneback(object):
         if all([isinstance(x, Img) for x in [this_img, next_img]]):
             self.set_images(this_img, next_img)
 
-        settings = self.settings._flow_algo
-        # print "Calculating Farneback optical flow"
-        self.flow = calcOpticalFlowFarneback(self.images_prep["this"],
-                                             self.images_prep["next"],
-                                             flow=None,
-                                             flags=OPTFLOW_FARNEBACK_GAUSSIAN,
-                                             **settings)
+        self.flow = _calc_flow_farneback(self.images_prep["this"],
+                                         self.images_prep["next"],
+                                         self.settings._flow_algo)
+        return self.flow
+
+    def iter_flow(self, images, max_workers=None, executor=None,
+                  flow_file=None, num=None):
+        """Calculate flow fields of all pairs of consecutive images.
+
+        Generator that computes the Farneback optical flow for the image
+        pairs ``(0, 1), (1, 2), ...`` of the input sequence in a worker
+        pool. The image preparation (contrast update and conversion to 8 bit,
+        see :func:`set_images`) is done in the calling thread, only the
+        calls of :func:`cv2.calcOpticalFlowFarneback` (which release the GIL)
+        are distributed to the workers. At most ``2 * max_workers`` pairs are
+        in flight at a time and the results are yielded in order.
+
+        Whenever a flow field is yielded, :attr:`images_input`,
+        :attr:`images_prep` and :attr:`flow` correspond to the respective
+        image pair, i.e. all analysis methods of this object (e.g.
+        :func:`get_flow_in_roi`, :func:`get_main_flow_field_params`) can be
+        applied to it, just like after :func:`calc_flow`.
+
+        Parameters
+        ----------
+        images : iterable
+            sequence of :class:`Img` objects (e.g. all images of a list, or
+            a generator loading them one after another)
+        max_workers : :obj:`int`, optional
+            number of worker threads (if None, the number of CPUs is used).
+            Ignored if ``executor`` is provided
+        executor : :obj:`Executor`, optional
+            existing executor (thread or process pool) that is supposed to be
+            used for the flow calculation
+        flow_file : :obj:`str`, optional
+            if specified, all flow fields are additionally written into a
+            memory-mapped ``.npy`` file at this location (shape
+            ``(num, h, w, 2)``) which can be read using
+            ``numpy.load(flow_file, mmap_mode="r")``
+        num : :obj:`int`, optional
+            number of flow fields written to ``flow_file`` (only required if
+            ``images`` has no length, defaults to ``len(images) - 1``)
+
+        Yields
+        ------
+        array
+            3D numpy array containing flow displacement field of each pair
+
+        """
+        if flow_file is not None and num is None:
+            num = len(images) - 1
+        own_executor = executor is None
+        if own_executor:
+            if max_workers is None:
+                max_workers = cpu_count()
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        elif max_workers is None:
+            max_workers = cpu_count()
+        max_pending = 2 * max_workers
+        pending = deque()
+        store = None
+        idx = 0
+        images = iter(images)
+        this_img = next(images, None)
+        try:
+            for next_img in images:
+                self.set_images(this_img, next_img)
+                prep = dict(self.images_prep)
+                future = executor.submit(_calc_flow_farneback, prep["this"],
+                                         prep["next"],
+                                         dict(self.settings._flow_algo))
+                pending.append((this_img, next_img, prep, future))
+                this_img = next_img
+                while len(pending) >= max_pending or\
+                        (pending and pending[0][-1].done()):
+                    flow = self._pop_pending(pending)
+                    store = self._write_flow_store(store, flow, idx,
+                                                   flow_file, num)
+                    idx += 1
+                    yield flow
+            while pending:
+                flow = self._pop_pending(pending)
+                store = self._write_flow_store(store, flow, idx, flow_file,
+                                               num)
+                idx += 1
+                yield flow
+        finally:
+            for item in pending:
+                item[-1].cancel()
+            if own_executor:
+                executor.shutdown(wait=True)
+            if store is not None:
+                store.flush()
+
+    def _pop_pending(self, pending):
+        """Restore state of oldest pending image pair and return its flow."""
+        this_img, next_img, prep, future = pending.popleft()
+        self.images_input = {"this": this_img, "next": next_img}
+        self.images_prep = prep
+        self.flow = future.result()
         return self.flow
 
+    def _write_flow_store(self, store, flow, idx, flow_file, num):
+        """Write flow field into memory-mapped store (created on first use)."""
+        if flow_file is None:
+            return store
+        if store is None:
+            store = open_memmap(flow_file, mode="w+", dtype=float32,
+                                shape=(num,) + flow.shape)
+        store[idx] = flow
+        return store
+
     def get_flow_in_roi(self, roi_rel=None):
         """Get the flow field within in a ROI.
 
@@ -22,14 +22,16 @@ r"""Pyplis module contains the following processing classes and methods.
 series of average pixel intensities
 """
 from __future__ import (absolute_import, division)
-from numpy import (vstack, empty, ones, asarray, sum, dstack, float32, zeros,
+from numpy import (empty, ones, asarray, sum, dstack, float32, zeros,
                    poly1d, polyfit, argmin, where, logical_and, rollaxis,
-                   delete, hstack)
+                   delete, memmap, arange, floor, dtype as np_dtype)
+from mmap import mmap
 
 from scipy.ndimage.filters import gaussian_filter1d, median_filter
 
 
 from copy import deepcopy
+from collections import OrderedDict as od
 from datetime import datetime, timedelta
 from matplotlib.pyplot import subplots
 from matplotlib.dates import date2num, DateFormatter
@@ -37,6 +39,7 @@ from matplotlib.dates import date2num, DateFormatter
 from pandas import Series, concat, DatetimeIndex
 from cv2 import pyrDown, pyrUp
 from os.path import join, exists, dirname, basename, isdir, abspath
+from os import remove
 from astropy.io import fits
 import six
 from pyplis import logger
@@ -50,7 +53,9 @@ class ImgStack(object):
     """Image stack object.
 
     The images are stacked into a 3D numpy array, note, that for large datasets
-    this may cause MemoryErrors. This object is for instance used to perform
+    this may cause MemoryErrors. In this case, the stack data can be stored
+    in a memory-mapped file on disk (see input parameter ``memmap_file`` and
+    :func:`load_stack_fits`). This object is for instance used to perform
     a DOAS field of view search (see also :mod:`doascalib`).
 
     It provides basic image processing functionality, for instance changing
@@ -92,22 +97,40 @@ class ImgStack(object):
     img_prep : dict
         additional information about the preparation state of the images
         (e.g. roi, gauss pyramid level, dark corrected?, blurred?)
+    camera : :obj:`Camera`, optional
+        camera used to record the images
+    memmap_file : :obj:`str`, optional
+        path of a (binary) file in which the stack data array is stored as
+        memory-mapped array (:class:`numpy.memmap`), instead of keeping it
+        in RAM. Existing files are overwritten. Use :func:`save_as_fits` to
+        store the stack including all meta information.
     **stack_data
         can be used to pass stack data directly
 
     """
 
+    # pandas interpolation types that only use the two neighbouring data
+    # points (used for vectorised merging with time series data)
+    _TWO_POINT_ITP_TYPES = ["linear", "time", "index", "values", "nearest",
+                            "zero", "slinear", "pad"]
+
     def __init__(self, height=0, width=0, img_num=0, dtype=float32,
-                 stack_id="", img_prep=None, camera=None, **stack_data):
+                 stack_id="", img_prep=None, camera=None, memmap_file=None,
+                 **stack_data):
         self.stack_id = stack_id
         self.dtype = dtype
         self.current_index = 0
+        if memmap_file is not None:
+            memmap_file = abspath(memmap_file)
+        self.memmap_file = memmap_file
 
         self.stack = None
         self.start_acq = None
         self.texps = None
         self.add_data = None
         self._access_mask = None
+        # allocated memory, the data arrays above are views of these
+        self._buffers = None
 
         if img_prep is None:
             img_prep = {"pyrlevel": 0}
@@ -142,18 +165,9 @@ class ImgStack(object):
             number of images to be stacked
 
         """
-        try:
-            self.stack = empty((int(img_num), int(height), int(width))).\
-                astype(self.dtype)
-        except MemoryError:
-            raise MemoryError("Could not initiate empty 3D numpy array "
-                              "(d, h, w): (%s, %s, %s)" % (img_num, height,
-                                                           width))
-        self.start_acq = asarray([datetime(1900, 1, 1)] * img_num)
-        self.texps = zeros(img_num, dtype=float32)
-        self.add_data = zeros(img_num, dtype=float32)
-
-        self._access_mask = zeros(img_num, dtype=bool)
+        img_num = int(img_num)
+        self._buffers = self._alloc_buffers(img_num, int(height), int(width))
+        self._set_views(img_num)
         self.current_index = 0
 
     @property
@@ -217,6 +231,100 @@ class ImgStack(object):
         """Depth of stack."""
         return self.stack.shape[0]
 
+    @property
+    def is_memmap(self):
+        """Boolean specifying whether stack data is memory-mapped from disk."""
+        arr = self.stack
+        while arr is not None:
+            if isinstance(arr, (memmap, mmap)):
+                return True
+            arr = getattr(arr, "base", None)
+        return False
+
+    @property
+    def capacity(self):
+        """Number of images that fit into the allocated stack memory.
+
+        Can be larger than :attr:`num_of_imgs` (see :func:`reserve`).
+        """
+        if self._buffers is None:
+            return self.num_of_imgs
+        for key, arr in six.iteritems(self._buffers):
+            if getattr(getattr(self, key), "base", None) is not arr:
+                # data was reassigned, e.g. in :func:`pyr_down`
+                return self.num_of_imgs
+        return self._buffers["stack"].shape[0]
+
+    def reserve(self, num):
+        """Allocate memory for at least ``num`` images.
+
+        The depth of the stack (:attr:`num_of_imgs`) is not changed, but
+        images can be added (e.g. using :func:`add_img`) beyond the current
+        depth up to ``num`` images without reallocation of the stack data.
+
+        Parameters
+        ----------
+        num : int
+            number of images
+
+        """
+        num = int(num)
+        if num <= self.capacity:
+            return
+        h, w = self.shape[1:]
+        if not h * w > 0:
+            raise ValueError("Cannot reserve memory in stack %s, image shape "
+                             "is unknown" % self.stack_id)
+        n = self.num_of_imgs
+        # memory-mapped stack data is extended in place (see _alloc_memmap)
+        keep_data = self._stack_in_memmap_file(h, w)
+        buffers = self._alloc_buffers(num, h, w)
+        for key, arr in six.iteritems(buffers):
+            if key == "stack" and keep_data:
+                continue
+            arr[:n] = getattr(self, key)[:n]
+        self._buffers = buffers
+        self._set_views(n)
+
+    def flush(self):
+        """Write any changes of memory-mapped stack data to disk."""
+        if self._buffers is not None and isinstance(self._buffers["stack"],
+                                                    memmap):
+            self._buffers["stack"].flush()
+
+    def finalize(self, release=False):
+        """Trim the stack to the images that were added.
+
+        The stack depth is reduced to the last image that was inserted (e.g.
+        via :func:`add_img`), the data arrays of the stack are views of the
+        allocated memory, i.e. no data is copied.
+
+        Parameters
+        ----------
+        release : bool
+            if True, the data is copied into memory of the exact size, and
+            any unused memory (see :func:`reserve`) is released (only
+            applies to stacks kept in RAM, see :attr:`is_memmap`)
+
+        Returns
+        -------
+        array
+            the trimmed stack data array (:attr:`stack`)
+
+        """
+        filled = where(self._access_mask)[0]
+        num = self.current_index
+        if len(filled) > 0:
+            num = max(num, filled[-1] + 1)
+        num = min(num, self.num_of_imgs)
+        for key in self._data_attrs():
+            setattr(self, key, getattr(self, key)[:num])
+        if release and self.capacity > num and not self.is_memmap:
+            self._buffers = None
+            for key in self._data_attrs():
+                setattr(self, key, getattr(self, key).copy())
+        return self.stack
+
     def check_index(self, idx=0):
         if 0 <= idx <= self.last_index:
             return
@@ -226,18 +334,80 @@ class ImgStack(object):
             raise IndexError("Invalid index %d for inserting image in stack "
                              "with current depth %d" % (idx, self.num_of_imgs))
 
-    def _extend_stack_array(self):
-        """Extend the first index of the stack array."""
-        h, w = self.shape[1:]
+    def _extend_stack_array(self, num=1):
+        """Extend the first index of the stack array.
+
+        If the allocated memory is exceeded, the capacity of the stack is
+        (at least) doubled such that adding images one by one only requires
+        an amortised constant number of copies.
+        """
+        n = self.num_of_imgs
+        if n + num > self.capacity:
+            self.reserve(max(n + num, 2 * n))
+        buf = self._buffers
+        buf["start_acq"][n:n + num] = datetime(1900, 1, 1)
+        buf["texps"][n:n + num] = 0.0
+        buf["add_data"][n:n + num] = 0.0
+        buf["_access_mask"][n:n + num] = False
+        self._set_views(n + num)
+
+    def _alloc_buffers(self, num, height, width):
+        """Allocate memory for stack data and meta info of images."""
         try:
-            self.stack = vstack((self.stack, empty((1, h, w))))
+            if self.memmap_file is not None and num * height * width > 0:
+                stack = self._alloc_memmap(num, height, width)
+            else:
+                stack = empty((num, height, width), dtype=self.dtype)
         except MemoryError:
-            raise MemoryError("Cannot add more data to stack due to memory "
-                              "overflow...")
-        self.start_acq = hstack((self.start_acq, [datetime(1900, 1, 1)]))
-        self.texps = hstack((self.texps, [0.0]))
-        self.add_data = hstack((self.add_data, [0.0]))
-        self._access_mask = hstack((self._access_mask, [False]))
+            raise MemoryError("Could not initiate empty 3D numpy array "
+                              "(d, h, w): (%s, %s, %s)" % (num, height,
+                                                           width))
+        start_acq = empty(num, dtype=object)
+        start_acq[:] = datetime(1900, 1, 1)
+        return od([("stack", stack),
+                   ("start_acq", start_acq),
+                   ("texps", zeros(num, dtype=float32)),
+                   ("add_data", zeros(num, dtype=float32)),
+                   ("_access_mask", zeros(num, dtype=bool))])
+
+    def _alloc_memmap(self, num, height, width):
+        """Allocate memory-mapped stack data in :attr:`memmap_file`.
+
+        If the current stack data is already stored in this file, the file
+        is resized and the data is preserved, i.e. the stack grows on disk
+        without copying.
+        """
+        if self._stack_in_memmap_file(height, width):
+            self._buffers["stack"].flush()
+            with open(self.memmap_file, "r+b") as f:
+                f.truncate(num * height * width *
+                           np_dtype(self.dtype).itemsize)
+            mode = "r+"
+        else:
+            mode = "w+"
+        return memmap(self.memmap_file, dtype=self.dtype, mode=mode,
+                      shape=(num, height, width))
+
+    def _stack_in_memmap_file(self, height, width):
+        """Check if current stack data is mapped from :attr:`memmap_file`."""
+        if self.memmap_file is None or self._buffers is None:
+            return False
+        buf = self._buffers["stack"]
+        return (isinstance(buf, memmap) and
+                buf.filename == self.memmap_file and
+                buf.shape[1:] == (height, width) and
+                buf.dtype == np_dtype(self.dtype) and
+                self.stack.base is buf)
+
+    def _set_views(self, num):
+        """Set data arrays as views of first ``num`` entries of memory."""
+        for key, arr in six.iteritems(self._buffers):
+            setattr(self, key, arr[:num])
+
+    @staticmethod
+    def _data_attrs():
+        """Names of data arrays of stack (first axis is time)."""
+        return ("stack", "start_acq", "texps", "add_data", "_access_mask")
 
     def insert_img(self, pos, img_arr, start_acq=datetime(1900, 1, 1),
                    texp=0.0, add_data=0.0):
@@ -279,7 +449,8 @@ class ImgStack(object):
         The image is inserted at the current index position ``current_index``
         which is increased by 1 afterwards. If the latter exceeds the dimension
         of the actual stack data array :attr:`stack`, the stack shape will be
-        extended by 1.
+        extended by 1 (memory is allocated in advance, see :func:`reserve`
+        and :func:`finalize`).
 
         Parameters
         ----------
@@ -532,6 +703,12 @@ class ImgStack(object):
                                            itp_type="linear"):
         """Merge this stack with input data using interpolation.
 
+        For interpolation types that only use the two neighbouring data
+        points (e.g. linear, time, nearest), the interpolation indices and
+        weights are determined once from the merged time axis and are
+        applied to all pixels of the stack at once. For other types (e.g.
+        quadratic), the interpolation is done pixel by pixel.
+
         :param Series time_series_data: pandas Series object containing time
             series data (e.g. DOAS column densities)
         :param str itp_type: interpolation type (passed to
@@ -562,30 +739,32 @@ class ImgStack(object):
             raise ValueError("Unexpected error, length of merged data "
                              "array does not exceed length of inital image "
                              "stack...")
-        # create new arrays for the merged stack
-        new_stack = empty((new_num, h, w))
         new_acq_times = df0[0].index
-        new_texps = df0[0].values
-
-        for i in range(h):
-            for j in range(w):
-                logger.info("Stack interpolation active...: current img row (y):"
-                      "%s (%s)" % (i, j))
-                # get series from stack at current pixel
-                series_stack = Series(stack[:, i, j], time_stamps)
-                # create a dataframe
-                df = concat([series_stack, df0[1]], axis=1).\
-                    interpolate(itp_type).dropna()
-                # throw all N/A values
-                # df = df.dropna()
-                new_stack[:, i, j] = df[0].values
+
+        if itp_type in self._TWO_POINT_ITP_TYPES:
+            # interpolate the image indices of the stack onto the merged time
+            # axis, the resulting fractional indices determine the
+            # interpolation weights for all pixels
+            idx = Series(arange(len(time_stamps), dtype=float), time_stamps)
+            df = concat([idx, df0[1]], axis=1).interpolate(itp_type).dropna()
+            new_stack = self._interp_stack_frac_indices(stack, df[0].values)
+        else:
+            new_stack = empty((new_num, h, w))
+            logger.info("Stack interpolation active (pixel by pixel)...")
+            for i in range(h):
+                for j in range(w):
+                    # get series from stack at current pixel
+                    series_stack = Series(stack[:, i, j], time_stamps)
+                    # create a dataframe
+                    df = concat([series_stack, df0[1]], axis=1).\
+                        interpolate(itp_type).dropna()
+                    new_stack[:, i, j] = df[0].values
 
         stack_obj = ImgStack(new_num, h, w,
                              stack_id=self.stack_id,
                              img_prep=self.img_prep)
         stack_obj.roi_abs = self.roi_abs
-        # print new_stack.shape, new_acq_times.shape, new_texps.shape
-        stack_obj.set_stack_data(new_stack, new_acq_times, new_texps)
+        stack_obj.set_stack_data(new_stack, new_acq_times, df0[0].values)
 
         new_series = df[1]
         try:
@@ -594,6 +773,22 @@ class ImgStack(object):
             logger.info("Failed to access / process errors on time series data")
         return (stack_obj, new_series)
 
+    @staticmethod
+    def _interp_stack_frac_indices(stack, frac_idxs):
+        """Linearly interpolate images of stack at fractional indices.
+
+        :param ndarray stack: 3D data array (first axis is image index)
+        :param ndarray frac_idxs: fractional image indices at which the
+            stack is interpolated
+        :return: 3D array containing the interpolated images
+        """
+        num = stack.shape[0]
+        lo = floor(frac_idxs).astype(int).clip(0, max(num - 2, 0))
+        hi = (lo + 1).clip(0, num - 1)
+        weights = (frac_idxs - lo).reshape(-1, 1, 1)
+        lower = stack[lo].astype(float)
+        return lower + (stack[hi] - lower) * weights
+
     def _merge_tseries_average(self, time_series):
         """Make new stack of averaged images based on input start / stop arrays.
 
@@ -819,7 +1014,7 @@ class ImgStack(object):
         new_stack = ImgStack(height=h, width=w, img_num=self.num_of_imgs,
                              stack_id=self.stack_id, img_prep=prep)
         for i in range(self.shape[0]):
-            im = self.stack[i]
+            im = asarray(self.stack[i], dtype=self.dtype)
             for k in range(steps):
                 im = pyrDown(im)
             new_stack.add_img(img_arr=im, start_acq=self.start_acq[i],
@@ -843,7 +1038,7 @@ class ImgStack(object):
         new_stack = ImgStack(height=h, width=w, img_num=self.num_of_imgs,
                              stack_id=self.stack_id, img_prep=prep)
         for i in range(self.shape[0]):
-            im = self.stack[i]
+            im = asarray(self.stack[i], dtype=self.dtype)
             for k in range(steps):
                 im = pyrUp(im)
             new_stack.add_img(img_arr=im, start_acq=self.start_acq[i],
@@ -875,7 +1070,7 @@ class ImgStack(object):
             raise ValueError("Mismatch in array lengths of stack data, check"
                              "add_data, texps, start_acq, _access_mask")
 
-    def load_stack_fits(self, file_path):
+    def load_stack_fits(self, file_path, memmap=False):
         """Load stack object (fits).
 
         Note
@@ -886,19 +1081,29 @@ class ImgStack(object):
 
             byteswap().newbyteorder()
 
-        on any loaded data array.
+        on any loaded data array. This does not apply to the stack data if
+        it is loaded lazily (input arg. ``memmap``).
 
         Parameters
         ----------
         file_path : str
             file path of stack
+        memmap : bool
+            if True, the stack data is not loaded into memory but is
+            memory-mapped from the FITS file (i.e. images are read on access).
+            The data is kept in Big-endian byte order in this case
 
         """
         if not exists(file_path):
             raise IOError("ImgStack could not be loaded, path does not exist")
-        hdu = fits.open(file_path)
-        self.set_stack_data(hdu[0].data.byteswap().newbyteorder().
-                            astype(self.dtype))
+        hdu = fits.open(file_path, memmap=memmap)
+        if memmap:
+            data = hdu[0].data
+            self.dtype = data.dtype.newbyteorder("=")
+            self.set_stack_data(data)
+        else:
+            self.set_stack_data(hdu[0].data.byteswap().newbyteorder().
+                                astype(self.dtype))
         prep = Img().edit_log
         for key, val in six.iteritems(hdu[0].header):
             if key.lower() in prep.keys():
@@ -927,11 +1132,19 @@ class ImgStack(object):
             logger.warning("Failed to import data additional data")
         self.roi_abs = hdu[2].data["roi_abs"].byteswap().\
             newbyteorder()
+        # memory-mapped data remains accessible after closing
+        hdu.close()
         self._format_check()
 
     def save_as_fits(self, save_dir=None, save_name=None,
                      overwrite_existing=True):
-        """Save stack as FITS file."""
+        """Save stack as FITS file.
+
+        Memory-mapped stacks (see :attr:`is_memmap`) are written image by
+        image, such that the stack data is not loaded into memory. Use
+        :func:`load_stack_fits` with ``memmap=True`` to reopen a saved
+        stack lazily.
+        """
         self._format_check()
         # returns abspath of current wkdir if None
         save_dir = abspath(save_dir)
@@ -961,22 +1174,57 @@ class ImgStack(object):
         col5 = fits.Column(name="roi_abs", format="I", array=self.roi_abs)
 
         roi_abs = fits.BinTableHDU.from_columns([col5])
-        hdu.data = self.stack
+        if self.is_memmap:
+            # header is created from first image and updated to full depth
+            hdu.data = asarray(self.stack[:1], dtype=self.dtype)
+            hdu.header["NAXIS3"] = self.num_of_imgs
+        else:
+            hdu.data = self.stack
         hdu.header.update(self.img_prep)
         hdu.header["stack_id"] = self.stack_id
         hdu.header.append()
-        hdulist = fits.HDUList([hdu, arrays, roi_abs])
         path = join(save_dir, save_name)
         if exists(path):
             logger.info("Stack already exists at %s and will be overwritten"
                   % path)
 
         try:
-            hdulist.writeto(path, clobber=overwrite_existing)
+            if self.is_memmap:
+                self._write_fits_streamed(path, hdu.header, [arrays, roi_abs],
+                                          overwrite_existing)
+            else:
+                hdulist = fits.HDUList([hdu, arrays, roi_abs])
+                hdulist.writeto(path, overwrite=overwrite_existing)
         except BaseException:
             logger.warning("Failed to save stack to FITS File "
                  "(check previous warnings)")
 
+    def _write_fits_streamed(self, path, header, ext_hdus, overwrite=True):
+        """Write stack data image by image into FITS file.
+
+        Parameters
+        ----------
+        path : str
+            file path
+        header : Header
+            header of primary HDU (must specify the shape of the stack)
+        ext_hdus : list
+            list of extension HDUs appended after the stack data
+        overwrite : bool
+            if False, an IOError is raised if the file already exists
+
+        """
+        if exists(path):
+            if not overwrite:
+                raise IOError("File %s already exists" % path)
+            remove(path)
+        shdu = fits.StreamingHDU(path, header)
+        for i in range(self.num_of_imgs):
+            shdu.write(asarray(self.stack[i], dtype=self.dtype))
+        shdu.close()
+        for ext in ext_hdus:
+            fits.append(path, ext.data, ext.header)
+
     """Magic methods"""
 
     def __str__(self):
@@ -922,6 +922,7 @@ class BaseSetup(object):
         #. :attr:`ON_OFF_SAME_FILE`
         #. :attr:`LINK_OFF_TO_ON`
         #. :attr:`REG_SHIFT_OFF`
+        #. :attr:`SCAN_CACHE`
 
     Parameters
     ----------
@@ -952,7 +953,8 @@ class BaseSetup(object):
                            ("INCLUDE_SUB_DIRS", False),
                            ("ON_OFF_SAME_FILE", False),
                            ("LINK_OFF_TO_ON", True),
-                           ("REG_SHIFT_OFF", False)])
+                           ("REG_SHIFT_OFF", False),
+                           ("SCAN_CACHE", False)])
 
         self.check_timestamps()
         logger.info(self.LINK_OFF_TO_ON)
@@ -1106,6 +1108,23 @@ class BaseSetup(object):
             raise ValueError("need boolean")
         self.options["REG_SHIFT_OFF"] = value
 
+    @property
+    def SCAN_CACHE(self):
+        """File import option (boolean).
+
+        If True, the file search in the image base directory uses an on-disk
+        index of all files and their filename meta information (a SQLite file
+        in the base directory). The index is updated on each search, only
+        directories that were modified since the last search are scanned.
+        """
+        return self.options["SCAN_CACHE"]
+
+    @SCAN_CACHE.setter
+    def SCAN_CACHE(self, value):
+        if value not in [0, 1]:
+            raise ValueError("need boolean")
+        self.options["SCAN_CACHE"] = value
+
     def check_timestamps(self):
         """Check if timestamps are valid and set to current time if not."""
         if not isinstance(self.start, datetime):
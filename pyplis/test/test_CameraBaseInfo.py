@@ -86,3 +86,31 @@ def test_parse_filename_parsers():
     values_r = cam.parse_filename_regexp(filename, config)
 
     assert values == values_r
+
+
+def test_get_img_meta_index():
+    """Compare meta index with information from individual filenames."""
+    cam = CameraBaseInfo()
+    cam.delim = "_"
+    cam.time_info_pos = 3
+    cam.time_info_str = "%Y%m%d%H%M%S%f"
+    cam.filter_id_pos = cam.meas_type_pos = 4
+    cam.texp_pos = 5
+    files = ['/a/EC2_1106307_1R02_2015091607003032_F01_120.fts',
+             '/a/EC2_1106307_1R02_2015091607003532_F02_Etna.fts',
+             '/a/EC2_1106307_1R02_2015091607xx_D0L_Etna.fts',
+             'invalid']
+    idx = cam.get_img_meta_index(files)
+    assert idx["path"].tolist() == files
+    assert idx["start_acq"].tolist()[:2] == [
+        datetime(2015, 9, 16, 7, 0, 30, 320000),
+        datetime(2015, 9, 16, 7, 0, 35, 320000)]
+    assert idx["start_acq"].isnull().tolist() == [False, False, True, True]
+    assert idx["filter_id"].tolist() == ["F01", "F02", "D0L", None]
+    assert idx["texp"].iloc[0] == 0.12
+    assert idx["texp"].isnull().sum() == 3
+
+    cam.filename_regexp = r'^.*_(?P<date>.*)_(?P<meas_type>(?P<filter_id>.*))_.*'  # noqa: E501
+    idx_r = cam.get_img_meta_index(files)
+    assert idx_r["start_acq"].equals(idx["start_acq"])
+    assert idx_r["meas_type"].tolist() == ["F01", "F02", "D0L", None]
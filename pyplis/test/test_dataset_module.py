@@ -6,8 +6,12 @@ Email: jonasgliss@gmail.com
 License: GPLv3+
 """
 from __future__ import (absolute_import, division)
-from pyplis import Dataset, __dir__ as pyplis__dir__, Img
+from pyplis import Dataset, Camera, __dir__ as pyplis__dir__, Img
+from pyplis.dataset import _DirScanCache
+from datetime import datetime
 from os.path import join
+from os import walk, remove, utime
+from shutil import rmtree
 import pytest
 
 EC2_IMG_PATH = join(pyplis__dir__, "data", "test_201509160708_F01_335.fts")
@@ -28,3 +32,49 @@ def test_empty_dataset():
                    sum(info.values())]
 
     assert actual_vals == target_vals
+
+
+def test_dir_scan_cache(tmpdir):
+    """Test incremental update of directory scan cache."""
+    cam = Camera("ecII")
+    name = "EC2_1106307_1R02_20150916070%d3032_%s_Etna.fts"
+    for i, sub in enumerate(["", "a", "a/b", "c"]):
+        tmpdir.ensure(sub, name % (i, "F01"))
+        tmpdir.ensure(sub, name % (i, "F02"))
+    base_dir = str(tmpdir)
+
+    def scan(include_sub_dirs=True):
+        index = _DirScanCache(base_dir).scan(cam, include_sub_dirs)
+        paths = sorted(join(d, f) for d, _, files in walk(base_dir)
+                       for f in files if not f.startswith(".pyplis") and
+                       (include_sub_dirs or d == base_dir))
+        assert index["path"].tolist() == paths
+        return index
+
+    index = scan()
+    assert len(index) == 8
+    assert index["start_acq"].iloc[0] == datetime(2015, 9, 16, 7, 0, 30,
+                                                  320000)
+    assert index["filter_id"].tolist() == ["F01", "F02"] * 4
+    # the second scan only uses the cache
+    assert scan().equals(index)
+
+    remove(str(tmpdir.join("a", "b", name % (2, "F01"))))
+    rmtree(str(tmpdir.join("c")))
+    tmpdir.ensure("a", "d", name % (5, "F02"))
+    # make sure that modification times change
+    for sub in ["", "a", "a/b"]:
+        utime(str(tmpdir.join(sub)), (1e9, 1e9))
+    index = scan()
+    assert index["start_acq"].iloc[-1] == datetime(2015, 9, 16, 7, 5, 30,
+                                                   320000)
+    assert len(scan(include_sub_dirs=False)) == 2
+
+    # the cache file is ignored if the directory is searched without cache
+    ds = Dataset()
+    ds.setup.base_dir = base_dir
+    ds.setup.USE_ALL_FILE_TYPES = True
+    for include_sub_dirs in [True, False]:
+        ds.setup.INCLUDE_SUB_DIRS = include_sub_dirs
+        index = scan(include_sub_dirs)
+        assert ds.get_all_filepaths() == index["path"].tolist()
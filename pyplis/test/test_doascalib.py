@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Pyplis test module for doascalib.py base module of Pyplis.
+
+Author: Jonas Gliss
+Email: jonasgliss@gmail.com
+License: GPLv3+
+"""
+from __future__ import (absolute_import, division)
+
+from pyplis.doascalib import det_correlation_image_pearson
+from scipy.stats import pearsonr
+from numpy import zeros, float32
+from numpy.random import RandomState
+import numpy.testing as npt
+import pytest
+
+
+@pytest.fixture(scope="module")
+def stack_and_vec():
+    """Random image stack with one pixel correlated to a random vector."""
+    rs = RandomState(42)
+    stack = rs.normal(size=(40, 7, 9)).astype(float32)
+    vec = rs.normal(size=40)
+    stack[:, 3, 4] += 3 * vec
+    return stack, vec
+
+
+@pytest.mark.parametrize("chunk_rows", [None, 1, 3])
+def test_correlation_image_pearson(stack_and_vec, chunk_rows):
+    """Compare vectorised correlation image with pixel-wise pearsonr."""
+    stack, vec = stack_and_vec
+    corr_nominal, pval_nominal = zeros((7, 9)), zeros((7, 9))
+    for i in range(7):
+        for j in range(9):
+            corr_nominal[i, j], pval_nominal[i, j] = pearsonr(stack[:, i, j],
+                                                              vec)
+    corr, pval = det_correlation_image_pearson(stack, vec,
+                                               chunk_rows=chunk_rows)
+    npt.assert_allclose(corr, corr_nominal, rtol=1e-10, atol=1e-14)
+    npt.assert_allclose(pval, pval_nominal, rtol=1e-8, atol=1e-14)
+
+
+def test_correlation_image_pearson_float32(stack_and_vec):
+    """Test single precision computation of correlation image."""
+    stack, vec = stack_and_vec
+    corr, pval = det_correlation_image_pearson(stack, vec, dtype=float32)
+    corr64, _ = det_correlation_image_pearson(stack, vec)
+    npt.assert_array_equal([corr.dtype, pval.dtype], [float32, float32])
+    npt.assert_allclose(corr, corr64, atol=1e-5)
@@ -20,8 +20,11 @@ License: GPLv3+
 from __future__ import (absolute_import, division)
 
 import pyplis
-from os.path import join
-from datetime import datetime
+from os.path import join, basename
+from shutil import copy2
+from threading import Timer
+from datetime import datetime, timedelta
+from numpy import float32, ones
 import numpy.testing as npt
 import pytest
 
@@ -161,7 +164,7 @@ def aa_image_list(plume_dataset, bg_img_on, bg_img_off, viewing_direction):
 
     off_list.bg_model.update(**lst.bg_model.settings_dict())
 
-    lst.bg_model.mode = 0
+    lst.bg_model.update(mode=0, surface_fit_pyrlevel=0)
     off_list.bg_model.mode = 0
 
     lst.calc_sky_background_mask()
@@ -194,6 +197,20 @@ def line():
                               normal_orientation="left")
 
 
+@pytest.fixture(scope="function")
+def emission_rate_analysis(aa_image_list, line):
+    """Emission rate analysis of calibrated AA list (pyrlevel 2)."""
+    from numpy import linspace
+    lst = aa_image_list
+    lst.pyrlevel = 2
+    tau = linspace(0, 0.5, 20)
+    calib = pyplis.doascalib.DoasCalibData(tau_vec=tau, cd_vec=tau * 1e18)
+    calib.fit_calib_data()
+    lst.calib_data = calib
+    return pyplis.EmissionRateAnalysis(lst, pcs_lines=[line.convert(2)],
+                                       velo_glob=4.0, min_cd=-1e30)
+
+
 @pytest.fixture(scope="function")
 def geometry(plume_dataset):
     return plume_dataset.meas_geometry
@@ -251,6 +268,37 @@ def test_dataset(plume_dataset):
     npt.assert_array_equal(vals_exact, nominal_exact)
 
 
+def test_dataset_meta_index(plume_dataset):
+    """Test meta index of dataset that is shared by the image lists."""
+    ds = plume_dataset
+    on = ds.img_lists["on"]
+    index = on.meta_index
+    vals = [len(ds.meta_index), len(index), on._meta_index_valid(),
+            index["path"].isin(ds.meta_index["path"]).all(),
+            (index["filter_id"] == "F01").all(),
+            on.start_acq[0] == on.this.meta["start_acq"] >= START_PLUME]
+    npt.assert_array_equal(vals, [248, 89, True, True, True, True])
+    on.files.pop(-1)
+    assert not on._meta_index_valid()
+    npt.assert_array_equal([len(on.meta_index), on.start_acq[-1]],
+                           [88, index["start_acq"].iat[-2]])
+
+
+def test_dataset_time_ivals(plume_dataset):
+    """Test extraction of files in several time intervals."""
+    ds = plume_dataset
+    ivals = [(datetime(2015, 9, 16, 7, 6), datetime(2015, 9, 16, 7, 12)),
+             (START_PLUME, STOP_PLUME),
+             (datetime(2015, 9, 16, 8), datetime(2015, 9, 16, 9))]
+    res = ds.extract_files_time_ivals(ivals)
+    times = ds.meta_index["start_acq"]
+    nominal = [ds.meta_index["path"][(times >= i) & (times <= f)].tolist()
+               for i, f in ivals]
+    npt.assert_array_equal([len(x) for x in res], [30, 178, 0])
+    assert res == nominal
+    assert res[1] == ds.extract_files_time_ival(ds.meta_index["path"])
+
+
 def test_find_viewdir(viewing_direction):
     """Correct viewing direction using location of Etna SE crater."""
     vals = [viewing_direction.cam_azim, viewing_direction.cam_azim_err,
@@ -273,6 +321,286 @@ def test_imglists(plume_dataset):
     npt.assert_array_equal(vals_exact, nominal_exact)
 
 
+def test_imglist_time_index(plume_dataset):
+    """Test nearest in time index assignment between lists."""
+    on = plume_dataset.get_list("on")
+    off = plume_dataset.get_list("off")
+    times, times_off = on.start_acq, off.start_acq
+    nominal = [abs(t - times_off).argmin() for t in times]
+    npt.assert_array_equal(on.assign_indices_linked_list(off), nominal)
+    npt.assert_array_equal(on._linked_indices["off"], nominal)
+    t = datetime(2015, 9, 16, 7, 14, 33)
+    vals = [on.timestamp_to_index(t), abs(t - times).argmin(),
+            on.timestamp_to_index(datetime(2015, 9, 16, 6)),
+            on.timestamp_to_index(times[10], tolerance=timedelta(0))]
+    npt.assert_array_equal(vals, [51, 51, 0, 10])
+    with pytest.raises(ValueError):
+        on.timestamp_to_index(t, tolerance=timedelta(milliseconds=1))
+    with pytest.raises(ValueError):
+        on.assign_indices_linked_list(off, tolerance=timedelta(seconds=1))
+
+
+def test_imglist_tail_mode(plume_dataset, tmpdir):
+    """Test appending of images arriving in a directory."""
+    from numpy import sort
+    on, off = plume_dataset.get_list("on"), plume_dataset.get_list("off")
+    files_on, files_off = list(on.files), list(off.files)
+
+    def _copy(files):
+        for f in files:
+            copy2(f, str(tmpdir))
+        return [str(tmpdir.join(basename(f))) for f in files]
+
+    on_t = pyplis.ImgList(_copy(files_on[:10]), list_id="on",
+                          camera=on.camera)
+    off_t = pyplis.ImgList(_copy(files_off[:5]), list_id="off",
+                           camera=off.camera)
+    on_t.filter, off_t.filter = on.filter, off.filter
+    on_t.link_imglist(off_t)
+    for lst in (on_t, off_t):
+        lst.activate_tail_mode(timeout=0, settle_time=0, use_inotify=False)
+    on_t.goto_img(9)
+    vals = [on_t.goto_next(), on_t.cfn]
+
+    _copy(files_on[10:14] + files_off[5:12])
+    vals.extend([on_t.update_files(), on_t.nof, off_t.nof, on_t.cfn])
+    next_img = on_t.loaded_images["next"]
+    vals.extend([on_t.goto_next(), on_t.cfn, on_t.this is next_img])
+    linked = on_t._linked_indices["off"].copy()
+    times = on_t._get_time_index()
+    npt.assert_array_equal(vals, [False, 9, 4, 14, 12, 9, True, 10, True])
+    npt.assert_array_equal(on_t.files, _copy(files_on[:14]))
+    npt.assert_array_equal(linked, on_t.assign_indices_linked_list(off_t))
+    npt.assert_array_equal(on_t._tail.num_resorts, 0)
+    # time index was extended without sorting the meta index again
+    npt.assert_array_equal(times[1],
+                           sort(on_t.meta_index["start_acq"].values))
+    npt.assert_array_equal(times[0][times[2]], times[1])
+
+    # wait for image arriving during goto_next, only this image is loaded
+    loaded = []
+    get_raw = on_t._get_raw_image
+    on_t._get_raw_image = lambda idx: loaded.append(idx) or get_raw(idx)
+    on_t._tail.timeout = 10
+    on_t.goto_img(13)
+    del loaded[:]
+    Timer(0.2, _copy, [files_on[14:15]]).start()
+    vals = [on_t.goto_next(), on_t.cfn, loaded]
+    npt.assert_array_equal(vals[:2], [True, 14])
+    npt.assert_array_equal(loaded, [14])
+
+
+def test_dir_watcher_settle(plume_dataset, tmpdir):
+    """Test that new files are reported only after they are settled."""
+    from os import utime
+    from time import sleep
+    from pyplis.imagelists import _DirWatcher
+    path = plume_dataset.get_list("on").files[0]
+    watcher = _DirWatcher(str(tmpdir), poll_interval=0.05, settle_time=0.3,
+                          use_inotify=False)
+    # copy2 keeps the (old) modification time of the source file
+    copy2(path, str(tmpdir))
+    vals = [watcher.poll(), watcher.poll(timeout=5)]
+    # file that is still being written, with old modification time
+    partial = tmpdir.join("partial.fts")
+    partial.write("a")
+    utime(str(partial), (0, 0))
+    vals.append(watcher.poll())
+    sleep(0.4)
+    partial.write("ab")
+    utime(str(partial), (0, 0))
+    vals.extend([watcher.poll(), watcher.poll(timeout=5)])
+    assert vals == [[], [str(tmpdir.join(basename(path)))], [], [],
+                    [str(partial)]]
+
+
+def test_imglist_prefetch(plume_dataset):
+    """Test that prefetched images are equal to synchronously loaded ones."""
+    on = plume_dataset.get_list("on")
+    off = plume_dataset.get_list("off")
+    vals_nominal = []
+    for k in range(5):
+        vals_nominal.extend([on.this.mean(), off.this.mean()])
+        on.goto_next()
+
+    on.activate_prefetch_mode(num=3)
+    on.goto_img(0)
+    vals = []
+    for k in range(5):
+        vals.extend([on.this.mean(), off.this.mean()])
+        on.goto_next()
+    pending = [on._prefetch.pending, off._prefetch.pending]
+    on.prefetch_mode = False
+
+    npt.assert_array_equal(vals, vals_nominal)
+    npt.assert_array_equal(pending, [[7, 8, 9], [7, 8, 9]])
+    npt.assert_array_equal([on.prefetch_mode, off.prefetch_mode],
+                           [False, False])
+
+
+def test_imglist_img_dtype(aa_image_list):
+    """Test AA list with 32 bit images on load."""
+    lst = aa_image_list
+    nominal = lst.this.img
+    lst.img_dtype = float32
+    off = lst.get_off_list()
+    off.img_dtype = float32
+    lst.load()
+    npt.assert_array_equal([lst.this.img.dtype, off.this.img.dtype],
+                           [float32, float32])
+    npt.assert_allclose(lst.this.img, nominal, atol=1e-5)
+
+
+def test_imglist_reduce_first(aa_image_list):
+    """Test size reduction of raw images prior to AA computation."""
+    lst = aa_image_list
+    off = lst.get_off_list()
+    lst.bg_model.mode = off.bg_model.mode = 6
+    lst.roi_abs = [200, 100, 1200, 900]
+    lst.crop = True
+    vals = []
+    for pyrlevel in [4, 5]:
+        lst.pyrlevel = off.pyrlevel = pyrlevel
+        lst.reduce_first_mode = off.reduce_first_mode = False
+        nominal = lst.this.img
+        lst.reduce_first_mode = off.reduce_first_mode = True
+        vals.append(abs(lst.this.img - nominal).mean())
+    bg_shapes = [lst.bg_img.shape, lst.bg_img._converted[(5, None)].shape]
+    npt.assert_array_equal([lst.this.shape, lst.this.pyrlevel] + bg_shapes,
+                           [(25, 31), 5, (1024, 1344), (32, 42)])
+    npt.assert_allclose(vals[0], 0, atol=1e-12)
+    npt.assert_allclose(vals[1], 0, atol=0.01)
+
+
+def test_imglist_prep_cache(aa_image_list):
+    """Test that cached prepared images are equal to newly prepared ones."""
+    lst = aa_image_list
+    vals_nominal = []
+    for k in range(3):
+        vals_nominal.append(lst.this.mean())
+        lst.goto_next()
+    lst.activate_prep_cache()
+    lst.goto_img(0)
+    vals = []
+    for k in range(3):
+        vals.append(lst.this.mean())
+        lst.goto_next()
+    num = len(lst._prep_cache)
+    lst.goto_img(0)
+    vals.append(lst.this.mean())
+    cached = len(lst._prep_cache)
+    lst.pyrlevel = 1
+    vals.append(lst.this.mean())
+    num_pyr = len(lst._prep_cache)
+    lst.set_bg_img(lst.bg_img)
+    npt.assert_array_equal([num, cached, num_pyr, len(lst._prep_cache)],
+                           [5, 5, 7, 0])
+    npt.assert_allclose(vals[:4], vals_nominal + vals_nominal[:1])
+    assert vals[4] != vals[3]
+
+
+def test_imglist_prep_cache_bg_mask(aa_image_list):
+    """Test that cached images are not used after background mask change."""
+    from pyplis.imagelists import _hashable_state
+    lst = aa_image_list
+    lst.bg_model.mode = 0
+    # mask refers to the raw images (stored at pyramid level 4)
+    mask_a = ones(lst._get_raw_image(lst.index).shape)
+    mask_b = mask_a.copy()
+    mask_b[:, mask_b.shape[1] // 2:] = 0
+    states = [_hashable_state({"mask": mask_a}),
+              _hashable_state({"mask": mask_a}),
+              _hashable_state({"mask": mask_a.copy()})]
+    lst.activate_prep_cache()
+    lst.bg_model.surface_fit_mask = mask_a
+    lst.load()
+    val_a = lst.this.mean()
+    lst.bg_model.surface_fit_mask = mask_b
+    lst.load()
+    val_b = lst.this.mean()
+    num = len(lst._prep_cache)
+    lst.ext_coeffs = 0.05
+    num_ext = len(lst._prep_cache)
+    lst.activate_prep_cache(False)
+    lst.load()
+    npt.assert_array_equal([states[0] == states[1], states[0] == states[2],
+                            num, num_ext, val_a == val_b],
+                           [True, False, 2, 0, False])
+    npt.assert_allclose(val_b, lst.this.mean())
+
+
+def test_imglist_prep_cache_dir(aa_image_list, tmpdir):
+    """Test storage of prepared AA images in cache directory."""
+    from os import listdir
+    lst = aa_image_list
+    cache_dir = str(tmpdir.join("prep"))
+    lst.activate_prep_cache(cache_dir=cache_dir)
+    lst.load()
+    img0 = lst.this
+    lst.goto_next()
+    num = len(listdir(cache_dir))
+    # new memory cache, images are loaded from disk
+    lst.activate_prep_cache(cache_dir=cache_dir)
+    lst.goto_img(0)
+    img = lst.this
+    lst.bg_model.mode = 1
+    lst.load()
+    npt.assert_array_equal([num, len(listdir(cache_dir)), img.is_aa,
+                            img.meta["start_acq"], img.pyrlevel],
+                           [3, 5, True, img0.meta["start_acq"], 0])
+    npt.assert_array_equal(img.img, img0.img)
+
+
+def test_imglist_pipeline(emission_rate_analysis):
+    """Test single pass pipeline against the individual analysis methods."""
+    era = emission_rate_analysis
+    lst = era.imglist
+    roi = [10, 10, 40, 40]
+    phi = era.run_retrieval(stop_index=4)[""]["glob"].phi
+    cfn = lst.cfn
+    pipe = pyplis.ImgListPipeline(lst)
+    pipe.add_consumer(pyplis.StackConsumer())
+    pipe.add_consumer(pyplis.RoiMeanConsumer(roi))
+    pipe.add_consumer(pyplis.EmissionRateConsumer(era))
+    res = pipe.run(stop_idx=4)
+    stack = res["stack"]
+    means = res["roi_means"][0]
+    npt.assert_array_equal(pipe.consumer_ids,
+                           ["stack", "roi_means", "emission_rates"])
+    npt.assert_array_equal([stack.num_of_imgs, len(means), lst.cfn],
+                           [4, 4, cfn])
+    npt.assert_allclose(means.values,
+                        stack.stack[:, 10:40, 10:40].mean(axis=(1, 2)),
+                        rtol=1e-5)
+    npt.assert_allclose(res["emission_rates"][""]["glob"].phi, phi)
+
+
+def test_imglist_pipeline_restore(plume_dataset):
+    """Test that list state is restored if a consumer fails."""
+    lst = plume_dataset.get_list("on")
+    lst.goto_img(3)
+    state = [lst.cfn, lst.pyrlevel, lst.crop, lst.optflow_mode]
+
+    class FailingConsumer(pyplis.PipelineConsumer):
+        optflow_required = True
+
+        def process(self, lst, k):
+            if k == 2:
+                raise ValueError("consumer failed")
+
+    pipe = pyplis.ImgListPipeline(lst, [FailingConsumer()])
+    with pytest.raises(ValueError):
+        pipe.run(stop_idx=5)
+    vals = [lst.cfn, lst.pyrlevel, lst.crop, lst.optflow_mode]
+    # ref check excludes all images: stack is empty
+    with pytest.raises(ValueError):
+        lst.make_stack(pyrlevel=2, roi_abs=[10, 10, 400, 400], stop_idx=3,
+                       ref_check_roi_abs=[10, 10, 100, 100],
+                       ref_check_min_val=1e10, ref_check_max_val=1e11)
+    vals.extend([lst.cfn, lst.pyrlevel, lst.crop, lst.auto_reload])
+    npt.assert_array_equal(vals, state + state[:3] + [True])
+
+
 def test_line(line):
     """Test some features from example retrieval line."""
     n1, n2 = line.normal_vector
@@ -288,6 +616,47 @@ def test_line(line):
     npt.assert_allclose(vals, nominal, rtol=1e-7)
 
 
+def test_line_profile_sampler(line, plume_img, plume_img_next):
+    """Test extraction of profiles along multiple lines at once."""
+    from pyplis.utils import LineProfileSampler
+    lines = [line, line.offset(pixel_num=50, line_id="offset")]
+    sampler = LineProfileSampler(lines)
+    profiles = sampler.get_profiles(plume_img)
+
+    flow = pyplis.OptflowFarneback()
+    flow.set_images(plume_img, plume_img_next)
+    flow.calc_flow()
+    profiles_flow = sampler.get_profiles(flow.flow)
+    for l in lines:
+        npt.assert_array_equal(profiles[l.line_id],
+                               l.get_line_profile(plume_img))
+        npt.assert_array_equal(profiles_flow[l.line_id][1],
+                               l.get_line_profile(flow.flow[:, :, 1]))
+
+
+def test_line_interp_operator(plume_img):
+    """Test sparse interpolation operator of retrieval line."""
+    from scipy.ndimage import map_coordinates
+    img = plume_img.img.astype(float)
+    line = pyplis.LineOnImage(10, 90, 180, 20, line_id="test")
+    profile = line.get_line_profile(img)
+    op = line.get_interp_operator(img.shape)
+    stack = pyplis.ImgStack(img.shape[0], img.shape[1], 0)
+    for k in range(3):
+        stack.add_img(img * (k + 1), plume_img.start_acq)
+    profiles = line.get_line_profiles_stack(stack)
+    vals = [op.shape[0], op.shape[1], op.nnz > 3 * line.length(),
+            line.get_interp_operator(img.shape) is op,
+            line.convert(1).get_interp_operator(img.shape) is op]
+    npt.assert_array_equal(vals, [line.length(), img.size, True, True,
+                                  False])
+    npt.assert_array_equal(profiles.shape, [line.length(), 3])
+    npt.assert_allclose(profile,
+                        map_coordinates(img, line.profile_coords, order=1),
+                        rtol=1e-6)
+    npt.assert_allclose(profiles[:, 2], 3 * profile, rtol=1e-5)
+
+
 def test_geometry(geometry):
     """Test important results from geometrical calculations."""
     res = geometry.compute_all_integration_step_lengths()
@@ -297,6 +666,102 @@ def test_geometry(geometry):
                         rtol=1e-7)
 
 
+def _set_synthetic_topo(geometry):
+    """Assign synthetic cone shaped volcano at source position."""
+    from geonum import TopoData
+    from numpy import linspace, meshgrid, hypot, cos, radians, maximum
+    cam, src = geometry.cam, geometry.source
+    lats = linspace(cam.latitude - .5, cam.latitude + .5, 1001)
+    lons = linspace(cam.longitude - .5, cam.longitude + .5, 1001)
+    lat_grid, lon_grid = meshgrid(lats, lons, indexing="ij")
+    d = hypot((lat_grid - src.latitude) * 111.,
+              (lon_grid - src.longitude) * 111. * cos(radians(src.latitude)))
+    topo = TopoData(lats, lons, maximum(5000 - d * 900, 0))
+    geometry.geo_setup.topo_data = topo
+    for p in geometry.geo_setup.points.values():
+        p.set_topo_data(topo)
+
+
+def test_topo_distances_line(geometry):
+    """Test vectorised retrieval of topographic distances along a line."""
+    _set_synthetic_topo(geometry)
+    line = pyplis.LineOnImage(100, 900, 1300, 600)
+    res = geometry.get_topo_distances_line(line, skip_pix=100)
+    res_ep = geometry.get_topo_distances_line(line, skip_pix=100,
+                                              vectorised=False)
+    ok = res["ok"] * res_ep["ok"]
+    vals = [len(res["dists"]), res["ok"].sum(), ok.sum(),
+            res["geo_points"][-1].altitude > 0]
+    npt.assert_array_equal(vals, [13, 5, 5, True])
+    npt.assert_allclose(res["dists"][ok], res_ep["dists"][ok], rtol=0.03)
+
+
+def test_topo_intersections_entry(geometry):
+    """Test that only rays entering the topography count as intersection."""
+    from numpy import linspace, where, array
+    lat0 = geometry.cam.latitude
+
+    def grid(lats, lons):
+        # ridge within first km (above start altitude) and hill at ~5 km
+        d = (lats - lat0) * 111.2
+        return where(d < 1, 1000., where(abs(d - 5) < 0.5, 2000., 0.))
+    dists = linspace(0, 10, 1001)
+    res = geometry._topo_intersections(grid, array([0., 0.]),
+                                       array([0., 30.]), dists, 500.,
+                                       min_slope_angle=0)
+    npt.assert_array_equal(res[2], [True, False])
+    npt.assert_allclose(res[0][0], 4.5, atol=0.02)
+
+
+def test_geometry_maps(geometry, tmpdir):
+    """Test cached plume and topographic distance maps."""
+    from pyplis import DilutionCorr
+    from numpy import load
+    from geonum import TopoData
+    _set_synthetic_topo(geometry)
+    geometry.cache_dir = str(tmpdir)
+    geometry._geometry_maps.clear()
+    key = geometry.param_hash
+    maps = geometry.get_geometry_maps(topo_dists=True, topo_pyrlevel=4)
+    path = tmpdir.join("geometry_%s.npz" % key)
+    # reload from disk
+    geometry._geometry_maps.clear()
+    maps_disk = geometry.get_geometry_maps(topo_dists=True, topo_pyrlevel=4)
+    vals = [key == geometry.param_hash, path.check(), maps["azims"].shape,
+            maps["elevs"].shape, maps["topo_dists"].shape]
+    npt.assert_array_equal(vals, [True, True, (1344,), (1024,), (64, 84)])
+    npt.assert_array_equal(maps_disk["topo_dists"], maps["topo_dists"])
+    npt.assert_allclose(maps["plume_dists"][::500, ::500],
+                        [[11391.8, 11308.6, 11323.9],
+                         [10954.6, 10874.6, 10889.3],
+                         [10638.4, 10560.7, 10575.0]], rtol=1e-4)
+    plume_dist_img = geometry.compute_all_integration_step_lengths()[2]
+    npt.assert_array_equal(plume_dist_img.img, maps["plume_dists"])
+
+    line = pyplis.LineOnImage(100, 900, 1300, 600, line_id="l")
+    corr = DilutionCorr(line, geometry, skip_pix=100, topo_pyrlevel=4)
+    dists = corr.det_topo_dists_line("l")
+    res = geometry.get_topo_distances_line(line, skip_pix=100)
+    ok = res["ok"] * corr._masks_lines["l"]
+    npt.assert_array_equal([len(dists), ok.sum()], [13, 5])
+    npt.assert_allclose(dists[ok], res["dists"][ok] * 1000, rtol=0.05)
+    # other DEM (stored in same file), number of cached configurations
+    topo_id = geometry.topo_id
+    topo = geometry.geo_setup.topo_data
+    geometry.geo_setup.topo_data = TopoData(topo.latitude, topo.longitude,
+                                            topo.data + 100, data_id="other")
+    geometry.max_cached_geometries = 1
+    geometry.get_geometry_maps(topo_dists=True, topo_pyrlevel=4)
+    geometry.update_wind_specs(dict(dir=geometry._wind["dir"] + 10),
+                               update_geosetup=False)
+    geometry.get_geometry_maps()
+    with load(str(path)) as data:
+        num_topo = sum([k.startswith("topo_dists") for k in data.files])
+    vals = [topo_id == geometry.topo_id, num_topo,
+            list(geometry._geometry_maps) == [geometry.param_hash]]
+    npt.assert_array_equal(vals, [False, 2, True])
+
+
 def test_optflow(plume_img, plume_img_next, line):
     """Test optical flow calculation."""
     flow = pyplis.OptflowFarneback()
@@ -323,6 +788,47 @@ def test_optflow(plume_img, plume_img_next, line):
     return flow
 
 
+def test_emission_rates_parallel(emission_rate_analysis):
+    """Test emission rate retrieval in multiple processes."""
+    era = emission_rate_analysis
+    res = era.run_retrieval(stop_index=6)[""]["glob"]
+    phi, bg = res.phi, era.bg_roi_info["mean"]
+    res_par = era.run_retrieval(stop_index=6, n_workers=2)[""]["glob"]
+    vals = [len(res_par.start_acq), res_par.pix_dist_mean == res.pix_dist_mean]
+    npt.assert_array_equal(vals, [6, True])
+    npt.assert_array_equal(res_par.start_acq, res.start_acq)
+    npt.assert_allclose(res_par.phi, phi)
+    npt.assert_allclose(era.bg_roi_info["mean"].values, bg.values)
+
+
+def test_emission_rates_velo_tseries(emission_rate_analysis, line):
+    """Test emission rate retrieval using a time series of velocities."""
+    from numpy import interp
+    from pandas import Series
+    lst = emission_rate_analysis.imglist
+    times = lst.start_acq[:4]
+    velos = Series([2.0, 6.0], [times[0], times[-1]])
+    era = pyplis.EmissionRateAnalysis(lst, pcs_lines=[line.convert(2)],
+                                      velo_glob=velos, min_cd=-1e30)
+    res = era.run_retrieval(stop_index=3)[""]["glob"]
+    dt = [(t - times[0]).total_seconds() for t in times]
+    nominal = interp(dt, [dt[0], dt[-1]], [2.0, 6.0])[:3]
+    npt.assert_allclose(res.velo_eff, nominal)
+    npt.assert_allclose(res.velo_eff_err, nominal * 0.5)
+
+    # time series assigned after the lines were added
+    era = emission_rate_analysis
+    pcs = era.pcs_lines[""]
+    vals = [pcs.velo_glob, pcs.velo_glob_err]
+    era.settings.velo_glob = velos
+    with pytest.raises(AttributeError):
+        pcs.velo_glob
+    res = era.run_retrieval(stop_index=3)[""]["glob"]
+    npt.assert_array_equal(vals, [4.0, 2.0])
+    npt.assert_allclose(res.velo_eff, nominal)
+    npt.assert_allclose(res.velo_eff_err, nominal * 0.5)
+
+
 def test_auto_cellcalib(calib_dataset):
     """Test if automatic cell calibration works."""
     calib_dataset.find_and_assign_cells_all_filter_lists()
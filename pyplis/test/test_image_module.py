@@ -9,7 +9,8 @@ from __future__ import (absolute_import, division)
 
 from pyplis import Img, __dir__ as pyplis__dir__
 from os.path import join, exists
-from numpy import nan, zeros
+from numpy import nan, zeros, ones, float32
+from numpy.random import RandomState
 from numpy.testing import assert_allclose
 import pytest
 import math
@@ -75,3 +76,54 @@ def test_masked_img_nan(ec2_img, binary_mask):
     """Test if masking works."""
     masked_img = ec2_img.get_masked_img(mask=binary_mask, fill_value=nan)
     assert math.isnan(masked_img[200, 500])
+
+
+@pytest.fixture(scope="function")
+def rand_img():
+    """Image with random data (64 bit float)."""
+    return Img(RandomState(1).rand(30, 40) * 1000 + 1200.)
+
+
+def test_inplace_ops(rand_img):
+    """Test in-place arithmetics and corrections against standard ones."""
+    data = rand_img.img
+    mask = ones(rand_img.shape) * 1.1
+    nominal = [(rand_img - 1100.).img, (rand_img / mask).img]
+    rand_img.subtract_dark_image(1100., inplace=True)
+    vals = [rand_img.img.copy()]
+    rand_img += 1100.
+    rand_img.correct_vignetting(mask, inplace=True)
+    vals.append(rand_img.img)
+    assert rand_img.img is data
+    assert_allclose(vals, nominal, rtol=1e-12)
+    # integer and 32 bit images
+    img = Img(ones((4, 5), dtype=int) * 3)
+    img /= 2
+    img32 = Img(ones((4, 5), dtype=float32) * 3)
+    data = img32.img
+    img32 *= ones((4, 5)) * 2
+    assert img32.img is data and img32.img.dtype == float32
+    assert_allclose([img.img, img32.img], [ones((4, 5)) * 1.5, data])
+
+
+def test_crop_tau_new_img(rand_img):
+    """Test that crop and tau conversion with new_img copy meta data."""
+    tau = rand_img.to_tau(rand_img.img * 2)
+    sub = rand_img.crop([10, 10, 20, 20], new_img=True)
+    rand_img.meta["texp"] = 100
+    vals = [tau.is_tau, rand_img.is_tau, tau.meta["texp"], sub.shape,
+            sub.is_cropped, rand_img.is_cropped, rand_img.shape]
+    assert vals == [True, False, 0.0, (10, 10), True, False, (30, 40)]
+    assert_allclose(tau.img, math.log(2))
+
+
+def test_convert_cached(rand_img):
+    """Test cached conversion of static images to pyramid level and ROI."""
+    conv = rand_img.convert(1)
+    sub = rand_img.convert(1, [10, 10, 20, 20])
+    vals = [conv.shape, sub.shape, rand_img.shape, rand_img.convert(1) is conv,
+            rand_img.convert() is rand_img, len(rand_img.duplicate()._converted)]
+    rand_img.img = rand_img.img * 2
+    vals.append(rand_img.convert(1) is conv)
+    assert vals == [(15, 20), (5, 5), (30, 40), True, True, 0, False]
+    assert_allclose(rand_img.convert(1).img, conv.img * 2)
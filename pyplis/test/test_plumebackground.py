@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Pyplis test module for plumebackground.py base module of Pyplis.
+
+Author: Jonas Gliss
+Email: jonasgliss@gmail.com
+License: GPLv3+
+"""
+from __future__ import (absolute_import, division)
+
+from pyplis import Img, ImgStack, PlumeBackgroundModel
+from numpy import arange, asarray, exp, float32, ones, log
+from numpy.random import RandomState
+from copy import deepcopy
+import numpy.testing as npt
+import pytest
+
+
+@pytest.fixture(scope="module")
+def images():
+    """On / off plume stacks (5 images) and sky radiance images."""
+    rs = RandomState(1)
+    yy, xx = arange(40)[:, None], arange(60)[None, :]
+    bg_on = 1000. + 3 * yy + 2 * xx + 0.01 * xx**2
+    bg_off = 1500. + 2 * yy + xx
+    plume = exp(-((xx - 30)**2 + (yy - 25)**2) / 80.)
+    on = [bg_on * exp(-0.3 * k * plume) * (1 + 0.01 * rs.rand(40, 60))
+          for k in range(5)]
+    off = [bg_off * exp(-0.05 * k * plume) for k in range(5)]
+    return (ImgStack(stack=asarray(on, dtype=float32)),
+            ImgStack(stack=asarray(off, dtype=float32)),
+            Img(bg_on), Img(bg_off))
+
+
+def _bg_model(mode):
+    """Background model with reference areas for test images."""
+    m = PlumeBackgroundModel(mode=mode)
+    m.update(scale_rect=[2, 2, 10, 10], ygrad_rect=[2, 30, 10, 38],
+             xgrad_rect=[50, 2, 58, 10], ygrad_line_colnum=5,
+             ygrad_line_stoprow=38, xgrad_line_rownum=3,
+             xgrad_line_stopcol=58, surface_fit_pyrlevel=2,
+             surface_fit_mask=ones((40, 60), dtype=bool))
+    return m
+
+
+@pytest.mark.parametrize("mode", [0, 1, 2, 3, 4, 5, 6, 99])
+def test_aa_stack(images, mode):
+    """Compare AA stack with AA images computed one by one."""
+    on, off, bg_on, bg_off = images
+    model = _bg_model(mode)
+    aa = model.get_aa_stack(on, off, bg_on, bg_off)
+    nominal = [model.get_aa_image(Img(on.stack[k]), Img(off.stack[k]),
+                                  bg_on, bg_off).img for k in range(5)]
+    npt.assert_allclose(aa.stack, nominal, atol=1e-5)
+    npt.assert_array_equal([aa.stack.dtype, aa.num_of_imgs,
+                            aa.img_prep["is_aa"]], [float32, 5, True])
+
+
+def test_tau_stack_inplace(images):
+    """Test tau stack computation in input buffer."""
+    on, _, bg_on, _ = images
+    model = _bg_model(4)
+    nominal = [model.get_tau_image(Img(on.stack[k]), bg_on).img
+               for k in range(5)]
+    data = on.stack.copy()
+    tau = model.get_tau_stack(data, bg_on, out=data)
+    assert tau is data
+    npt.assert_allclose(tau, nominal, atol=1e-5)
+
+
+@pytest.mark.parametrize("mode", [1, 2, 3, 4, 5, 6, 99])
+def test_aa_image(images, mode):
+    """Compare AA image with computation using the single image methods."""
+    on, off, bg_on, bg_off = images
+    model = _bg_model(mode)
+    plume_on, plume_off = Img(on.stack[3].astype(float)), Img(off.stack[3])
+    nominal = log(bg_on.img / plume_on.img) - log(bg_off.img / plume_off.img)
+    if mode != 99:
+        nominal = model.correct_tau_curvature_ref_areas(nominal)
+    aa = model.get_aa_image(plume_on, plume_off, bg_on, bg_off)
+    scratch = model._scratch
+    model.get_aa_image(plume_on, plume_off, bg_on, bg_off)
+    npt.assert_allclose(aa.img, nominal, rtol=1e-10, atol=1e-12)
+    npt.assert_array_equal([aa.img.dtype, aa.is_aa, model._scratch is scratch,
+                            deepcopy(model)._scratch.size],
+                           [float, True, True, 0])
+
+
+def test_convert_model():
+    """Test conversion of background model settings to pyramid level."""
+    model = _bg_model(5).convert(1)
+    vals = ([model.mode, model.ygrad_line_colnum, model.ygrad_line_stoprow,
+             model.xgrad_line_stopcol] + model.scale_rect + model.xgrad_rect +
+            list(model.surface_fit_mask.shape))
+    npt.assert_array_equal(vals, [5, 2, 19, 29, 1, 1, 5, 5, 25, 1, 29, 5,
+                                  20, 30])
+    with pytest.raises(ValueError):
+        model.convert(-1)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Pyplis test module for plumespeed.py base module of Pyplis.
+
+Author: Jonas Gliss
+Email: jonasgliss@gmail.com
+License: GPLv3+
+"""
+from __future__ import (absolute_import, division)
+
+from pyplis.plumespeed import (find_signal_correlation, shifted_pearson_coeffs,
+                               rolling_shifted_pearson_coeffs,
+                               rolling_signal_correlation,
+                               OptflowFarneback)
+from pyplis import Img
+from scipy.stats import pearsonr
+from scipy.ndimage import gaussian_filter
+from numpy import convolve, ones, load, roll
+from numpy.random import RandomState
+import numpy.testing as npt
+import pytest
+
+
+@pytest.fixture(scope="module")
+def signals():
+    """Two smooth random signals where the second lags by 7 indices."""
+    rs = RandomState(3)
+    base = convolve(rs.rand(450), ones(7) / 7, "same")
+    return base[20:420], base[13:413] + rs.rand(400) * .01
+
+
+def test_shifted_pearson_coeffs(signals):
+    """Compare FFT based coefficients with pearsonr of shifted signals."""
+    s1, s2 = signals
+    coeffs = shifted_pearson_coeffs(s1, s2, 50)
+    nominal = [pearsonr(s1[:400 - k], s2[k:])[0] for k in range(50)]
+    npt.assert_allclose(coeffs, nominal, atol=1e-12)
+
+
+def test_find_signal_correlation(signals):
+    """Test lag retrieval including sub-sample refinement."""
+    s1, s2 = signals
+    lag, coeffs, _, _, sig, _ = find_signal_correlation(s1, s2)
+    lag_int = find_signal_correlation(s1, s2, subsample_lag=False)[0]
+    npt.assert_array_equal([len(coeffs), lag_int, len(sig)], [80, 7, 393])
+    npt.assert_allclose(lag, 7.0, atol=0.05)
+
+
+def test_rolling_signal_correlation(signals):
+    """Test lag retrieval in sliding windows."""
+    s1, s2 = signals
+    starts, coeffs = rolling_shifted_pearson_coeffs(s1, s2, 100, 30, 20)
+    nominal = [shifted_pearson_coeffs(s1[i:i + 100], s2[i:i + 100], 20)
+               for i in starts]
+    npt.assert_allclose(coeffs, nominal, atol=1e-12)
+    df = rolling_signal_correlation(s1, s2, window=100, step=50)
+    npt.assert_array_equal([len(df), df.index[0], df.index[-1]], [7, 49, 349])
+    npt.assert_allclose(df["lag"], 7.0, atol=0.3)
+
+
+def test_iter_flow(tmpdir):
+    """Compare batch flow calculation with flow of individual pairs."""
+    base = gaussian_filter(RandomState(2).rand(60, 80), 3) * 1000
+    imgs = [Img(roll(base, 2 * k, axis=1)) for k in range(6)]
+    optflow = OptflowFarneback(auto_update=True)
+    nominal = [optflow.calc_flow(imgs[k], imgs[k + 1]).copy()
+               for k in range(5)]
+    path = str(tmpdir.join("flow.npy"))
+    optflow = OptflowFarneback(auto_update=True)
+    flows = optflow.iter_flow(imgs, max_workers=2, flow_file=path)
+    for k, flow in enumerate(flows):
+        assert optflow.images_input["this"] is imgs[k]
+        npt.assert_array_equal(flow, nominal[k])
+    stored = load(path, mmap_mode="r")
+    npt.assert_array_equal(stored.shape, (5, 60, 80, 2))
+    npt.assert_array_equal(stored, nominal)
+    npt.assert_allclose(stored[:, 20:40, 20:60, 0].mean(), 2, atol=0.2)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Pyplis test module for processing.py base module of Pyplis.
+
+Author: Jonas Gliss
+Email: jonasgliss@gmail.com
+License: GPLv3+
+"""
+from __future__ import (absolute_import, division)
+
+from pyplis import ImgStack
+from datetime import datetime, timedelta
+from numpy import arange, ones, float32
+from pandas import Series
+import numpy.testing as npt
+import pytest
+
+START = datetime(2015, 9, 16, 7, 10, 00)
+
+
+@pytest.fixture(scope="function")
+def stack():
+    """Create a small stack with 10 images (time step 1 s)."""
+    stack = ImgStack(4, 5, 0, stack_id="test")
+    for k in range(10):
+        stack.add_img(ones((4, 5)) * k, START + timedelta(seconds=k), 0.1)
+    return stack
+
+
+def test_stack_growth(stack):
+    """Test adding images beyond the initial stack size."""
+    vals = [stack.num_of_imgs, stack.capacity, stack.stack.dtype,
+            stack.stack[:, 0, 0].sum(), stack._access_mask.sum(),
+            stack.start_acq[-1]]
+    nominal = [10, 16, float32, 45, 10, START + timedelta(seconds=9)]
+    npt.assert_array_equal(vals, nominal)
+
+
+def test_stack_reserve_finalize():
+    """Test reserve and finalize of stack memory."""
+    stack = ImgStack(4, 5, 20, stack_id="test")
+    stack.reserve(30)
+    buf = stack._buffers["stack"]
+    for k in range(3):
+        stack.add_img(ones((4, 5)) * k, START + timedelta(seconds=k))
+    arr = stack.finalize()
+    vals = [stack.capacity, stack.num_of_imgs, arr.base is buf,
+            len(stack.start_acq), stack.texps.shape[0]]
+    stack.finalize(release=True)
+    vals.extend([stack.capacity, stack.stack[:, 0, 0].tolist()])
+    npt.assert_array_equal(vals[:-1], [30, 3, True, 3, 3, 3])
+    npt.assert_array_equal(vals[-1], arange(3))
+
+
+def test_stack_memmap(tmpdir):
+    """Test memory-mapped stack growth and lazy FITS save / load."""
+    path = str(tmpdir.join("stack.dat"))
+    stack = ImgStack(4, 5, 2, stack_id="test", memmap_file=path)
+    for k in range(5):
+        stack.add_img(ones((4, 5)) * k, START + timedelta(seconds=k), 0.1)
+    vals = [stack.is_memmap, stack.capacity, stack.num_of_imgs,
+            stack.stack[:, 0, 0].sum()]
+    stack.save_as_fits(str(tmpdir), "stack.fts")
+
+    loaded = ImgStack()
+    loaded.load_stack_fits(str(tmpdir.join("stack.fts")), memmap=True)
+    vals.extend([loaded.is_memmap, loaded.num_of_imgs,
+                 loaded.stack[:, 1, 1].sum(), loaded.start_acq[-1],
+                 loaded.stack_id])
+    nominal = [True, 8, 5, 10, True, 5, 10, START + timedelta(seconds=4),
+               "test"]
+    npt.assert_array_equal(vals, nominal)
+    npt.assert_array_equal(loaded.stack, stack.stack)
+
+
+@pytest.mark.parametrize("itp_type,nominal", [
+    ("linear", arange(1, 19) / 2.),
+    ("nearest", [0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8])])
+def test_merge_tseries_interpolation(stack, itp_type, nominal):
+    """Test vectorised cross interpolation of stack and time series."""
+    idx = [START + timedelta(seconds=k + 0.5) for k in range(10)]
+    series = Series(arange(10) * 10., idx)
+    new_stack, new_series = stack.merge_with_time_series(
+        series, method="interpolation", itp_type=itp_type)
+    # the result must not depend on the pixel
+    npt.assert_array_equal(new_stack.stack[:, 0, 0], new_stack.stack[:, 3, 4])
+    npt.assert_allclose(new_stack.stack[:, 1, 2], nominal)
+    npt.assert_array_equal([len(new_series), new_stack.start_acq[0]],
+                           [len(nominal), idx[0]])
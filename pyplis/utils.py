@@ -20,10 +20,13 @@ from __future__ import (absolute_import, division)
 import os
 from numpy import (vstack, asarray, ndim, round, hypot, linspace, sum, zeros,
                    complex, angle, array, cos, sin, arctan, dot, int32, pi,
-                   isnan, nan, mean, ndarray)
+                   isnan, nan, mean, ndarray, hstack, tile, repeat, arange,
+                   cumsum, split, floor, clip, issubdtype, floating,
+                   unique)
 
 from numpy.linalg import norm
 from scipy.ndimage import map_coordinates
+from scipy.sparse import csr_matrix
 
 
 from matplotlib.pyplot import subplot, subplots, tight_layout, draw
@@ -32,6 +35,8 @@ from matplotlib.patches import Polygon, Rectangle
 from pandas import Series
 from cv2 import cvtColor, COLOR_BGR2GRAY, fillPoly
 
+from collections import OrderedDict as od
+
 from pyplis import logger
 from .helpers import (map_coordinates_sub_img, same_roi, map_roi, roi2rect)
 from .inout import get_cam_ids
@@ -135,6 +140,8 @@ class LineOnImage(object):
         self._last_rot_roi_mask = None
 
         self.profile_coords = None
+        # cached sparse interpolation operators (keys: image shape settings)
+        self._interp_ops = {}
 
         self._dir_idx = {"left": 0,
                          "right": 1}
@@ -777,6 +784,7 @@ class LineOnImage(object):
         x = linspace(x0, x1, length)
         y = linspace(y0, y1, length)
         self.profile_coords = vstack((y, x))
+        self._interp_ops = {}
         self.det_normal_vecs()
         self.set_rect_roi_rot()
 
@@ -822,12 +830,111 @@ class LineOnImage(object):
             array = cvtColor(array, COLOR_BGR2GRAY)
 
         # Extract the values along the line, using interpolation
-        zi = map_coordinates(array, self.profile_coords, order=order, **kwargs)
+        array = asarray(array)
+        if self._use_interp_operator(array, order, **kwargs):
+            _, cols, op = self._get_interp_ops(array.shape)
+            zi = op.dot(array.ravel()[cols]).astype(array.dtype)
+        else:
+            zi = map_coordinates(array, self.profile_coords, order=order,
+                                 **kwargs)
         if sum(isnan(zi)) != 0:
             logger.warning("Retrieved NaN for one or more pixels along line on input "
                  "array")
         return zi
 
+    def get_interp_operator(self, shape):
+        """Get sparse bilinear interpolation operator for this line.
+
+        The operator maps a flattened image with the input shape onto the
+        line profile, i.e. ``op.dot(img.ravel())`` is equivalent to
+        :func:`get_line_profile` with ``order=1``. The operator is cached
+        for the input shape and the current image preparation settings
+        (``pyrlevel_def``, ``roi_abs_def``) and is re-computed if the
+        profile coordinates change (cf. :func:`prepare_coords`).
+
+        Parameters
+        ----------
+        shape : tuple
+            2D shape (height, width) of the images
+
+        Returns
+        -------
+        csr_matrix
+            sparse matrix with shape ``(length, height * width)``
+
+        """
+        return self._get_interp_ops(shape)[0]
+
+    def _get_interp_ops(self, shape):
+        """Get cached interpolation operator and compressed version of it.
+
+        The compressed operator only contains the columns of the pixels that
+        contribute to the profile (``cols``), such that only these pixels
+        need to be accessed, i.e. ``op.dot(img.ravel())`` equals
+        ``op_comp.dot(img.ravel()[cols])``.
+
+        Returns
+        -------
+        tuple
+            3-element tuple containing ``op``, ``cols`` and ``op_comp``
+        """
+        key = (tuple(shape[:2]), self.pyrlevel_def,
+               tuple(self.roi_abs_def))
+        if key not in self._interp_ops:
+            op = bilinear_interp_operator(self.profile_coords, key[0])
+            cols = unique(op.indices)
+            self._interp_ops[key] = (op, cols, op[:, cols].tocsr())
+        return self._interp_ops[key]
+
+    def get_line_profiles_stack(self, stack):
+        """Retrieve line profiles from all images in an image stack.
+
+        Applies the sparse interpolation operator (cf.
+        :func:`get_interp_operator`) to all images of the stack at once.
+
+        Parameters
+        ----------
+        stack
+            :class:`ImgStack` or 3D numpy array (``num, height, width``). The
+            line must be defined for the image shape settings of the stack
+            (cf. :func:`convert`)
+
+        Returns
+        -------
+        array
+            2D array with shape ``(length, num)`` where each column
+            corresponds to the profile of one image (same layout as
+            :class:`ProfileTimeSeriesImg`)
+
+        """
+        try:
+            stack = stack.stack  # if input is ImgStack object
+        except BaseException:
+            pass
+        if ndim(stack) != 3:
+            raise ValueError("Invalid dimension of input stack: %s"
+                             % ndim(stack))
+        num, h, w = stack.shape
+        _, cols, op = self._get_interp_ops((h, w))
+        dtype = stack.dtype.newbyteorder("=")
+        if not issubdtype(dtype, floating):
+            dtype = float
+        vals = stack.reshape(num, h * w)[:, cols]
+        profiles = asarray(op.dot(vals.T), dtype=dtype)
+        if sum(isnan(profiles)) != 0:
+            logger.warning("Retrieved NaN for one or more pixels along line "
+                           "on input stack")
+        return profiles
+
+    def _use_interp_operator(self, array, order=1, **kwargs):
+        """Check if sparse interpolation operator can be used."""
+        if order != 1 or not issubdtype(array.dtype, floating):
+            return False
+        opts = dict(mode="constant", cval=0.0)
+        opts.update(kwargs)
+        return (len(opts) == 2 and opts["mode"] == "constant" and
+                opts["cval"] == 0)
+
     """Plotting / visualisation etc...
     """
 
@@ -1071,6 +1178,141 @@ class LineOnImage(object):
         return s
 
 
+def bilinear_interp_operator(coords, shape):
+    """Create sparse operator for bilinear interpolation at coordinates.
+
+    The operator reproduces :func:`scipy.ndimage.map_coordinates` with
+    ``order=1`` and ``mode="constant"`` (``cval=0``), i.e. coordinates
+    outside of the image yield 0.
+
+    Parameters
+    ----------
+    coords : array
+        2D array with shape ``(2, N)`` containing y and x coordinates
+    shape : tuple
+        2D image shape (height, width)
+
+    Returns
+    -------
+    csr_matrix
+        sparse matrix with shape ``(N, height * width)``
+
+    """
+    y, x = asarray(coords, dtype=float)
+    h, w = shape
+    num = len(y)
+    inside = (y >= 0) & (y <= h - 1) & (x >= 0) & (x <= w - 1)
+    # indices of upper left neighbour, shifted at the lower / right border
+    # such that all 4 neighbours are within the image
+    y0 = clip(floor(y), 0, max(h - 2, 0)).astype(int)
+    x0 = clip(floor(x), 0, max(w - 2, 0)).astype(int)
+    dy, dx = y - y0, x - x0
+    y1, x1 = clip(y0 + 1, 0, h - 1), clip(x0 + 1, 0, w - 1)
+
+    rows = tile(arange(num), 4)
+    cols = hstack((y0 * w + x0, y0 * w + x1, y1 * w + x0, y1 * w + x1))
+    weights = hstack(((1 - dy) * (1 - dx), (1 - dy) * dx, dy * (1 - dx),
+                      dy * dx)) * tile(inside, 4)
+    op = csr_matrix((weights, (rows, cols)), shape=(num, h * w))
+    op.eliminate_zeros()
+    return op
+
+
+class LineProfileSampler(object):
+    """Retrieve profiles along multiple lines at once.
+
+    The profile coordinates (:attr:`LineOnImage.profile_coords`) of all lines
+    are concatenated, such that the profiles of all lines are extracted from
+    an image using one interpolation call. For 3D input arrays (e.g. optical
+    flow fields, cf. :attr:`OptflowFarneback.flow`), profiles of all
+    components are extracted in the same call.
+
+    Parameters
+    ----------
+    lines
+        dictionary (keys are line IDs) or list containing
+        :class:`LineOnImage` objects
+
+    """
+
+    def __init__(self, lines):
+        if isinstance(lines, LineOnImage):
+            lines = [lines]
+        if not isinstance(lines, dict):
+            lines = od([(line.line_id, line) for line in lines])
+        if len(lines) == 0:
+            raise ValueError("Need at least one line")
+        self.lines = lines
+
+        coords = [line.profile_coords for line in self.lines.values()]
+        self._split_idx = cumsum([c.shape[1] for c in coords])[:-1]
+        self.profile_coords = hstack(coords)
+        # coordinates including component axis for 3D arrays
+        self._coords_comp = {}
+
+    @property
+    def line_ids(self):
+        """List of IDs of all lines."""
+        return list(self.lines.keys())
+
+    @property
+    def num_points(self):
+        """Total number of sample points of all lines."""
+        return self.profile_coords.shape[1]
+
+    def get_profiles(self, array, order=1, **kwargs):
+        """Retrieve the profiles of all lines in input array.
+
+        Parameters
+        ----------
+        array : array
+            2D data array (e.g. image data) or 3D array where the last axis
+            corresponds to different components (e.g. flow field with shape
+            ``(h, w, 2)``). Can also be :obj:`Img`.
+        order : int
+            order of spline interpolation used to retrieve the values along
+            the lines (passed to :func:`map_coordinates`)
+        **kwargs
+            additional keword args passed to interpolation method
+            :func:`map_coordinates`
+
+        Returns
+        -------
+        OrderedDict
+            profiles of all lines (keys are line IDs). For 3D input the
+            values are arrays with shape ``(num_components, line_length)``
+
+        """
+        try:
+            array = array.img  # if input is Img object
+        except BaseException:
+            pass
+        if ndim(array) == 2:
+            zi = map_coordinates(array, self.profile_coords, order=order,
+                                 **kwargs)
+        elif ndim(array) == 3:
+            num_comp = array.shape[2]
+            zi = map_coordinates(array, self._get_coords_comp(num_comp),
+                                 order=order, **kwargs)
+            zi = zi.reshape(num_comp, self.num_points)
+        else:
+            raise ValueError("Invalid dimension of input array: %s"
+                             % ndim(array))
+        if sum(isnan(zi)) != 0:
+            logger.warning("Retrieved NaN for one or more pixels along lines on "
+                           "input array")
+        profiles = split(zi, self._split_idx, axis=zi.ndim - 1)
+        return od(zip(self.line_ids, profiles))
+
+    def _get_coords_comp(self, num_comp):
+        """Get profile coordinates for all components of 3D arrays."""
+        if num_comp not in self._coords_comp:
+            self._coords_comp[num_comp] = vstack((
+                tile(self.profile_coords, num_comp),
+                repeat(arange(num_comp), self.num_points)))
+        return self._coords_comp[num_comp]
+
+
 class Filter(object):
     """Object representing an interference filter.
 